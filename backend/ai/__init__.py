@@ -1 +1,6 @@
-# ai/__init__.py
\ No newline at end of file
+# ai/__init__.py
+
+from .routes import ai_bp
+from . import commands  # registers `flask ai ...` CLI commands
+
+__all__ = ["ai_bp"]
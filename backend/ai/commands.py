@@ -0,0 +1,37 @@
+# ai/commands.py
+"""
+CLI for the AI job runner, exposed under the blueprint group:
+
+    flask ai run-jobs [--once]
+    flask ai job-stats
+"""
+
+import json
+import time
+import click
+from flask import current_app
+from extensions import db
+from .routes import ai_bp
+from . import jobs
+
+
+@ai_bp.cli.command("run-jobs")
+@click.option("--once", is_flag=True, help="Run what is due now on this thread, then exit.")
+def run_jobs(once):
+    """Run the AI job runner in the foreground."""
+    if once:
+        click.echo(json.dumps(dict(jobs.drain())))
+        return
+
+    jobs.runner().start(current_app._get_current_object())
+    click.echo(f"AI job runner running with {jobs.WORKERS} worker(s); Ctrl-C to stop.")
+    while True:
+        time.sleep(60)
+        click.echo(json.dumps(jobs.stats(), default=str))
+        db.session.remove()
+
+
+@ai_bp.cli.command("job-stats")
+def job_stats():
+    """Queue depth by status, runner limits and this process's timings."""
+    click.echo(json.dumps(jobs.stats(), indent=2, default=str))
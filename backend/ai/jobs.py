@@ -0,0 +1,246 @@
+# ai/jobs.py
+"""
+Background generation of AI workout plans.
+
+POST /api/ai/generate-workout no longer waits for the model (10-60 s per
+plan on GPT-4). It stores an AiJob, answers 202 with the job id, and the
+runner then:
+
+  - claims queued jobs oldest first (FOR UPDATE SKIP LOCKED) on
+    AI_JOB_WORKERS threads per process, which caps concurrent LLM calls
+  - bounds every LLM call by AI_JOB_TIMEOUT seconds; timeouts and other
+    transient errors (rate limits, 5xx, dropped connections) are retried
+    with backoff up to AI_JOB_MAX_ATTEMPTS attempts, anything else fails
+    the job
+  - saves the result as a WorkoutPlan in the commit that marks the job
+    succeeded (AiJob.plan_id)
+  - takes back jobs left 'running' by a dead worker once the lease
+    (timeout + 30 s) has expired
+  - publishes ai_job.updated on the user's channel of the messages bus,
+    so a client listening on GET /api/messages/stream hears about it
+
+Admission control happens on enqueue: at most AI_JOBS_PER_USER unfinished
+jobs per user (429) and AI_JOB_QUEUE_LIMIT queued jobs in total (503), so
+a burst cannot queue more work than the runner will clear.
+
+Clients poll GET /api/ai/jobs/<id>. The runner runs inside the web process
+(started by the first job) or, with AI_JOBS_INLINE_WORKER=0, in a
+dedicated one:
+
+    flask ai run-jobs [--once]
+    flask ai job-stats
+
+AI_LLM_CLIENT=fake runs everything against the local fake client in
+ai/openai_client.py.
+"""
+
+import logging
+import os
+import time
+from collections import Counter
+from datetime import timedelta
+from sqlalchemy import func, select, text, or_, and_
+from extensions import db
+from utils import background
+from utils.background import now_utc as _now_utc
+from ai.models import AiJob, WorkoutPlan
+from ai.openai_client import TRANSIENT_ERRORS
+from ai.workout_generator import generate_workout_plan
+from messages import bus
+
+log = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("AI_JOB_WORKERS", "4"))
+PER_USER = int(os.getenv("AI_JOBS_PER_USER", "2"))
+QUEUE_LIMIT = int(os.getenv("AI_JOB_QUEUE_LIMIT", "100"))
+TIMEOUT = float(os.getenv("AI_JOB_TIMEOUT", "90"))
+MAX_ATTEMPTS = int(os.getenv("AI_JOB_MAX_ATTEMPTS", "3"))
+POLL_SECONDS = float(os.getenv("AI_JOB_POLL", "5"))
+INLINE_WORKER = os.getenv("AI_JOBS_INLINE_WORKER", "1").lower() not in ("0", "false", "no")
+LEASE_SECONDS = TIMEOUT + 30
+RETRY_BASE = 5       # seconds; doubles per attempt
+RETRY_CAP = 120
+
+UNFINISHED = ("queued", "running")
+
+
+# ---------- queueing ----------
+
+class JobRejected(Exception):
+    """The job was not queued; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+def enqueue(user_id, data, kind="workout_plan") -> AiJob:
+    """Add a queued job to the current transaction (caller commits, then notify())."""
+    # one enqueue per user at a time, so the per-user count below is exact
+    db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"ai-jobs:{user_id}"})
+    running = (db.session.query(func.count())
+               .filter(AiJob.user_id == user_id, AiJob.status.in_(UNFINISHED)).scalar())
+    if running >= PER_USER:
+        metrics.count("rejected_user_limit")
+        raise JobRejected(f"You already have {running} plan(s) being generated; try again when they finish",
+                          429, retry_after=10)
+    queued = db.session.query(func.count()).filter(AiJob.status == "queued").scalar()
+    if queued >= QUEUE_LIMIT:
+        metrics.count("rejected_queue_full")
+        raise JobRejected("Workout plan generation is busy; try again shortly", 503, retry_after=30)
+
+    now = _now_utc()
+    job = AiJob(user_id=user_id, kind=kind, input=data, status="queued", attempts=0,
+                created_at=now, next_attempt_at=now)
+    db.session.add(job)
+    metrics.count("queued")
+    return job
+
+def notify(app):
+    """Start the in-process runner if enabled and tell it there is work."""
+    if INLINE_WORKER:
+        runner().start(app)
+        runner().wake()
+
+def queue_position(job):
+    """Queued jobs ahead of `job` (0 = next), or None once it left the queue."""
+    if job.status != "queued":
+        return None
+    return (db.session.query(func.count())
+            .filter(AiJob.status == "queued", AiJob.created_at < job.created_at).scalar())
+
+
+# ---------- claiming / running ----------
+
+def _claim():
+    """Mark the oldest due job running and return it, or None (commits)."""
+    now = _now_utc()
+    due = (select(AiJob.id)
+           .where(or_(and_(AiJob.status == "queued", AiJob.next_attempt_at <= now),
+                      and_(AiJob.status == "running",
+                           AiJob.locked_at < now - timedelta(seconds=LEASE_SECONDS))))
+           .order_by(AiJob.created_at)
+           .limit(1)
+           .with_for_update(skip_locked=True))
+    job_id = db.session.execute(
+        AiJob.__table__.update()
+        .where(AiJob.id.in_(due.scalar_subquery()))
+        .values(status="running", locked_at=now, attempts=AiJob.attempts + 1,
+                started_at=func.coalesce(AiJob.started_at, now))
+        .returning(AiJob.id)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(AiJob, job_id) if job_id else None
+
+def _retry_delay(attempts):
+    return background.retry_delay(attempts, RETRY_BASE, RETRY_CAP)
+
+def _publish(job):
+    bus.publish([bus.principal_channel("user", job.user_id)], "ai_job.updated",
+                job_id=str(job.id), status=job.status,
+                plan_id=str(job.plan_id) if job.plan_id else None)
+
+def run(job: AiJob):
+    """Generate the plan for a claimed job and record the outcome (commits)."""
+    job_id, data, kind, attempts = job.id, dict(job.input), job.kind, job.attempts
+    # give the connection back while the model works; a slow LLM must not pin the pool
+    db.session.rollback()
+
+    started = time.monotonic()
+    try:
+        if kind != "workout_plan":
+            raise ValueError(f"Unknown job kind: {kind}")
+        if attempts > MAX_ATTEMPTS:
+            raise RuntimeError("Gave up: the worker running this job stopped responding")
+        content = generate_workout_plan(data, timeout=TIMEOUT)
+    except Exception as e:
+        job = db.session.get(AiJob, job_id)
+        if job is None:
+            return "gone"   # deleted with its user meanwhile
+        job.error = f"{type(e).__name__}: {e}"[:2000]
+        if isinstance(e, TRANSIENT_ERRORS) and job.attempts < MAX_ATTEMPTS:
+            job.status = "queued"
+            job.next_attempt_at = _now_utc() + timedelta(seconds=_retry_delay(job.attempts))
+            outcome = "retried"
+        else:
+            job.status = "failed"
+            job.finished_at = _now_utc()
+            outcome = "failed"
+        log.warning("ai job %s %s: %s", job_id, outcome, job.error)
+    else:
+        job = db.session.get(AiJob, job_id)
+        if job is None:
+            return "gone"
+        plan = WorkoutPlan(user_id=job.user_id, content=content)
+        db.session.add(plan)
+        db.session.flush()
+        job.plan_id = plan.id
+        job.status = "succeeded"
+        job.error = None
+        job.finished_at = _now_utc()
+        outcome = "succeeded"
+    job.locked_at = None
+    db.session.commit()
+
+    metrics.record(outcome, run_seconds=time.monotonic() - started,
+                   total_seconds=(job.finished_at - job.created_at).total_seconds() if job.finished_at else None)
+    if outcome != "retried":
+        _publish(job)
+    return outcome
+
+def drain(limit=10**9):
+    """Run due jobs on the calling thread until none are left (or `limit`). Counts per outcome."""
+    outcomes = Counter()
+    while sum(outcomes.values()) < limit:
+        job = _claim()
+        if job is None:
+            break
+        outcomes[run(job)] += 1
+    return outcomes
+
+
+# ---------- runner ----------
+
+class JobRunner(background.Runner):
+    """WORKERS threads, each claiming and running one job at a time."""
+
+    def __init__(self, workers=WORKERS):
+        super().__init__("ai-jobs", workers, POLL_SECONDS)
+        self._busy = 0
+
+    def work(self):
+        while True:
+            job = _claim()
+            if job is None:
+                break
+            with self._lock:
+                self._busy += 1
+            try:
+                run(job)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+
+    def busy(self):
+        with self._lock:
+            return self._busy
+
+_runner = JobRunner()
+
+def runner():
+    return _runner
+
+
+# ---------- metrics ----------
+
+# run_seconds: one attempt, LLM call included; total_seconds: queued -> finished (last 1000 jobs)
+metrics = background.Metrics("run_seconds", "total_seconds", digits=3)
+
+def stats():
+    """Queue depth from the database plus this process's runner metrics."""
+    return {
+        "queue": background.queue_stats(AiJob.status, AiJob.created_at, UNFINISHED, _now_utc()),
+        "runner": {"workers": _runner.threads, "busy": _runner.busy(), "inline": INLINE_WORKER,
+                   "timeout_seconds": TIMEOUT, "per_user_limit": PER_USER, "queue_limit": QUEUE_LIMIT},
+        "process": metrics.snapshot(),
+    }
@@ -1,9 +1,13 @@
 # ai/models.py
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from extensions import db
 
+def utcnow():
+    return datetime.now(timezone.utc)
+
 class WorkoutPlan(db.Model):
     __tablename__ = 'workout_plans'
 
@@ -17,3 +21,50 @@ class WorkoutPlan(db.Model):
 
     user = db.relationship("User", back_populates="workout_plans")
 
+
+class AiJob(db.Model):
+    """
+    One workout plan generation request, run in the background by
+    ai/jobs.py. The finished plan is saved as a WorkoutPlan (plan_id).
+    """
+    __tablename__ = 'ai_jobs'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(32), nullable=False, default='workout_plan')
+    input = db.Column(JSONB, nullable=False)        # the questionnaire answers
+
+    # queued -> running -> succeeded | failed (permanent error or out of attempts)
+    status = db.Column(db.String(12), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    plan_id = db.Column(UUID(as_uuid=True), db.ForeignKey('workout_plans.id', ondelete='SET NULL'), nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+    locked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    plan = db.relationship("WorkoutPlan")
+
+    __table_args__ = (
+        CheckConstraint("status in ('queued','running','succeeded','failed')", name="ck_ai_jobs_status"),
+        # the runner's claim query: unfinished jobs, oldest first
+        Index("ix_ai_jobs_unfinished", "created_at", postgresql_where=text("status in ('queued','running')")),
+        # per-user limit on unfinished jobs / a user's recent jobs
+        Index("ix_ai_jobs_user_created", "user_id", "created_at"),
+    )
+
+    def serialize(self):
+        return {
+            'id': str(self.id),
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'error': self.error,
+            'plan_id': str(self.plan_id) if self.plan_id else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -1,20 +1,88 @@
+# ai/openai_client.py
+"""
+LLM client for the AI routes.
+
+AI_LLM_CLIENT selects the backend:
+
+  openai  (default) OpenAI chat completions; needs OPENAI_API_KEY
+  fake    a local stand-in that answers with a canned plan after
+          AI_FAKE_LLM_DELAY seconds, for development and load tests
+          without an API key or cost
+
+Every call gives up after `timeout` seconds (AI_LLM_TIMEOUT by default).
+Retrying is left to the caller (ai/jobs.py), so the SDK's own retries are
+off.
+"""
+
 import os
-from openai import OpenAI
+import re
+import threading
+import time
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+LLM_CLIENT = os.getenv("AI_LLM_CLIENT", "openai").lower()
+TIMEOUT = float(os.getenv("AI_LLM_TIMEOUT", "90"))
+FAKE_DELAY = float(os.getenv("AI_FAKE_LLM_DELAY", "2"))
+
+# worth another attempt; anything else (bad key, bad request) is not
+TRANSIENT_ERRORS = (APITimeoutError, APIConnectionError, RateLimitError, InternalServerError, TimeoutError)
 
-def generate_with_openai(prompt, model="gpt-4", max_tokens=800):
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise Exception("Missing OPENAI_API_KEY environment variable")
+_client = None
+_client_lock = threading.Lock()
 
-    client = OpenAI(api_key=api_key)  # ✅ moved inside the function
 
-    response = client.chat.completions.create(
+def _openai():
+    """One client per process, so its connection pool is reused between calls."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise Exception("Missing OPENAI_API_KEY environment variable")
+            _client = OpenAI(api_key=api_key, max_retries=0)
+        return _client
+
+def generate_with_openai(prompt, model="gpt-4", max_tokens=800, timeout=None):
+    if LLM_CLIENT == "fake":
+        return fake_completion(prompt, timeout=timeout)
+
+    response = _openai().chat.completions.create(
         model=model,
         messages=[
             {"role": "system", "content": "You are a personal trainer AI."},
             {"role": "user", "content": prompt}
         ],
         max_tokens=max_tokens,
-        temperature=0.7
+        temperature=0.7,
+        timeout=timeout or TIMEOUT,
     )
     return response.choices[0].message.content
+
+
+# ---------- fake client ----------
+
+def fake_completion(prompt, timeout=None):
+    """Deterministic stand-in for a chat completion; times out like the real one."""
+    timeout = timeout or TIMEOUT
+    if FAKE_DELAY > timeout:
+        time.sleep(timeout)
+        raise TimeoutError(f"fake LLM did not answer within {timeout}s")
+    time.sleep(FAKE_DELAY)
+
+    goal = re.search(r"- Goal: (.*)", prompt)
+    level = re.search(r"- Experience level: (.*)", prompt)
+    goal = goal.group(1).strip() if goal else "General fitness"
+    level = level.group(1).strip() if level else "Beginner"
+    weeks = []
+    for week in range(1, 5):
+        sets = 3 if week < 3 else 4
+        weeks.append(
+            f"**Week {week}**\n"
+            f"- Day 1: Squat {sets}x8 @ 95 lbs, Push-ups {sets}x10 (legs, chest)\n"
+            f"- Day 2: Rest\n"
+            f"- Day 3: Deadlift {sets}x6 @ 115 lbs, Rows {sets}x10 @ 40 lbs (back, hamstrings)\n"
+            f"- Day 4: Rest\n"
+            f"- Day 5: Overhead press {sets}x8 @ 45 lbs, Lunges {sets}x10 (shoulders, legs)\n"
+            f"- Cardio: 20 min brisk walk on rest days"
+        )
+    return f"4-week plan for: {goal} ({level})\n\n" + "\n\n".join(weeks)
@@ -1,9 +1,10 @@
  # ai/routes.py
-from flask import Blueprint, request, jsonify
-from ai.workout_generator import generate_workout_plan
-from ai.models import WorkoutPlan
+import uuid
+from flask import Blueprint, current_app, request, jsonify, url_for
+from ai.models import AiJob, WorkoutPlan
+from ai import jobs
 from extensions import db
-from ai.decorators import token_required
+from utils.auth import token_required
 from datetime import timezone
 
 ai_bp = Blueprint('ai', __name__, url_prefix='/api/ai')
@@ -19,25 +20,52 @@ def generate_and_save_workout(current_user):
     if missing:
         return jsonify({'error': f"Missing fields: {', '.join(missing)}"}), 400
 
+    # The model takes 10-60 s: queue the job and let the client poll (see ai/jobs.py)
+    answers = {k: data[k] for k in required_fields + ['medical_conditions'] if k in data}
     try:
-        plan = generate_workout_plan(data)
-
-        # Save to DB with UTC-aware timestamp
-        new_plan = WorkoutPlan(
-            user_id=current_user.id,
-            content=plan
-        )
-        db.session.add(new_plan)
-        db.session.commit()
-
-        return jsonify({
-            'message': 'Workout plan generated and saved',
-            'plan_id': str(new_plan.id),
-            'workout_plan': plan
-        }), 201
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        job = jobs.enqueue(current_user.id, answers)
+    except jobs.JobRejected as e:
+        db.session.rollback()
+        resp = jsonify({'error': str(e)})
+        if e.retry_after:
+            resp.headers['Retry-After'] = str(e.retry_after)
+        return resp, e.status
+    db.session.commit()
+    jobs.notify(current_app._get_current_object())
+
+    status_url = url_for('ai.get_job', job_id=job.id)
+    resp = jsonify({
+        'message': 'Workout plan generation queued',
+        'job_id': str(job.id),
+        'status': job.status,
+        'status_url': status_url,
+    })
+    resp.headers['Location'] = status_url
+    return resp, 202
+
+
+@ai_bp.route('/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    try:
+        job_id = uuid.UUID(job_id)
+    except ValueError:
+        return jsonify({'error': 'Job not found'}), 404
+    job = AiJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    body = job.serialize()
+    if job.status == 'queued':
+        body['queue_position'] = jobs.queue_position(job)
+    if job.status == 'succeeded' and job.plan:
+        body['workout_plan'] = job.plan.content
+
+    resp = jsonify(body)
+    resp.headers['Cache-Control'] = 'no-store'
+    if job.status in jobs.UNFINISHED:
+        resp.headers['Retry-After'] = '2'   # polling interval hint
+    return resp, 200
 
 
 @ai_bp.route('/my-workout-plans', methods=['GET'])
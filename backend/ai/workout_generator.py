@@ -25,9 +25,9 @@ Format the plan by weeks and include:
 - Optional cardio recommendations
 """
 
-def generate_workout_plan(user_data):
+def generate_workout_plan(user_data, timeout=None):
     prompt = create_workout_prompt(user_data)
-    return generate_with_openai(prompt)
+    return generate_with_openai(prompt, timeout=timeout)
 
 
 
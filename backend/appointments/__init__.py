@@ -2,5 +2,6 @@
 
 # Expose the blueprint here so you can import directly from appointments
 from .routes import appointments_bp
+from . import commands  # registers `flask appointments ...` CLI commands
 
 __all__ = ["appointments_bp"]
@@ -0,0 +1,280 @@
+# appointments/availability.py
+"""
+Coach availability and double-booking protection.
+
+A coach's 'approved' and 'pending' events may not overlap. The
+calendar_events exclusion constraint ex_calendar_events_admin_overlap
+(GiST over admin_id = and tsrange(start_time, end_time) &&, via
+btree_gist) enforces this in the database, so two concurrent bookings
+cannot both win. find_conflict() runs the same check up front to give a
+readable 409.
+
+Recurring series (appointments/recurrence.py) are not rows in
+calendar_events, so the constraint cannot see their occurrences. Every
+booking, series or single, therefore takes a per-coach advisory lock
+(lock_coach) before checking, and find_conflict() / find_series_conflict()
+look at both events and expanded series occurrences.
+
+free_intervals() answers GET /api/appointments/availability in one query
+(plus the lookup of the coach's series):
+the coach's working hours (Admin.days / Admin.times, e.g. "Mon-Fri" and
+"9am-12pm, 1pm-5pm") become a tsmultirange for the window, and the
+coach's booked intervals, found through the constraint's GiST index,
+and the occurrences of the coach's series are subtracted from it. The
+cost depends on the window, not on how many years of bookings the coach
+has.
+
+Event times are naive UTC, like CalendarEvent.start_time; working hours
+are wall-clock times in GYM_TIMEZONE (DST is applied per day).
+"""
+
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from appointments.models import CalendarEvent, CalendarSeries
+from appointments import recurrence
+from users.models import DEFAULT_TIMEZONE
+
+BLOCKING_STATUSES = ("approved", "pending")
+OVERLAP_CONSTRAINT = "ex_calendar_events_admin_overlap"
+MAX_WINDOW_DAYS = 62
+GYM_TIMEZONE = os.getenv("GYM_TIMEZONE", DEFAULT_TIMEZONE)
+
+# used when the coach's profile has no parseable hours
+DEFAULT_DAYS = "Mon-Fri"
+DEFAULT_TIMES = "9am-5pm"
+
+_DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?\s*$", re.I)
+
+
+# ---------- working hours ----------
+
+def _day_index(token):
+    token = token.strip().lower()[:3]
+    return _DAY_NAMES.index(token) if token in _DAY_NAMES else None
+
+def parse_days(days):
+    """'Mon, Wed, Fri' / 'Mon-Fri' / 'weekdays' -> set of ISO weekdays (1 = Monday)."""
+    result = set()
+    for token in re.split(r"[,;/&]|\band\b", (days or "").lower()):
+        token = token.strip()
+        if not token:
+            continue
+        if token in ("daily", "everyday", "every day", "all week"):
+            result.update(range(1, 8))
+        elif token in ("weekdays", "weekday"):
+            result.update(range(1, 6))
+        elif token in ("weekends", "weekend"):
+            result.update((6, 7))
+        elif re.search(r"[-–]|\bto\b", token):
+            first, last = (_day_index(p) for p in re.split(r"[-–]|\bto\b", token, maxsplit=1))
+            if first is not None and last is not None:
+                i = first
+                while True:
+                    result.add(i + 1)
+                    if i == last:
+                        break
+                    i = (i + 1) % 7
+        elif _day_index(token) is not None:
+            result.add(_day_index(token) + 1)
+    return result
+
+def _minutes(hour, minute, suffix):
+    hour, minute = int(hour), int(minute or 0)
+    suffix = (suffix or "").replace(".", "").lower()
+    if suffix == "pm" and hour < 12:
+        hour += 12
+    elif suffix == "am" and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+def parse_times(times):
+    """'10am-11am, 6pm-7pm' / '9:00-17:30' -> [(start_minute, end_minute), ...]."""
+    result = []
+    for token in re.split(r"[,;]", times or ""):
+        parts = re.split(r"\s*(?:[-–]|\bto\b)\s*", token.strip(), maxsplit=1)
+        if len(parts) != 2:
+            continue
+        left, right = _TIME_RE.match(parts[0]), _TIME_RE.match(parts[1])
+        if not left or not right:
+            continue
+        end = _minutes(*right.groups())
+        start = _minutes(*left.groups())
+        if not left.group(3) and right.group(3):
+            # "9-11am": the start shares the end's am/pm unless that puts it after the end
+            start = _minutes(left.group(1), left.group(2), right.group(3))
+            if start >= end:
+                start = _minutes(left.group(1), left.group(2), "am")
+        if end <= start:
+            end += 24 * 60   # runs past midnight
+        result.append((start, end))
+    return result
+
+def working_hours(admin):
+    """(iso weekdays, [(start_minute, end_minute)], source) for a coach."""
+    days, times = parse_days(admin.days), parse_times(admin.times)
+    if days and times:
+        return days, times, "profile"
+    return (days or parse_days(DEFAULT_DAYS)), (times or parse_times(DEFAULT_TIMES)), "default"
+
+
+# ---------- conflicts ----------
+
+def lock_coach(admin_id):
+    """Serialize bookings for one coach until the transaction ends."""
+    if admin_id:
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                           {"key": f"calendar:{admin_id}"})
+
+def _blocking_series(admin_id, start, end, exclude_series_id=None):
+    q = (recurrence.series_query(start, end)
+         .filter(CalendarSeries.admin_id == admin_id,
+                 CalendarSeries.status.in_(BLOCKING_STATUSES)))
+    if exclude_series_id is not None:
+        q = q.filter(CalendarSeries.id != exclude_series_id)
+    return q.all()
+
+def find_conflict(admin_id, start_time, end_time, exclude_id=None, exclude_series_id=None):
+    """
+    The coach's first approved/pending event or series occurrence
+    overlapping [start, end), if any. Pending changes are not flushed, so
+    an edited event is checked before it reaches the constraint.
+    `exclude_series_id` skips a series (when moving one of its occurrences).
+    """
+    if not admin_id:
+        return None
+    q = (CalendarEvent.query
+         .filter(CalendarEvent.admin_id == admin_id,
+                 CalendarEvent.status.in_(BLOCKING_STATUSES),
+                 CalendarEvent.start_time < end_time,
+                 CalendarEvent.end_time > start_time))
+    if exclude_id is not None:
+        q = q.filter(CalendarEvent.id != exclude_id)
+    with db.session.no_autoflush:
+        event = q.order_by(CalendarEvent.start_time).first()
+        if event:
+            return event
+        series = _blocking_series(admin_id, start_time, end_time, exclude_series_id)
+        found = recurrence.occurrences(series, start_time, end_time)
+    return found[0] if found else None
+
+_EVENT_OVERLAPS_SQL = text("""
+    SELECT e.id
+    FROM unnest(CAST(:starts AS timestamp[]), CAST(:ends AS timestamp[])) AS o(s, e)
+    JOIN calendar_events e
+      ON e.admin_id = :admin_id
+     AND e.status IN ('approved', 'pending')
+     AND tsrange(e.start_time, e.end_time, '[)') && tsrange(o.s, o.e, '[)')
+    ORDER BY e.start_time
+    LIMIT 1
+""")
+
+def find_series_conflict(admin_id, spans, exclude_series_id=None):
+    """
+    First approved/pending event or other series occurrence of the coach
+    overlapping any of `spans` ([(start, end)] in order, naive UTC). One
+    query for the events, one for the series, whatever the series length.
+    """
+    if not admin_id or not spans:
+        return None
+    with db.session.no_autoflush:
+        event_id = db.session.execute(_EVENT_OVERLAPS_SQL, {
+            "starts": [s for s, _ in spans],
+            "ends": [e for _, e in spans],
+            "admin_id": admin_id,
+        }).scalar()
+        if event_id:
+            return db.session.get(CalendarEvent, event_id)
+        start, end = spans[0][0], max(e for _, e in spans)
+        others = recurrence.occurrences(_blocking_series(admin_id, start, end, exclude_series_id), start, end)
+    # both lists are ordered by start: walk them together
+    i = 0
+    for s, e in spans:
+        while i < len(others) and others[i].end_time <= s:
+            i += 1
+        j = i
+        while j < len(others) and others[j].start_time < e:
+            if others[j].end_time > s:
+                return others[j]
+            j += 1
+    return None
+
+def is_overlap_violation(error: IntegrityError):
+    """True if `error` is the exclusion constraint rejecting a double booking."""
+    diag = getattr(getattr(error, "orig", None), "diag", None)
+    return getattr(diag, "constraint_name", None) == OVERLAP_CONSTRAINT
+
+
+# ---------- free slots ----------
+
+_FREE_SQL = text("""
+    WITH win AS (
+        SELECT tsrange(:from_ts, :to_ts, '[)') AS r
+    ),
+    hours AS (
+        -- local day + minutes, read in the gym's zone, as naive UTC
+        SELECT range_agg(tsrange((d + make_interval(mins => w.start_min)) AT TIME ZONE :tz AT TIME ZONE 'UTC',
+                                 (d + make_interval(mins => w.end_min)) AT TIME ZONE :tz AT TIME ZONE 'UTC',
+                                 '[)') * win.r) AS m
+        FROM win,
+             generate_series(CAST(:first_day AS timestamp), CAST(:last_day AS timestamp), interval '1 day') AS d
+             JOIN unnest(CAST(:dows AS int[]), CAST(:starts AS int[]), CAST(:ends AS int[]))
+                  AS w(dow, start_min, end_min)
+               ON extract(isodow FROM d) = w.dow
+    ),
+    busy AS (
+        SELECT range_agg(b.r) AS m
+        FROM (
+            SELECT tsrange(e.start_time, e.end_time, '[)') AS r
+            FROM calendar_events e, win
+            WHERE e.admin_id = :admin_id
+              AND e.status IN ('approved', 'pending')
+              AND tsrange(e.start_time, e.end_time, '[)') && win.r
+            UNION ALL
+            -- occurrences of the coach's series, expanded by the caller
+            SELECT tsrange(o.s, o.e, '[)')
+            FROM unnest(CAST(:series_starts AS timestamp[]), CAST(:series_ends AS timestamp[])) AS o(s, e)
+        ) b
+    )
+    SELECT lower(f) AS start_time, upper(f) AS end_time
+    FROM hours, busy,
+         unnest(coalesce(hours.m, '{}'::tsmultirange) - coalesce(busy.m, '{}'::tsmultirange)) AS f
+    ORDER BY 1
+""")
+
+def free_intervals(admin_id, days, hours, start, end):
+    """Working-hour intervals in [start, end) (naive UTC) not covered by a blocking event, in order."""
+    pairs = [(dow, s, e) for dow in sorted(days) for s, e in hours]
+    series_busy = recurrence.occurrences(_blocking_series(admin_id, start, end), start, end)
+    zone = ZoneInfo(GYM_TIMEZONE)
+    first_day, last_day = (t.replace(tzinfo=timezone.utc).astimezone(zone).date() for t in (start, end))
+    rows = db.session.execute(_FREE_SQL, {
+        "from_ts": start,
+        "to_ts": end,
+        "tz": GYM_TIMEZONE,
+        # local days; a day earlier for hours that run past midnight
+        "first_day": datetime.combine(first_day - timedelta(days=1), datetime.min.time()),
+        "last_day": datetime.combine(last_day, datetime.min.time()),
+        "dows": [p[0] for p in pairs],
+        "starts": [p[1] for p in pairs],
+        "ends": [p[2] for p in pairs],
+        "admin_id": admin_id,
+        "series_starts": [o.start_time for o in series_busy],
+        "series_ends": [o.end_time for o in series_busy],
+    }).all()
+    return [(r.start_time, r.end_time) for r in rows]
+
+def slots(intervals, duration):
+    """Back-to-back `duration` slots that fit inside each free interval."""
+    result = []
+    for start, end in intervals:
+        t = start
+        while t + duration <= end:
+            result.append((t, t + duration))
+            t += duration
+    return result
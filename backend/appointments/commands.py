@@ -0,0 +1,67 @@
+# appointments/commands.py
+"""
+CLI for the email outbox, exposed under the blueprint group:
+
+    flask appointments send-emails [--once]
+    flask appointments email-stats
+    flask appointments requeue-emails [EMAIL_ID ...] [--failed]
+"""
+
+import json
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from extensions import db
+from .models import EmailLog
+from .routes import appointments_bp
+from . import outbox
+
+
+@appointments_bp.cli.command("send-emails")
+@click.option("--once", is_flag=True, help="Send what is due now on this thread, then exit.")
+def send_emails(once):
+    """Run the outbox sender in the foreground."""
+    if once:
+        sent = outbox.drain()
+        click.echo(json.dumps(dict(sent)))
+        return
+
+    outbox.sender().start(current_app._get_current_object())
+    click.echo(f"Email outbox sender running with {outbox.CONNECTIONS} connection(s); Ctrl-C to stop.")
+    while True:
+        time.sleep(60)
+        click.echo(json.dumps(outbox.stats(), default=str))
+        db.session.remove()
+
+
+@appointments_bp.cli.command("email-stats")
+def email_stats():
+    """Outbox depth by status and the age of the oldest unsent email."""
+    click.echo(json.dumps(outbox.stats()["queue"], indent=2, default=str))
+
+
+@appointments_bp.cli.command("requeue-emails")
+@click.argument("email_ids", nargs=-1)
+@click.option("--failed", is_flag=True, help="Requeue every failed email.")
+def requeue_emails(email_ids, failed):
+    """Put failed (or the given) emails back in the outbox with fresh attempts."""
+    if not email_ids and not failed:
+        raise click.UsageError("Give email ids and/or --failed.")
+
+    q = EmailLog.query.filter(EmailLog.status != "sending")
+    if email_ids and failed:
+        q = q.filter(EmailLog.id.in_(email_ids) | (EmailLog.status == "failed"))
+    elif email_ids:
+        q = q.filter(EmailLog.id.in_(email_ids))
+    else:
+        q = q.filter(EmailLog.status == "failed")
+
+    n = q.update({
+        EmailLog.status: "queued",
+        EmailLog.attempts: 0,
+        EmailLog.error_message: None,
+        EmailLog.next_attempt_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Requeued {n} email(s).")
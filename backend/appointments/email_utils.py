@@ -1,30 +1,108 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
 import os
 
-def send_email(to_address, subject, body):
-    """
-    Try sending email. Returns (success: bool, error_message: str|None).
-    """
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "15"))
+# a long-lived connection is checked with NOOP before reuse after this many idle seconds
+SMTP_CHECK_AFTER = float(os.getenv("SMTP_CHECK_AFTER", "30"))
+
+
+def build_message(to_address, subject, body):
     msg = MIMEText(body)
     msg["Subject"] = subject
     msg["From"] = os.getenv("SMTP_FROM", "noreply@fitbylena.com")
     msg["To"] = to_address
+    return msg
 
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USER", "")
-    smtp_pass = os.getenv("SMTP_PASS", "")
 
-    try:
-        with smtplib.SMTP(smtp_host, smtp_port, timeout=15) as server:
-            server.starttls()
-            if smtp_user and smtp_pass:
-                server.login(smtp_user, smtp_pass)
-            server.sendmail(msg["From"], [msg["To"]], msg.as_string())
+class SmtpUnavailable(Exception):
+    """No SMTP session could be opened (connect, greeting, HELO, STARTTLS or login failed)."""
+
+
+class SmtpConnection:
+    """
+    One SMTP session kept open across sends (STARTTLS + login happen once).
+    Not thread-safe: each sender thread owns its own connection.
+    """
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST", "smtp.gmail.com")
+        self.port = int(os.getenv("SMTP_PORT", "587"))
+        self.user = os.getenv("SMTP_USER", "")
+        self.password = os.getenv("SMTP_PASS", "")
+        self.starttls = os.getenv("SMTP_STARTTLS", "1").lower() not in ("0", "false", "no")
+        self._server = None
+        self._last_used = 0.0
+        self.opened = 0   # connections made so far
 
+    def _connect(self):
+        try:
+            server = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        except OSError as e:   # includes smtplib.SMTPConnectError (greeting refused)
+            raise SmtpUnavailable(f"{type(e).__name__}: {e}") from e
+        try:
+            server.ehlo_or_helo_if_needed()
+            if self.starttls:
+                server.starttls()
+            if self.user and self.password:
+                server.login(self.user, self.password)
+        except (OSError, smtplib.SMTPException) as e:
+            server.close()
+            raise SmtpUnavailable(f"{type(e).__name__}: {e}") from e
+        self._server = server
+        self.opened += 1
+
+    def _alive(self):
+        try:
+            return self._server.noop()[0] == 250
+        except OSError:   # includes smtplib.SMTPException
+            return False
+
+    def send(self, msg):
+        """
+        Send one message, (re)connecting if needed. Raises SmtpUnavailable if
+        no session could be opened, otherwise smtplib/OSError errors.
+        """
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_CHECK_AFTER:
+            if not self._alive():
+                self.close()
+        if self._server is None:
+            self._connect()
+        try:
+            self._server.sendmail(msg["From"], [msg["To"]], msg.as_string())
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError):
+            raise   # the server answered; the session is still usable
+        except OSError:
+            self.close()
+            raise
+        self._last_used = time.monotonic()
+
+    def idle_for(self):
+        return time.monotonic() - self._last_used if self._server is not None else 0.0
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+def send_email(to_address, subject, body):
+    """
+    Try sending email on a one-off connection. Returns (success: bool, error_message: str|None).
+    Appointment emails go through the outbox (appointments/outbox.py) instead.
+    """
+    conn = SmtpConnection()
+    try:
+        conn.send(build_message(to_address, subject, body))
         print(f"✅ Email sent to {to_address}")
         return True, None
     except Exception as e:
         print(f"⚠️ Email failed to {to_address}: {e}")
         return False, str(e)
+    finally:
+        conn.close()
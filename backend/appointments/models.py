@@ -2,7 +2,7 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, ExcludeConstraint
 from extensions import db
 
 class CalendarEvent(db.Model):
@@ -29,6 +29,8 @@ class CalendarEvent(db.Model):
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # bumped on every change; with the row count it is the admin feed's ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)
 
     # ✅ New status column
     status = db.Column(db.String(50), nullable=False, default="pending")
@@ -37,6 +39,20 @@ class CalendarEvent(db.Model):
     user = db.relationship("User", backref="calendar_events", lazy=True)
     admin = db.relationship("Admin", backref="calendar_events", lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_calendar_events_user_start_time", "user_id", "start_time"),  # /my-events
+        db.Index("ix_calendar_events_start_time", "start_time"),                  # admin range view
+        # a coach's approved/pending events never overlap (needs btree_gist);
+        # its GiST index also serves availability lookups, see appointments/availability.py
+        ExcludeConstraint(
+            (admin_id, "="),
+            (db.func.tsrange(start_time, end_time, "[)"), "&&"),
+            name="ex_calendar_events_admin_overlap",
+            using="gist",
+            where=db.text("admin_id IS NOT NULL AND status IN ('approved', 'pending')"),
+        ),
+    )
+
     def serialize(self):
         return {
             "id": str(self.id),
@@ -58,16 +74,137 @@ class CalendarEvent(db.Model):
         }
 
 
+class CalendarSeries(db.Model):
+    """
+    A recurring appointment, e.g. the same coaching session every Monday
+    and Wednesday. One row and an RRULE instead of one CalendarEvent per
+    occurrence; occurrences are expanded only for the window being read
+    (appointments/recurrence.py). Single occurrences are cancelled or
+    moved with CalendarSeriesException rows.
+    """
+    __tablename__ = "calendar_series"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(50), nullable=False, default="pending")
+
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id"), nullable=True)
+    admin_id = db.Column(UUID(as_uuid=True), db.ForeignKey("admins.id"), nullable=True)
+
+    # Recurrence: first occurrence as wall-clock time in `timezone` (so a 6pm
+    # session stays at 6pm across DST) and an RFC 5545 RRULE without DTSTART,
+    # normalized on create so it always ends with UNTIL (COUNT is resolved)
+    dtstart = db.Column(db.DateTime, nullable=False)
+    timezone = db.Column(db.String(64), nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    rrule = db.Column(db.String(255), nullable=False)
+    occurrence_count = db.Column(db.Integer, nullable=False)
+
+    # start of the first / end of the last occurrence, naive UTC; range queries filter on these
+    first_start = db.Column(db.DateTime, nullable=False)
+    last_end = db.Column(db.DateTime, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # also bumped when an exception changes; part of the admin feed's ETag
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship("User", backref="calendar_series", lazy=True)
+    admin = db.relationship("Admin", backref="calendar_series", lazy=True)
+    exceptions = db.relationship("CalendarSeriesException", backref="series",
+                                 cascade="all, delete-orphan", lazy=True)
+
+    __table_args__ = (
+        db.Index("ix_calendar_series_user_last_end", "user_id", "last_end"),    # /my-events
+        db.Index("ix_calendar_series_admin_last_end", "admin_id", "last_end"),  # conflicts / availability
+        db.Index("ix_calendar_series_last_end", "last_end"),                    # admin range view
+    )
+
+    def serialize(self):
+        return {
+            "id": str(self.id),
+            "title": self.title,
+            "description": self.description,
+            "event_type": self.event_type,
+            "status": self.status,
+            "user_id": str(self.user_id) if self.user_id else None,
+            "admin_id": str(self.admin_id) if self.admin_id else None,
+            "rrule": self.rrule,
+            "timezone": self.timezone,
+            "dtstart": self.dtstart.isoformat(),
+            "duration_minutes": self.duration_minutes,
+            "occurrence_count": self.occurrence_count,
+            "first_start": self.first_start.isoformat(),
+            "last_end": self.last_end.isoformat(),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class CalendarSeriesException(db.Model):
+    """One occurrence of a series cancelled or changed (RFC 5545 EXDATE / RECURRENCE-ID)."""
+    __tablename__ = "calendar_series_exceptions"
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    series_id = db.Column(UUID(as_uuid=True), db.ForeignKey("calendar_series.id", ondelete="CASCADE"),
+                          nullable=False)
+    # the occurrence this replaces, as generated by the rule (naive UTC)
+    original_start = db.Column(db.DateTime, nullable=False)
+    cancelled = db.Column(db.Boolean, nullable=False, default=False)
+
+    # replacement values when not cancelled; NULL title/description keep the series'
+    start_time = db.Column(db.DateTime, nullable=True)
+    end_time = db.Column(db.DateTime, nullable=True)
+    title = db.Column(db.String(255), nullable=True)
+    description = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("series_id", "original_start", name="uq_calendar_series_exceptions_occurrence"),
+    )
+
+    def serialize(self):
+        return {
+            "id": str(self.id),
+            "series_id": str(self.series_id),
+            "original_start": self.original_start.isoformat(),
+            "cancelled": self.cancelled,
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "title": self.title,
+            "description": self.description,
+        }
+
+
 class EmailLog(db.Model):
+    """
+    Outgoing email, and the outbox it is sent from: rows are written as
+    'queued' together with the booking and sent by appointments/outbox.py.
+    """
     __tablename__ = "email_logs"
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     recipient = db.Column(db.String(255), nullable=False)
     subject = db.Column(db.String(255), nullable=False)
     body = db.Column(db.Text, nullable=False)
-    status = db.Column(db.String(50), nullable=False)  
+    # queued -> sending -> sent | failed (permanent error or out of attempts)
+    status = db.Column(db.String(50), nullable=False)
     error_message = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # outbox bookkeeping (UTC, like created_at)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # the sender's claim query: due rows, oldest first
+        db.Index("ix_email_logs_outbox", "next_attempt_at", "created_at",
+                 postgresql_where=db.text("status in ('queued','sending')")),
+    )
 
     def serialize(self):
         return {
@@ -0,0 +1,233 @@
+# appointments/outbox.py
+"""
+Email outbox for appointment confirmations.
+
+Routes never talk to SMTP. queue_email() adds an EmailLog row with status
+'queued' to the current session, so it commits (or rolls back) together
+with the booking, and notify() wakes the sender after the commit. The
+sender then:
+
+  - claims due rows in batches of EMAIL_OUTBOX_BATCH (FOR UPDATE SKIP
+    LOCKED, so several threads or processes can share the table)
+  - sends each batch over a persistent SMTP connection, one per sender
+    thread (EMAIL_OUTBOX_CONNECTIONS); STARTTLS and login happen once per
+    connection, not once per email, and an idle connection is closed
+    after EMAIL_SMTP_IDLE seconds
+  - retries temporary failures (4xx replies, dropped connections,
+    timeouts) with jittered exponential backoff; a 5xx reply to MAIL,
+    RCPT or DATA or EMAIL_OUTBOX_MAX_ATTEMPTS attempts mark the row failed
+  - stops the batch, without blaming its rows, when no session can be
+    opened (refused greeting, STARTTLS or login failure) or the session
+    drops: the rest of the batch gets its attempt back and goes back on
+    the retry schedule, so an SMTP outage never fails an email, and the
+    drain ends there
+  - takes back rows left 'sending' by a dead sender after
+    EMAIL_OUTBOX_LEASE seconds
+
+The sender runs inside the web process (started by the first queued
+email) or, with EMAIL_OUTBOX_INLINE_SENDER=0, in a dedicated one:
+
+    flask appointments send-emails [--once]
+    flask appointments email-stats
+
+Point SMTP_HOST/SMTP_PORT at scripts/smtp_sink.py (with SMTP_STARTTLS=0)
+to run all of this against a local SMTP stand-in; scripts/check_outbox.py
+does that and asserts the outcomes of temporary, permanent, slow,
+refused and login failures.
+"""
+
+import logging
+import os
+import smtplib
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import select, or_, and_
+from extensions import db
+from utils import background
+from appointments.models import EmailLog
+from appointments.email_utils import SmtpConnection, build_message
+
+log = logging.getLogger(__name__)
+
+BATCH = int(os.getenv("EMAIL_OUTBOX_BATCH", "20"))
+CONNECTIONS = int(os.getenv("EMAIL_OUTBOX_CONNECTIONS", "1"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE", "300"))
+POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL", "10"))
+IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE", "60"))
+INLINE_SENDER = os.getenv("EMAIL_OUTBOX_INLINE_SENDER", "1").lower() not in ("0", "false", "no")
+RETRY_BASE = 30      # seconds; doubles per attempt
+RETRY_CAP = 3600
+
+UNFINISHED = ("queued", "sending")
+
+
+# ---------- queueing ----------
+
+def queue_email(recipient, subject, body) -> EmailLog:
+    """Add a queued email to the current transaction (caller commits, then notify())."""
+    now = datetime.utcnow()
+    row = EmailLog(recipient=recipient, subject=subject, body=body,
+                   status="queued", attempts=0, created_at=now, next_attempt_at=now)
+    db.session.add(row)
+    metrics.count("queued")
+    return row
+
+def notify(app):
+    """Start the in-process sender if enabled and tell it there is mail."""
+    if INLINE_SENDER:
+        sender().start(app)
+        sender().wake()
+
+
+# ---------- claiming / sending ----------
+
+def _claim_batch(limit):
+    """Mark up to `limit` due rows 'sending' and return them, oldest first (commits)."""
+    now = datetime.utcnow()
+    due = (select(EmailLog.id)
+           .where(or_(and_(EmailLog.status == "queued", EmailLog.next_attempt_at <= now),
+                      and_(EmailLog.status == "sending",
+                           EmailLog.locked_at < now - timedelta(seconds=LEASE_SECONDS))))
+           .order_by(EmailLog.next_attempt_at, EmailLog.created_at)
+           .limit(limit)
+           .with_for_update(skip_locked=True))
+    ids = db.session.execute(
+        EmailLog.__table__.update()
+        .where(EmailLog.id.in_(due.scalar_subquery()))
+        .values(status="sending", locked_at=now, attempts=EmailLog.attempts + 1)
+        .returning(EmailLog.id)
+    ).scalars().all()
+    db.session.commit()
+    if not ids:
+        return []
+    return (EmailLog.query.filter(EmailLog.id.in_(ids))
+            .order_by(EmailLog.created_at).all())
+
+def _permanent(e):
+    """True for errors a retry cannot fix (5xx replies to MAIL/RCPT/DATA on an open session)."""
+    if isinstance(e, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in e.recipients.values())
+    if isinstance(e, smtplib.SMTPResponseException):
+        return e.smtp_code >= 500
+    return False
+
+def _retry_delay(attempts):
+    return background.retry_delay(attempts, RETRY_BASE, RETRY_CAP)
+
+def _retry_later(row, error):
+    row.error_message = error
+    row.locked_at = None
+    if row.attempts >= MAX_ATTEMPTS:
+        row.status = "failed"
+        return "failed"
+    row.status = "queued"
+    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=_retry_delay(row.attempts))
+    return "retried"
+
+def _put_back(row, error):
+    """Reschedule a row the relay never judged, giving its attempt back (an outage never fails it)."""
+    row.attempts -= 1
+    row.status, row.error_message, row.locked_at = "queued", error, None
+    row.next_attempt_at = datetime.utcnow() + timedelta(seconds=_retry_delay(max(row.attempts, 1)))
+    return "put_back"
+
+def send_batch(rows, conn: SmtpConnection):
+    """
+    Send claimed rows over `conn` and record every outcome in one commit.
+    Counts per outcome; 'smtp_unavailable' is set when the batch stopped
+    because no connection could be made.
+    """
+    outcomes = Counter()
+    opened = conn.opened
+    for i, row in enumerate(rows):
+        started = time.monotonic()
+        try:
+            conn.send(build_message(row.recipient, row.subject, row.body))
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:2000]
+            if _permanent(e):
+                row.status, row.error_message, row.locked_at = "failed", error, None
+                outcomes["failed"] += 1
+                continue
+            if isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                outcomes[_retry_later(row, error)] += 1
+                continue
+            # SmtpUnavailable or a dropped session: put this row and the rest of the batch back
+            log.warning("email outbox: SMTP unavailable: %s", error)
+            for rest in rows[i:]:
+                outcomes[_put_back(rest, error)] += 1
+            outcomes["smtp_unavailable"] = 1
+            break
+        else:
+            now = datetime.utcnow()
+            row.status, row.error_message, row.locked_at, row.sent_at = "sent", None, None, now
+            outcomes["sent"] += 1
+            metrics.record(smtp_seconds=time.monotonic() - started,
+                           latency_seconds=(now - row.created_at).total_seconds())
+    db.session.commit()
+    outcomes["connections_opened"] = conn.opened - opened
+    for outcome, n in outcomes.items():
+        metrics.count(outcome, n)
+    return +outcomes
+
+def drain(limit=10**9, conn=None):
+    """Send everything due (or up to `limit`) over `conn`, or over a fresh connection."""
+    own = conn is None
+    conn = conn or SmtpConnection()
+    total = Counter()
+    try:
+        claimed = 0
+        while claimed < limit:
+            rows = _claim_batch(min(BATCH, limit - claimed))
+            if not rows:
+                break
+            claimed += len(rows)
+            total.update(send_batch(rows, conn))
+            if total["smtp_unavailable"]:
+                break   # leave the rest for the retry schedule
+    finally:
+        if own:
+            conn.close()
+    return total
+
+
+# ---------- sender ----------
+
+class OutboxSender(background.Runner):
+    """CONNECTIONS threads, each draining the outbox over its own SMTP connection."""
+
+    def __init__(self, connections=CONNECTIONS):
+        super().__init__("email-outbox", connections, min(POLL_SECONDS, IDLE_SECONDS))
+
+    def thread_state(self):
+        return (SmtpConnection(),)
+
+    def work(self, conn):
+        try:
+            sent = drain(conn=conn)
+            if sent:
+                log.info("email outbox: %s", dict(sent))
+        finally:
+            if conn.idle_for() > IDLE_SECONDS:
+                conn.close()
+
+_sender = OutboxSender()
+
+def sender():
+    return _sender
+
+
+# ---------- metrics ----------
+
+# smtp_seconds: one SMTP transaction; latency_seconds: queued -> sent (last 1000 emails)
+metrics = background.Metrics("smtp_seconds", "latency_seconds")
+
+def stats():
+    """Queue depth from the database plus this process's send metrics."""
+    return {
+        "queue": background.queue_stats(EmailLog.status, EmailLog.created_at, UNFINISHED, datetime.utcnow()),
+        "sender": {"connections": _sender.threads, "inline": INLINE_SENDER, "batch": BATCH},
+        "process": metrics.snapshot(),
+    }
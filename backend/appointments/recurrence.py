@@ -0,0 +1,253 @@
+# appointments/recurrence.py
+"""
+Recurring appointment series.
+
+A CalendarSeries stores one RFC 5545 RRULE (e.g. "FREQ=WEEKLY;BYDAY=MO,WE;
+COUNT=12") instead of one CalendarEvent per occurrence, so a year of weekly
+sessions is one row, not fifty-two. Occurrences are expanded on read and
+only for the requested window:
+
+  - the database finds the series that can touch the window through
+    first_start / last_end (indexed), whatever the series' length
+  - the rule is fast-forwarded to the window before it is expanded, so
+    reading next week of a ten-year series costs the same as reading the
+    first week of a new one (dateutil would otherwise iterate from DTSTART)
+  - CalendarSeriesException rows cancel or move single occurrences
+
+To make fast-forwarding safe the rule is normalized on create: only DAILY,
+WEEKLY and MONTHLY are accepted, COUNT is resolved to UNTIL, and the
+weekday / day of month implied by DTSTART is written out explicitly.
+
+Times are naive UTC, like CalendarEvent.start_time; the rule itself runs
+in the series' wall-clock timezone so it follows DST.
+"""
+
+import itertools
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import rrulestr
+from sqlalchemy import or_, and_
+from appointments.models import CalendarSeries, CalendarSeriesException
+
+MAX_OCCURRENCES = int(os.getenv("SERIES_MAX_OCCURRENCES", "520"))   # ten years of weekly sessions
+MAX_DURATION = timedelta(hours=24)
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+_UNTIL_UTC = re.compile(r"UNTIL=(\d{8}(?:T\d{6})?)Z", re.I)
+
+
+# ---------- time helpers ----------
+
+def to_local(dt, zone):
+    return dt.replace(tzinfo=timezone.utc).astimezone(zone).replace(tzinfo=None)
+
+def to_utc(dt, zone):
+    return dt.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+
+def zone_for(name):
+    """ZoneInfo for an IANA name; ValueError if unknown."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+# ---------- rules ----------
+
+def _parts(rule_text):
+    return dict(p.split("=", 1) for p in rule_text.upper().split(";") if "=" in p)
+
+def build_rule(rule_text, first_start, tz_name, max_occurrences=MAX_OCCURRENCES):
+    """
+    Validate and normalize an RRULE for a series whose first occurrence
+    starts at `first_start` (naive UTC). Returns (rule, dtstart, occurrences):
+    the normalized RRULE text, the first occurrence as local wall-clock time,
+    and every occurrence start as naive UTC. ValueError if invalid.
+    """
+    zone = zone_for(tz_name)
+    rule_text = (rule_text or "").strip()
+    if rule_text.upper().startswith("RRULE:"):
+        rule_text = rule_text[6:]
+    parts = _parts(rule_text)
+    if "DTSTART" in rule_text.upper() or "\n" in rule_text:
+        raise ValueError("rrule must be a single RRULE without DTSTART")
+    if parts.get("FREQ") not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    if "COUNT" not in parts and "UNTIL" not in parts:
+        raise ValueError("A series must end: give COUNT or UNTIL")
+
+    # UNTIL in UTC ("...Z", as calendar clients send it) -> local wall-clock time
+    def _local_until(m):
+        value = m.group(1)
+        fmt = "%Y%m%dT%H%M%S" if "T" in value.upper() else "%Y%m%d"
+        return "UNTIL=" + to_local(datetime.strptime(value.upper(), fmt), zone).strftime("%Y%m%dT%H%M%S")
+    rule_text = _UNTIL_UTC.sub(_local_until, rule_text)
+
+    dtstart = to_local(first_start, zone)
+    try:
+        rule = rrulestr(rule_text, dtstart=dtstart)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid rrule: {e}")
+
+    local_starts = list(itertools.islice(rule, max_occurrences + 1))
+    if not local_starts:
+        raise ValueError("rrule produces no occurrences")
+    if len(local_starts) > max_occurrences:
+        raise ValueError(f"A series may have at most {max_occurrences} occurrences")
+
+    # start at the first real occurrence and spell out what DTSTART implied
+    dtstart = local_starts[0]
+    explicit = {"dtstart": dtstart, "count": None, "until": local_starts[-1]}
+    if parts["FREQ"] == "WEEKLY" and "BYDAY" not in parts:
+        explicit["byweekday"] = dtstart.weekday()
+    if parts["FREQ"] == "MONTHLY" and "BYDAY" not in parts and "BYMONTHDAY" not in parts:
+        explicit["bymonthday"] = dtstart.day
+    normalized = str(rule.replace(**explicit)).split("RRULE:", 1)[1]
+    if len(normalized) > CalendarSeries.rrule.type.length:
+        raise ValueError("rrule is too long")
+    return normalized, dtstart, [to_utc(s, zone) for s in local_starts]
+
+@lru_cache(maxsize=1024)
+def _parsed(rule_text, dtstart):
+    return rrulestr(rule_text, dtstart=dtstart)
+
+def _fast_forward(series, not_after):
+    """
+    The series' rule, restarted at the latest period boundary at or before
+    `not_after` (local time). Periods are whole INTERVALs of days, weeks or
+    months from DTSTART, so the restarted rule yields exactly the original
+    occurrences from there on.
+    """
+    rule = _parsed(series.rrule, series.dtstart)
+    start = series.dtstart
+    if not_after <= start:
+        return rule
+    parts = _parts(series.rrule)
+    interval = int(parts.get("INTERVAL", 1))
+    freq = parts["FREQ"]
+    if freq == "DAILY":
+        skip = (not_after - start).days // interval * interval
+        new_start = start + timedelta(days=skip)
+    elif freq == "WEEKLY":
+        skip = (not_after - start).days // 7 // interval * interval
+        new_start = start + timedelta(weeks=skip)
+    else:
+        months = (not_after.year - start.year) * 12 + not_after.month - start.month
+        skip = months // interval * interval
+        # from the 1st: occurrences of that month may fall before DTSTART's day
+        new_start = (start + relativedelta(months=skip)).replace(day=1)
+    if skip <= 0:
+        return rule
+    return _parsed(series.rrule, new_start)
+
+
+# ---------- occurrences ----------
+
+class Occurrence(NamedTuple):
+    """One expanded occurrence of a series (duck-types CalendarEvent for conflict reporting)."""
+    series: CalendarSeries
+    original_start: datetime
+    start_time: datetime
+    end_time: datetime
+    title: str
+    description: Optional[str]
+    changed: bool = False
+
+    @property
+    def id(self):
+        return f"{self.series.id}:{self.original_start.isoformat()}"
+
+    @property
+    def status(self):
+        return self.series.status
+
+    def serialize(self):
+        s = self.series
+        return {
+            "id": self.id,
+            "series_id": str(s.id),
+            "occurrence": self.original_start.isoformat(),
+            "recurring": True,
+            "changed": self.changed,
+            "title": self.title,
+            "description": self.description,
+            "event_type": s.event_type,
+            "status": s.status,
+            "user_id": str(s.user_id) if s.user_id else None,
+            "admin_id": str(s.admin_id) if s.admin_id else None,
+            "guest_name": None,
+            "guest_email": None,
+            "guest_phone": None,
+            "start_time": self.start_time.isoformat(),
+            "start_time_display": self.start_time.strftime("%b %d, %Y %I:%M %p"),
+            "end_time": self.end_time.isoformat(),
+            "end_time_display": self.end_time.strftime("%b %d, %Y %I:%M %p"),
+            "created_at": s.created_at.isoformat() if s.created_at else None,
+            "created_at_display": s.created_at.strftime("%b %d, %Y %I:%M %p") if s.created_at else None,
+        }
+
+def rule_starts(series, start, end):
+    """Occurrence starts generated by the rule alone overlapping [start, end) (naive UTC)."""
+    zone = ZoneInfo(series.timezone)
+    duration = timedelta(minutes=series.duration_minutes)
+    # local bounds with a day of slack either side for UTC offsets / DST
+    lo = to_local(start, zone) - duration - timedelta(days=1)
+    hi = to_local(end, zone) + timedelta(days=1)
+    result = []
+    for local in _fast_forward(series, lo).between(lo, hi, inc=True):
+        s = to_utc(local, zone)
+        if s < end and s + duration > start:
+            result.append(s)
+    return result
+
+def is_occurrence(series, original_start):
+    """True if the rule generates an occurrence starting exactly at `original_start` (naive UTC)."""
+    return original_start in rule_starts(series, original_start, original_start + timedelta(seconds=1))
+
+def expand(series, start, end, exceptions=()):
+    """Occurrences of `series` overlapping [start, end), exceptions applied, in order."""
+    duration = timedelta(minutes=series.duration_minutes)
+    found = {s: Occurrence(series, s, s, s + duration, series.title, series.description)
+             for s in rule_starts(series, start, end)}
+    for x in exceptions:
+        found.pop(x.original_start, None)
+        if not x.cancelled and x.start_time < end and x.end_time > start:
+            found[x.original_start] = Occurrence(
+                series, x.original_start, x.start_time, x.end_time,
+                x.title if x.title is not None else series.title,
+                x.description if x.description is not None else series.description,
+                changed=True)
+    return sorted(found.values(), key=lambda o: o.start_time)
+
+def series_query(start, end):
+    """Series with an occurrence that can overlap [start, end)."""
+    return CalendarSeries.query.filter(CalendarSeries.first_start < end, CalendarSeries.last_end > start)
+
+def exceptions_for(series_list, start, end):
+    """{series_id: [exceptions]} relevant to [start, end), in one query."""
+    by_series = {s.id: [] for s in series_list}
+    if not by_series:
+        return by_series
+    X = CalendarSeriesException
+    rows = (X.query
+            .filter(X.series_id.in_(list(by_series)))
+            .filter(or_(and_(X.original_start >= start - MAX_DURATION, X.original_start < end),
+                        and_(X.start_time < end, X.end_time > start)))
+            .all())
+    for x in rows:
+        by_series[x.series_id].append(x)
+    return by_series
+
+def occurrences(series_list, start, end):
+    """All occurrences of `series_list` overlapping [start, end), ordered by start."""
+    by_series = exceptions_for(series_list, start, end)
+    result = []
+    for s in series_list:
+        result.extend(expand(s, start, end, by_series[s.id]))
+    result.sort(key=lambda o: o.start_time)
+    return result
@@ -1,11 +1,19 @@
 # backend/appointments/routes.py
 
-from flask import Blueprint, request, jsonify
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from extensions import db
-from appointments.models import CalendarEvent, EmailLog
-from utils.decorators import token_required
-from admin.decorators import admin_token_required
-from appointments.email_utils import send_email
+from admin.models import Admin
+from users.models import User
+from appointments.models import CalendarEvent, CalendarSeries, CalendarSeriesException, EmailLog
+from utils.auth import token_required, admin_token_required
+from appointments import availability, outbox, recurrence
+from utils import cursors
 from dateutil import parser  # ✅ robust ISO8601 parsing
 
 appointments_bp = Blueprint("appointments", __name__, url_prefix="/api/appointments")
@@ -14,14 +22,126 @@ appointments_bp = Blueprint("appointments", __name__, url_prefix="/api/appointme
 VALID_EVENT_TYPES = {"workout", "in_person", "video_chat", "tour"}
 
 
+def _parse_time(value):
+    """ISO8601 -> naive UTC, the way start_time/end_time are stored."""
+    dt = parser.isoparse(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+# --- calendar feed range ---
+FEED_DAYS_BACK = 30     # default range: a month back ...
+FEED_DAYS = 90          # ... spanning three months
+FEED_MAX_DAYS = 366
+
+def _feed_range():
+    """(start, end) from ?start=&end=, defaulted and bounded; ValueError if invalid."""
+    try:
+        start = _parse_time(request.args["start"]) if request.args.get("start") else None
+        end = _parse_time(request.args["end"]) if request.args.get("end") else None
+        if start is None and end is None:
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            start = today - timedelta(days=FEED_DAYS_BACK)
+        if end is None:
+            end = start + timedelta(days=FEED_DAYS)
+        if start is None:
+            start = end - timedelta(days=FEED_DAYS)
+    except OverflowError:   # near datetime.min/max, e.g. ?start=9999-12-20
+        raise ValueError("date range out of bounds")
+    if end <= start or end - start > timedelta(days=FEED_MAX_DAYS):
+        raise ValueError("date range out of bounds")
+    return start, end
+
+def _admin_id(data):
+    """
+    The body's admin_id as a UUID (None if not given); ValueError if malformed.
+    Normalized so the coach's booking lock (availability.lock_coach) and the
+    conflict queries see the same id however the client spelled it.
+    """
+    admin_id = data.get("admin_id")
+    return uuid.UUID(str(admin_id)) if admin_id else None
+
+def _get_event(event_id, **filters):
+    """CalendarEvent by id, or None; feed ids that are not UUIDs (series occurrences) match nothing."""
+    try:
+        event_id = uuid.UUID(event_id)
+    except ValueError:
+        return None
+    return CalendarEvent.query.filter_by(id=event_id, **filters).first()
+
+
+# --- double-booking checks (see appointments/availability.py) ---
+def _conflict_response(conflict):
+    """409 naming the event or series occurrence that is in the way."""
+    return jsonify({
+        "error": "This time overlaps another appointment with this coach",
+        "conflict": {
+            "id": str(conflict.id),
+            "start_time": conflict.start_time.isoformat(),
+            "end_time": conflict.end_time.isoformat(),
+        },
+    }), 409
+
+def _slot_error(event):
+    """Error response if `event`'s times are invalid or double-book its coach, else None."""
+    if event.end_time <= event.start_time:
+        return jsonify({"error": "end_time must be after start_time"}), 400
+    if event.status not in availability.BLOCKING_STATUSES:
+        return None
+    availability.lock_coach(event.admin_id)
+    conflict = availability.find_conflict(event.admin_id, event.start_time, event.end_time,
+                                          exclude_id=event.id)
+    if conflict:
+        return _conflict_response(conflict)
+    return None
+
+def _series_slot_error(series, starts):
+    """Error response if any of `series`' occurrences (`starts`, naive UTC) double-books its coach."""
+    if series.status not in availability.BLOCKING_STATUSES:
+        return None
+    duration = timedelta(minutes=series.duration_minutes)
+    availability.lock_coach(series.admin_id)
+    conflict = availability.find_series_conflict(series.admin_id, [(s, s + duration) for s in starts],
+                                                 exclude_series_id=series.id)
+    if conflict:
+        return _conflict_response(conflict)
+    return None
+
+def _commit_slot():
+    """Commit; a 409 response if the overlap constraint rejected it (a concurrent booking won)."""
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if availability.is_overlap_violation(e):
+            return jsonify({"error": "This time overlaps another appointment with this coach"}), 409
+        raise
+    return None
+
+
 # -------------------------
 # USER ROUTES
 # -------------------------
 @appointments_bp.route("/my-events", methods=["GET"])
 @token_required
 def get_my_events(current_user):
-    events = CalendarEvent.query.filter_by(user_id=current_user.id).all()
-    return jsonify([e.serialize() for e in events]), 200
+    try:
+        start_dt, end_dt = _feed_range()
+    except ValueError:
+        return jsonify({"error": f"Invalid date range (ISO dates, end after start, at most {FEED_MAX_DAYS} days)"}), 400
+
+    # Single events: all of them unless a range is asked for (as before)
+    query = CalendarEvent.query.filter_by(user_id=current_user.id)
+    if request.args.get("start") or request.args.get("end"):
+        query = query.filter(CalendarEvent.start_time < end_dt, CalendarEvent.end_time > start_dt)
+    results = [e.serialize() for e in query.all()]
+
+    # Recurring series: only the occurrences inside the range are expanded
+    series = (recurrence.series_query(start_dt, end_dt)
+              .filter(CalendarSeries.user_id == current_user.id).all())
+    results.extend(o.serialize() for o in recurrence.occurrences(series, start_dt, end_dt))
+    return jsonify(results), 200
 
 
 @appointments_bp.route("/book", methods=["POST"])
@@ -39,10 +159,14 @@ def book_event(current_user):
         }), 400
 
     try:
-        start_time = parser.isoparse(data["start_time"])
-        end_time = parser.isoparse(data["end_time"])
+        start_time = _parse_time(data["start_time"])
+        end_time = _parse_time(data["end_time"])
     except Exception:
         return jsonify({"error": "Invalid datetime format. Use ISO8601."}), 400
+    try:
+        admin_id = _admin_id(data)
+    except ValueError:
+        return jsonify({"error": "Invalid admin_id"}), 400
 
     event = CalendarEvent(
         title=data["title"],
@@ -51,11 +175,17 @@ def book_event(current_user):
         start_time=start_time,
         end_time=end_time,
         user_id=current_user.id,
-        admin_id=data.get("admin_id"),
+        admin_id=admin_id,
+        status="pending",
     )
 
+    error = _slot_error(event)
+    if error:
+        return error
     db.session.add(event)
-    db.session.commit()
+    error = _commit_slot()
+    if error:
+        return error
 
     return jsonify({"message": "Event booked", "event": event.serialize()}), 201
 
@@ -80,10 +210,14 @@ def guest_book_event():
         }), 400
 
     try:
-        start_time = parser.isoparse(data["start_time"])
-        end_time = parser.isoparse(data["end_time"])
+        start_time = _parse_time(data["start_time"])
+        end_time = _parse_time(data["end_time"])
     except Exception:
         return jsonify({"error": "Invalid datetime format. Use ISO8601."}), 400
+    try:
+        admin_id = _admin_id(data)
+    except ValueError:
+        return jsonify({"error": "Invalid admin_id"}), 400
 
     event = CalendarEvent(
         title=data["title"],
@@ -94,11 +228,14 @@ def guest_book_event():
         guest_name=data["guest_name"],
         guest_email=data["guest_email"],
         guest_phone=data["guest_phone"],
-        admin_id=data.get("admin_id"),
+        admin_id=admin_id,
+        status="pending",
     )
 
+    error = _slot_error(event)
+    if error:
+        return error
     db.session.add(event)
-    db.session.commit()
 
     email_body = f"""
     Hi {event.guest_name},
@@ -112,36 +249,80 @@ def guest_book_event():
     © FitByLena 2025
     """
 
-    success, error_msg = send_email(
-        to_address=event.guest_email,
-        subject="Your Tour/Meeting is Confirmed",
-        body=email_body
-    )
-
-    log = EmailLog(
+    # Queued in the booking's transaction; the outbox sender delivers it
+    outbox.queue_email(
         recipient=event.guest_email,
         subject="Your Tour/Meeting is Confirmed",
-        body=email_body,
-        status="sent" if success else "failed",
-        error_message=error_msg
+        body=email_body
     )
-    db.session.add(log)
-    db.session.commit()
+    error = _commit_slot()
+    if error:
+        return error
+    outbox.notify(current_app._get_current_object())
 
     return jsonify({
         "message": "Guest event booked",
         "event": event.serialize(),
-        "email_sent": success
+        "email_queued": True
     }), 201
 
 
+# -------------------------
+# COACH AVAILABILITY (public)
+# -------------------------
+@appointments_bp.route("/availability", methods=["GET"])
+def get_availability():
+    try:
+        admin_id = uuid.UUID(request.args.get("admin_id", ""))
+    except ValueError:
+        return jsonify({"error": "admin_id is required"}), 400
+
+    try:
+        duration = int(request.args.get("duration", 60))
+    except ValueError:
+        return jsonify({"error": "duration must be minutes"}), 400
+    if not 5 <= duration <= 8 * 60:
+        return jsonify({"error": "duration must be between 5 and 480 minutes"}), 400
+
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    try:
+        start = _parse_time(request.args["from"]) if request.args.get("from") else now
+        end = _parse_time(request.args["to"]) if request.args.get("to") else start + timedelta(days=7)
+    except Exception:
+        return jsonify({"error": "Invalid from/to. Use ISO8601."}), 400
+    start = max(start, now)   # no slots in the past
+    if end <= start:
+        return jsonify({"error": "to must be after from (and in the future)"}), 400
+    if end - start > timedelta(days=availability.MAX_WINDOW_DAYS):
+        return jsonify({"error": f"Range is limited to {availability.MAX_WINDOW_DAYS} days"}), 400
+
+    admin = db.session.get(Admin, admin_id)
+    if not admin or admin.is_active is False:
+        return jsonify({"error": "Coach not found"}), 404
+
+    days, hours, hours_source = availability.working_hours(admin)
+    free = availability.free_intervals(admin.id, days, hours, start, end)
+    slots = availability.slots(free, timedelta(minutes=duration))
+
+    return jsonify({
+        "admin_id": str(admin.id),
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "duration_minutes": duration,
+        "timezone": availability.GYM_TIMEZONE,
+        "hours_source": hours_source,
+        "free": [{"start_time": a.isoformat(), "end_time": b.isoformat()} for a, b in free],
+        "slots": [{"start_time": a.isoformat(), "end_time": b.isoformat()} for a, b in slots],
+    }), 200
+
+
 # -------------------------
 # UPDATE APPOINTMENT (User)
 # -------------------------
 @appointments_bp.route("/update/<event_id>", methods=["PUT"])
 @token_required
 def update_event(current_user, event_id):
-    event = CalendarEvent.query.filter_by(id=event_id, user_id=current_user.id).first()
+    event = _get_event(event_id, user_id=current_user.id)
     if not event:
         return jsonify({"error": "Event not found or not authorized"}), 404
 
@@ -160,17 +341,20 @@ def update_event(current_user, event_id):
 
     if "start_time" in data:
         try:
-            event.start_time = parser.isoparse(data["start_time"])
+            event.start_time = _parse_time(data["start_time"])
         except Exception:
             return jsonify({"error": "Invalid start_time format. Use ISO8601."}), 400
 
     if "end_time" in data:
         try:
-            event.end_time = parser.isoparse(data["end_time"])
+            event.end_time = _parse_time(data["end_time"])
         except Exception:
             return jsonify({"error": "Invalid end_time format. Use ISO8601."}), 400
 
-    db.session.commit()
+    error = _slot_error(event) or _commit_slot()
+    if error:
+        db.session.rollback()
+        return error
     return jsonify({"message": "Event updated", "event": event.serialize()}), 200
 
 
@@ -180,7 +364,7 @@ def update_event(current_user, event_id):
 @appointments_bp.route("/delete/<event_id>", methods=["DELETE"])
 @token_required
 def delete_event(current_user, event_id):
-    event = CalendarEvent.query.filter_by(id=event_id, user_id=current_user.id).first()
+    event = _get_event(event_id, user_id=current_user.id)
     if not event:
         return jsonify({"error": "Event not found or not authorized"}), 404
 
@@ -189,13 +373,171 @@ def delete_event(current_user, event_id):
     return jsonify({"message": "Event deleted", "event_id": str(event.id)}), 200
 
 
+# -------------------------
+# RECURRING SERIES (User)
+# -------------------------
+def _get_series(series_id, **filters):
+    try:
+        series_id = uuid.UUID(series_id)
+    except ValueError:
+        return None
+    return CalendarSeries.query.filter_by(id=series_id, **filters).first()
+
+def _change_occurrence(series, occurrence):
+    """
+    Cancel or change one occurrence of `series`; `occurrence` is its
+    original start (ISO8601). Body: {"cancel": true}, or any of
+    start_time / end_time / title / description.
+    """
+    try:
+        original = _parse_time(occurrence)
+    except Exception:
+        return jsonify({"error": "Invalid occurrence. Use its original start_time (ISO8601)."}), 400
+    if not recurrence.is_occurrence(series, original):
+        return jsonify({"error": "Occurrence not found"}), 404
+
+    data = request.get_json() or {}
+    exception = (CalendarSeriesException.query
+                 .filter_by(series_id=series.id, original_start=original).first()
+                 or CalendarSeriesException(series_id=series.id, original_start=original))
+
+    if data.get("cancel"):
+        exception.cancelled = True
+        exception.start_time = exception.end_time = None
+    else:
+        exception.cancelled = False
+        exception.start_time = exception.start_time or original
+        exception.end_time = exception.end_time or original + timedelta(minutes=series.duration_minutes)
+        try:
+            if "start_time" in data:
+                exception.start_time = _parse_time(data["start_time"])
+            if "end_time" in data:
+                exception.end_time = _parse_time(data["end_time"])
+        except Exception:
+            return jsonify({"error": "Invalid datetime format. Use ISO8601."}), 400
+        if "title" in data:
+            exception.title = data["title"]
+        if "description" in data:
+            exception.description = data["description"]
+
+        if exception.end_time <= exception.start_time:
+            return jsonify({"error": "end_time must be after start_time"}), 400
+        if exception.end_time - exception.start_time > recurrence.MAX_DURATION:
+            return jsonify({"error": "An occurrence may last at most 24 hours"}), 400
+        if series.status in availability.BLOCKING_STATUSES:
+            availability.lock_coach(series.admin_id)
+            with db.session.no_autoflush:
+                siblings = [o for o in recurrence.occurrences([series], exception.start_time, exception.end_time)
+                            if o.original_start != original]
+            conflict = siblings[0] if siblings else availability.find_conflict(
+                series.admin_id, exception.start_time, exception.end_time, exclude_series_id=series.id)
+            if conflict:
+                return _conflict_response(conflict)
+
+        # a moved occurrence may fall outside the rule's first/last occurrence
+        series.first_start = min(series.first_start, exception.start_time)
+        series.last_end = max(series.last_end, exception.end_time)
+
+    series.updated_at = datetime.utcnow()   # feeds revalidate on the series row
+    db.session.add(exception)
+    db.session.commit()
+    return jsonify({
+        "message": "Occurrence cancelled" if exception.cancelled else "Occurrence updated",
+        "exception": exception.serialize(),
+    }), 200
+
+
+@appointments_bp.route("/series", methods=["POST"])
+@token_required
+def book_series(current_user):
+    data = request.get_json()
+    required_fields = ["title", "event_type", "start_time", "end_time", "rrule"]
+    missing = [f for f in required_fields if f not in data]
+    if missing:
+        return jsonify({"error": f"Missing fields: {', '.join(missing)}"}), 400
+
+    if data["event_type"] not in VALID_EVENT_TYPES:
+        return jsonify({
+            "error": f"Invalid event_type. Must be one of {', '.join(VALID_EVENT_TYPES)}"
+        }), 400
+
+    # start_time / end_time are the first occurrence
+    try:
+        start_time = _parse_time(data["start_time"])
+        end_time = _parse_time(data["end_time"])
+    except Exception:
+        return jsonify({"error": "Invalid datetime format. Use ISO8601."}), 400
+    if end_time - start_time < timedelta(minutes=1):
+        return jsonify({"error": "end_time must be after start_time"}), 400
+    if end_time - start_time > recurrence.MAX_DURATION:
+        return jsonify({"error": "An occurrence may last at most 24 hours"}), 400
+
+    try:
+        admin_id = _admin_id(data)
+    except ValueError:
+        return jsonify({"error": "Invalid admin_id"}), 400
+
+    # the rule runs on the user's wall clock, so "every Monday 6pm" survives DST
+    tz_name = data.get("timezone") or current_user.timezone or availability.GYM_TIMEZONE
+    try:
+        rule, dtstart, starts = recurrence.build_rule(data["rrule"], start_time, tz_name)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    duration = timedelta(minutes=int((end_time - start_time).total_seconds() // 60))
+    series = CalendarSeries(
+        title=data["title"],
+        description=data.get("description"),
+        event_type=data["event_type"],
+        user_id=current_user.id,
+        admin_id=admin_id,
+        status="pending",
+        dtstart=dtstart,
+        timezone=tz_name,
+        duration_minutes=int(duration.total_seconds() // 60),
+        rrule=rule,
+        occurrence_count=len(starts),
+        first_start=starts[0],
+        last_end=starts[-1] + duration,
+    )
+
+    error = _series_slot_error(series, starts)
+    if error:
+        return error
+    db.session.add(series)
+    db.session.commit()
+
+    return jsonify({"message": "Series booked", "series": series.serialize()}), 201
+
+
+@appointments_bp.route("/series/<series_id>/occurrences/<occurrence>", methods=["PUT"])
+@token_required
+def update_series_occurrence(current_user, series_id, occurrence):
+    series = _get_series(series_id, user_id=current_user.id)
+    if not series:
+        return jsonify({"error": "Series not found or not authorized"}), 404
+    return _change_occurrence(series, occurrence)
+
+
+@appointments_bp.route("/series/<series_id>", methods=["DELETE"])
+@token_required
+def delete_series(current_user, series_id):
+    series = _get_series(series_id, user_id=current_user.id)
+    if not series:
+        return jsonify({"error": "Series not found or not authorized"}), 404
+
+    db.session.delete(series)
+    db.session.commit()
+    return jsonify({"message": "Series deleted", "series_id": str(series.id)}), 200
+
+
 # -------------------------
 # ADMIN UPDATE / DELETE
 # -------------------------
 @appointments_bp.route("/admin/update/<event_id>", methods=["PUT"])
 @admin_token_required
 def admin_update_event(current_admin, event_id):
-    event = CalendarEvent.query.get(event_id)
+    event = _get_event(event_id)
     if not event:
         return jsonify({"error": "Event not found"}), 404
 
@@ -214,24 +556,27 @@ def admin_update_event(current_admin, event_id):
 
     if "start_time" in data:
         try:
-            event.start_time = parser.isoparse(data["start_time"])
+            event.start_time = _parse_time(data["start_time"])
         except Exception:
             return jsonify({"error": "Invalid start_time format. Use ISO8601."}), 400
 
     if "end_time" in data:
         try:
-            event.end_time = parser.isoparse(data["end_time"])
+            event.end_time = _parse_time(data["end_time"])
         except Exception:
             return jsonify({"error": "Invalid end_time format. Use ISO8601."}), 400
 
-    db.session.commit()
+    error = _slot_error(event) or _commit_slot()
+    if error:
+        db.session.rollback()
+        return error
     return jsonify({"message": "Event updated by admin", "event": event.serialize()}), 200
 
 
 @appointments_bp.route("/admin/delete/<event_id>", methods=["DELETE"])
 @admin_token_required
 def admin_delete_event(current_admin, event_id):
-    event = CalendarEvent.query.get(event_id)
+    event = _get_event(event_id)
     if not event:
         return jsonify({"error": "Event not found"}), 404
 
@@ -256,7 +601,16 @@ def get_email_logs(current_admin):
     if recipient:
         query = query.filter_by(recipient=recipient)
 
-    logs = query.order_by(EmailLog.created_at.desc()).all()
+    # Newest first, a page at a time; the next page is GET ?cursor=<X-Next-Cursor>
+    try:
+        limit = max(1, min(int(request.args.get("limit", 50)), 200))
+        if request.args.get("cursor"):
+            query = query.filter(tuple_(EmailLog.created_at, EmailLog.id)
+                                 < tuple_(*cursors.decode(request.args["cursor"], datetime, uuid.UUID)))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    logs = query.order_by(EmailLog.created_at.desc(), EmailLog.id.desc()).limit(limit).all()
 
     results = []
     for log in logs:
@@ -270,7 +624,16 @@ def get_email_logs(current_admin):
             "created_at_iso": log.created_at.isoformat()
         })
 
-    return jsonify(results), 200
+    resp = jsonify(results)
+    if len(logs) == limit:
+        resp.headers["X-Next-Cursor"] = cursors.encode(logs[-1].created_at, logs[-1].id)
+    return resp, 200
+
+
+@appointments_bp.route("/admin/email-outbox", methods=["GET"])
+@admin_token_required
+def get_email_outbox_stats(current_admin):
+    return jsonify(outbox.stats()), 200
 
 
 # -------------------------
@@ -279,7 +642,7 @@ def get_email_logs(current_admin):
 @appointments_bp.route("/admin/respond/<event_id>", methods=["POST"])
 @admin_token_required
 def admin_respond_to_event(current_admin, event_id):
-    event = CalendarEvent.query.get(event_id)
+    event = _get_event(event_id)
     if not event:
         return jsonify({"error": "Event not found"}), 404
 
@@ -298,12 +661,15 @@ def admin_respond_to_event(current_admin, event_id):
         event.status = "rescheduled"
         if "start_time" in data and "end_time" in data:
             try:
-                event.start_time = parser.isoparse(data["start_time"])
-                event.end_time = parser.isoparse(data["end_time"])
+                event.start_time = _parse_time(data["start_time"])
+                event.end_time = _parse_time(data["end_time"])
             except Exception:
                 return jsonify({"error": "Invalid datetime format. Use ISO8601."}), 400
 
-    db.session.commit()
+    error = _slot_error(event)
+    if error:
+        db.session.rollback()
+        return error
 
     recipient = event.guest_email or (event.user.email if event.user else None)
     if recipient:
@@ -320,54 +686,188 @@ def admin_respond_to_event(current_admin, event_id):
         FitByLena Team
         """
 
-        send_email(
-            to_address=recipient,
+        outbox.queue_email(
+            recipient=recipient,
             subject=f"Your Appointment has been {event.status.capitalize()}",
             body=email_body
         )
 
+    error = _commit_slot()
+    if error:
+        return error
+    if recipient:
+        outbox.notify(current_app._get_current_object())
+
     return jsonify({
         "message": f"Event {event.status}",
         "event": event.serialize()
     }), 200
     
-    # -------------------------
-# ADMIN: VIEW ALL EVENTS
-# -------------------------
+
+
 # -------------------------
-# ADMIN: VIEW ALL EVENTS (with optional range filtering)
+# ADMIN: RECURRING SERIES
 # -------------------------
-@appointments_bp.route("/admin/all-events", methods=["GET"])
+@appointments_bp.route("/admin/series/<series_id>/respond", methods=["POST"])
 @admin_token_required
-def admin_get_all_events(current_admin):
-    start = request.args.get("start")
-    end = request.args.get("end")
+def admin_respond_to_series(current_admin, series_id):
+    series = _get_series(series_id)
+    if not series:
+        return jsonify({"error": "Series not found"}), 404
 
-    query = CalendarEvent.query
+    data = request.get_json()
+    action = data.get("action")  # "approve", "decline"
+    note = data.get("note", "")
+    if action not in ["approve", "decline"]:
+        return jsonify({"error": "Invalid action. Must be approve or decline"}), 400
+
+    was_blocking = series.status in availability.BLOCKING_STATUSES
+    series.status = "approved" if action == "approve" else "declined"
+    if series.status in availability.BLOCKING_STATUSES and not was_blocking:
+        # a declined series is approved again: its slots may have been taken since
+        starts = recurrence.rule_starts(series, series.first_start, series.last_end)
+        error = _series_slot_error(series, starts)
+        if error:
+            db.session.rollback()
+            return error
+
+    recipient = series.user.email if series.user else None
+    if recipient:
+        first = series.first_start.strftime('%b %d, %Y %I:%M %p')
+        email_body = f"""
+        Hi {recipient},
 
-    if start and end:
-        try:
-            start_dt = parser.isoparse(start)
-            end_dt = parser.isoparse(end)
-            query = query.filter(CalendarEvent.start_time >= start_dt,
-                                 CalendarEvent.end_time <= end_dt)
-        except Exception:
-            return jsonify({"error": "Invalid date range"}), 400
+        Your recurring appointment "{series.title}" ({series.event_type}) has been {series.status}.
 
-    events = query.order_by(CalendarEvent.start_time.asc()).all()
+        {f"Note from admin: {note}" if note else ""}
 
-    results = []
-    for e in events:
+        Starts: {first} ({series.occurrence_count} sessions)
+
+        Thank you,
+        FitByLena Team
+        """
+
+        outbox.queue_email(
+            recipient=recipient,
+            subject=f"Your Recurring Appointment has been {series.status.capitalize()}",
+            body=email_body
+        )
+
+    db.session.commit()
+    if recipient:
+        outbox.notify(current_app._get_current_object())
+
+    return jsonify({"message": f"Series {series.status}", "series": series.serialize()}), 200
+
+
+@appointments_bp.route("/admin/series/<series_id>/occurrences/<occurrence>", methods=["PUT"])
+@admin_token_required
+def admin_update_series_occurrence(current_admin, series_id, occurrence):
+    series = _get_series(series_id)
+    if not series:
+        return jsonify({"error": "Series not found"}), 404
+    return _change_occurrence(series, occurrence)
+
+
+@appointments_bp.route("/admin/series/<series_id>", methods=["DELETE"])
+@admin_token_required
+def admin_delete_series(current_admin, series_id):
+    series = _get_series(series_id)
+    if not series:
+        return jsonify({"error": "Series not found"}), 404
+
+    db.session.delete(series)
+    db.session.commit()
+    return jsonify({"message": "Series deleted by admin", "series_id": str(series.id)}), 200
+
+
+# -------------------------
+# ADMIN: VIEW ALL EVENTS (range-scoped, paginated)
+# -------------------------
+@appointments_bp.route("/admin/all-events", methods=["GET"])
+@admin_token_required
+def admin_get_all_events(current_admin):
+    try:
+        start_dt, end_dt = _feed_range()
+    except ValueError:
+        return jsonify({"error": f"Invalid date range (ISO dates, end after start, at most {FEED_MAX_DAYS} days)"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 500)), 1000))
+        after = cursors.decode(request.args["cursor"], datetime, uuid.UUID) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    in_range = [CalendarEvent.start_time >= start_dt, CalendarEvent.end_time <= end_dt]
+    series_in_range = [CalendarSeries.first_start < end_dt, CalendarSeries.last_end > start_dt]
+
+    # Nothing changed in the range since the client's copy: answer from one aggregate query
+    fingerprint = db.session.execute(select(
+        select(func.count()).where(*in_range).scalar_subquery(),
+        select(func.max(func.coalesce(CalendarEvent.updated_at, CalendarEvent.created_at)))
+        .where(*in_range).scalar_subquery(),
+        select(func.count()).where(*series_in_range).scalar_subquery(),
+        select(func.max(CalendarSeries.updated_at)).where(*series_in_range).scalar_subquery(),
+    )).one()
+    etag = hashlib.sha1(
+        f"{start_dt}|{end_dt}|{request.args.get('cursor')}|{limit}|{'|'.join(map(str, fingerprint))}".encode()
+    ).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    q = (select(CalendarEvent.id, CalendarEvent.title, CalendarEvent.description,
+                CalendarEvent.start_time, CalendarEvent.end_time, CalendarEvent.status,
+                CalendarEvent.event_type, CalendarEvent.guest_name, CalendarEvent.guest_email,
+                User.full_name, User.email)
+         .outerjoin(User, User.id == CalendarEvent.user_id)
+         .where(*in_range))
+    if after is not None:
+        q = q.where(tuple_(CalendarEvent.start_time, CalendarEvent.id) > tuple_(*after))
+    rows = db.session.execute(q.order_by(CalendarEvent.start_time, CalendarEvent.id).limit(limit)).all()
+
+    results = [{
+        "id": str(e.id),
+        "title": e.title,
+        "description": e.description,
+        "start_time": e.start_time.isoformat(),
+        "end_time": e.end_time.isoformat(),
+        "status": e.status,
+        "event_type": e.event_type,
+        "userName": e.full_name if e.full_name is not None else e.guest_name,
+        "userEmail": e.email if e.email is not None else e.guest_email,
+    } for e in rows]
+
+    # Series occurrences go on the page whose events span their start time
+    # (after the cursor, up to this page's last event; everything left on the last page)
+    lo = after[0] if after is not None else None
+    hi = rows[-1].start_time if len(rows) == limit else None
+    series = recurrence.series_query(start_dt, end_dt).options(joinedload(CalendarSeries.user)).all()
+    for o in recurrence.occurrences(series, start_dt, end_dt):
+        if o.start_time < start_dt or o.end_time > end_dt:
+            continue
+        if (lo is not None and o.start_time <= lo) or (hi is not None and o.start_time > hi):
+            continue
+        user = o.series.user
         results.append({
-            "id": str(e.id),
-            "title": e.title,
-            "description": e.description,
-            "start_time": e.start_time.isoformat(),
-            "end_time": e.end_time.isoformat(),
-            "status": e.status,
-            "event_type": e.event_type,
-            "userName": e.user.full_name if e.user else e.guest_name,
-            "userEmail": e.user.email if e.user else e.guest_email,
+            "id": o.id,
+            "series_id": str(o.series.id),
+            "occurrence": o.original_start.isoformat(),
+            "title": o.title,
+            "description": o.description,
+            "start_time": o.start_time.isoformat(),
+            "end_time": o.end_time.isoformat(),
+            "status": o.status,
+            "event_type": o.series.event_type,
+            "userName": user.full_name if user else None,
+            "userEmail": user.email if user else None,
         })
-
-    return jsonify(results), 200
+    results.sort(key=lambda r: r["start_time"])
+
+    # Array body as before; the next page is GET ?cursor=<X-Next-Cursor> with the same range
+    resp = jsonify(results)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    if len(rows) == limit:
+        resp.headers["X-Next-Cursor"] = cursors.encode(rows[-1].start_time, rows[-1].id)
+    return resp, 200
@@ -0,0 +1,184 @@
+# messages/bus.py
+"""
+Fan-out bus behind GET /api/messages/stream.
+
+Routes publish events (message.created / message.updated / message.deleted /
+conversation.read) to principal channels, "user:<id>" and "admin:<id>",
+after committing. Every open stream holds a Subscription on its own
+channel and blocks on it, so an idle client costs a sleeping thread and
+no queries.
+
+MESSAGES_BUS selects the transport:
+
+  memory    (default) in-process queues; enough for a single worker.
+  postgres  publish is a NOTIFY on MESSAGES_BUS_PG_CHANNEL; each worker
+            runs one LISTEN thread and hands events to its local
+            subscribers, so all gunicorn workers see every event.
+"""
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from sqlalchemy import func, select as sa_select
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 256
+PG_CHANNEL = os.getenv("MESSAGES_BUS_PG_CHANNEL", "messages_events")
+PG_PAYLOAD_LIMIT = 7900   # NOTIFY payloads must stay under 8000 bytes
+
+
+def principal_channel(kind, principal_id):
+    return f"{kind}:{principal_id}"
+
+def conversation_channels(conv):
+    return [principal_channel("user", conv.user_id), principal_channel("admin", conv.admin_id)]
+
+
+class Subscription:
+    def __init__(self, bus, channel):
+        self.bus = bus
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def get(self, timeout=None):
+        """Next event dict, or None after `timeout` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class InProcessBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}   # channel -> set(Subscription)
+
+    def subscribe(self, channel):
+        sub = Subscription(self, channel)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.channel)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.channel]
+
+    def dispatch(self, channels, event):
+        with self._lock:
+            targets = [s for ch in channels for s in self._subs.get(ch, ())]
+        for sub in targets:
+            try:
+                sub.queue.put_nowait(event)
+            except queue.Full:
+                # stalled client: drop the event rather than block the publisher;
+                # the client refetches when it sees the "resync" event
+                log.warning("messages bus: subscriber queue full on %s", sub.channel)
+                _reset_queue(sub, {"type": "resync"})
+
+    def publish(self, channels, event):
+        self.dispatch([str(c) for c in channels], event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+
+def _reset_queue(sub, event):
+    try:
+        while True:
+            sub.queue.get_nowait()
+    except queue.Empty:
+        pass
+    try:
+        sub.queue.put_nowait(event)
+    except queue.Full:
+        pass
+
+
+class PostgresBus(InProcessBus):
+    """NOTIFY to publish, one LISTEN thread per process to deliver locally."""
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._listener = None
+
+    def subscribe(self, channel):
+        self._ensure_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channels, event):
+        payload = json.dumps({"channels": [str(c) for c in channels], "event": event}, default=str)
+        if len(payload.encode()) > PG_PAYLOAD_LIMIT:
+            # too large for NOTIFY: send the envelope only, clients refetch the message
+            slim = dict(event, message=None, truncated=True)
+            payload = json.dumps({"channels": [str(c) for c in channels], "event": slim}, default=str)
+        with self.engine.connect() as conn:
+            conn.execute(sa_select(func.pg_notify(PG_CHANNEL, payload)))
+            conn.commit()
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen, name="messages-bus-listener", daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                self._listen_once()
+            except Exception:
+                log.exception("messages bus: LISTEN connection lost, reconnecting")
+                time.sleep(1)
+
+    def _listen_once(self):
+        raw = self.engine.raw_connection()
+        conn = raw.driver_connection
+        raw.detach()   # dedicated for the life of the process, not returned to the pool
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{PG_CHANNEL}"')
+        while True:
+            if select.select([conn], [], [], 30) == ([], [], []):
+                continue
+            conn.poll()
+            while conn.notifies:
+                note = conn.notifies.pop(0)
+                try:
+                    data = json.loads(note.payload)
+                    self.dispatch(data["channels"], data["event"])
+                except (ValueError, KeyError):
+                    log.warning("messages bus: bad payload %r", note.payload[:200])
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+def get_bus():
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            kind = os.getenv("MESSAGES_BUS", "memory").lower()
+            _bus = PostgresBus(db.engine) if kind == "postgres" else InProcessBus()
+        return _bus
+
+def publish(channels, event_type, **data):
+    """Best effort: called after commit, so a bus failure must not fail the request."""
+    try:
+        get_bus().publish(channels, dict(data, type=event_type))
+    except Exception:
+        log.exception("messages bus: publish %s failed", event_type)
@@ -1,10 +1,14 @@
 # messages/models.py
 import uuid
 from datetime import datetime, timezone
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Index, CheckConstraint
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy import Index, CheckConstraint, FetchedValue
+from sqlalchemy.orm import deferred
 from extensions import db
 
+# text search configuration used by the messages_body_tsv trigger and /search
+SEARCH_CONFIG = "english"
+
 def utcnow():
     return datetime.now(timezone.utc)
 
@@ -16,9 +20,7 @@ class Conversation(db.Model):
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     admin_id = db.Column(UUID(as_uuid=True), db.ForeignKey("admins.id", ondelete="CASCADE"), nullable=False)
 
-    last_message_at = db.Column(db.DateTime(timezone=True), default=utcnow, index=True)
-    user_unread_count = db.Column(db.Integer, default=0, nullable=False)
-    admin_unread_count = db.Column(db.Integer, default=0, nullable=False)
+    last_message_at = db.Column(db.DateTime(timezone=True), default=utcnow, index=True, nullable=False)
 
     created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
 
@@ -28,6 +30,9 @@ class Conversation(db.Model):
 
     __table_args__ = (
         Index("ix_conversation_unique_pair", "user_id", "admin_id", unique=True),
+        # inbox keyset pagination, newest activity first
+        Index("ix_conversations_admin_last_message", "admin_id", "last_message_at", "id"),
+        Index("ix_conversations_user_last_message", "user_id", "last_message_at", "id"),
     )
 
 
@@ -42,12 +47,11 @@ class Message(db.Model):
     sender_admin_id = db.Column(UUID(as_uuid=True), db.ForeignKey("admins.id", ondelete="SET NULL"), nullable=True)
 
     body = db.Column(db.Text, nullable=False)
+    # to_tsvector(SEARCH_CONFIG, body), maintained by the messages_body_tsv trigger
+    body_tsv = deferred(db.Column(TSVECTOR, server_default=FetchedValue(), server_onupdate=FetchedValue(), nullable=True))
 
     created_at = db.Column(db.DateTime(timezone=True), default=utcnow, index=True, nullable=False)
 
-    read_by_user_at  = db.Column(db.DateTime(timezone=True), nullable=True)
-    read_by_admin_at = db.Column(db.DateTime(timezone=True), nullable=True)
-
     # NEW: per-viewer soft delete
     deleted_for_user_at  = db.Column(db.DateTime(timezone=True), nullable=True)
     deleted_for_admin_at = db.Column(db.DateTime(timezone=True), nullable=True)
@@ -59,67 +63,25 @@ class Message(db.Model):
     __table_args__ = (
         CheckConstraint("sender_role in ('user','admin')", name="ck_messages_sender_role"),
         Index("ix_messages_conv_created", "conversation_id", "created_at"),
+        Index("ix_messages_body_tsv", "body_tsv", postgresql_using="gin"),
     )
 
 
+class ConversationRead(db.Model):
+    """
+    Read watermark of one participant ('user' or 'admin') in a conversation:
+    every message created at or before read_up_to counts as read. Unread
+    counts are derived from it via ix_messages_conv_created.
+    """
+    __tablename__ = "conversation_reads"
 
+    conversation_id = db.Column(UUID(as_uuid=True), db.ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    participant_role = db.Column(db.String(10), primary_key=True)
 
-"""""""""
-# messages/models.py
-# messages/models.py
-import uuid
-from datetime import datetime, timezone
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Index, CheckConstraint
-from extensions import db
-
-class Conversation(db.Model):
-    __tablename__ = "conversations"
-
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-
-    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    admin_id = db.Column(UUID(as_uuid=True), db.ForeignKey("admins.id", ondelete="CASCADE"), nullable=False)
-
-    # ✅ make these timezone-aware and default to UTC
-    last_message_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
-    user_unread_count = db.Column(db.Integer, default=0, nullable=False)
-    admin_unread_count = db.Column(db.Integer, default=0, nullable=False)
-
-    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), nullable=False)
-
-    __table_args__ = (
-        Index("ix_conversation_unique_pair", "user_id", "admin_id", unique=True),
-    )
-
-
-class Message(db.Model):
-    __tablename__ = "messages"
-
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    conversation_id = db.Column(UUID(as_uuid=True), db.ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
-
-    sender_role = db.Column(db.String(10), nullable=False)
-    sender_user_id  = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
-    sender_admin_id = db.Column(UUID(as_uuid=True), db.ForeignKey("admins.id", ondelete="SET NULL"), nullable=True)
-
-    body = db.Column(db.Text, nullable=False)
-
-    # ✅ timezone-aware + UTC default
-    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True, nullable=False)
-
-    # ✅ receipts timezone-aware too
-    read_by_user_at  = db.Column(db.DateTime(timezone=True), nullable=True)
-    read_by_admin_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    read_up_to = db.Column(db.DateTime(timezone=True), nullable=False)
+    last_read_message_id = db.Column(UUID(as_uuid=True), db.ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
+    read_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
 
     __table_args__ = (
-        CheckConstraint("sender_role in ('user','admin')", name="ck_messages_sender_role"),
-        Index("ix_messages_conv_created", "conversation_id", "created_at"),
+        CheckConstraint("participant_role in ('user','admin')", name="ck_conversation_reads_role"),
     )
-
-
-
-
-
-
-"""""""""""
\ No newline at end of file
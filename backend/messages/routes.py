@@ -1,13 +1,20 @@
 # messages/routes.py
-from flask import Blueprint, request, jsonify
+import json
+import uuid
+from flask import Blueprint, Response, request, jsonify
 from datetime import datetime, timedelta, timezone
 from uuid import UUID as UUIDType
+from sqlalchemy import select, func, case, cast, literal_column, true, tuple_, REAL
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm.attributes import set_committed_value
 
 from extensions import db
-from messages.models import Conversation, Message
+from messages.models import Conversation, Message, ConversationRead, SEARCH_CONFIG
 from admin.models import Admin
 from users.models import User
-from messages.auth import resolve_principal, AuthError
+from utils.auth import resolve_principal, AuthError
+from utils import cursors
+from messages import bus
 
 messages_bp = Blueprint("messages", __name__, url_prefix="/api/messages")
 
@@ -16,6 +23,11 @@ messages_bp = Blueprint("messages", __name__, url_prefix="/api/messages")
 # ---------------------------------
 
 EDIT_GRACE = timedelta(minutes=15)
+PEER_ROLE = {"admin": "user", "user": "admin"}
+STREAM_HEARTBEAT_SECONDS = 15
+PREVIEW_CHARS = 140
+SEARCH_MAX_QUERY_CHARS = 200
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=24, MinWords=8, MaxFragments=2"
 
 def _now_utc():
     return datetime.now(timezone.utc)
@@ -28,18 +40,52 @@ def _iso_z(dt):
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
 
-def _serialize_conversation(c: Conversation, viewer_kind: str):
-    """Return a dict for a conversation depending on who is viewing (admin vs user)."""
+def _peer_display_name(viewer_kind: str, full_name, email=None):
     if viewer_kind == "admin":
-        u = User.query.get(c.user_id)
-        peer = (u.full_name or u.email or "User") if u else "User"
-        unread = c.admin_unread_count
-    else:
-        a = Admin.query.get(c.admin_id)
-        peer = (a.full_name or "Coach/Admin") if a else "Coach/Admin"
-        unread = c.user_unread_count
+        return full_name or email or "User"
+    return full_name or "Coach/Admin"
+
+def _unread_count_expr(conversation_id, reader_kind: str):
+    """
+    Scalar subquery: the peer's messages created after the reader's watermark
+    (a range scan on ix_messages_conv_created).
+    """
+    watermark = (
+        select(ConversationRead.read_up_to)
+        .where(ConversationRead.conversation_id == conversation_id,
+               ConversationRead.participant_role == reader_kind)
+        .correlate_except(ConversationRead)
+        .scalar_subquery()
+    )
+    return (
+        select(func.count())
+        .select_from(Message)
+        .where(
+            Message.conversation_id == conversation_id,
+            Message.created_at > func.coalesce(watermark, literal_column("'-infinity'::timestamptz")),
+            Message.sender_role == PEER_ROLE[reader_kind],
+            Message.moderation_deleted_at.is_(None),
+        )
+        .correlate_except(Message)
+        .scalar_subquery()
+    )
 
-    return {
+def _serialize_conversation(c: Conversation, viewer_kind: str, peer=None, last_message=None, unread=None):
+    """
+    Return a dict for a conversation depending on who is viewing (admin vs user).
+    `peer` / `unread` are passed in when the caller already loaded them (list view).
+    """
+    if peer is None:
+        if viewer_kind == "admin":
+            u = User.query.get(c.user_id)
+            peer = _peer_display_name("admin", u.full_name, u.email) if u else "User"
+        else:
+            a = Admin.query.get(c.admin_id)
+            peer = _peer_display_name("user", a.full_name) if a else "Coach/Admin"
+    if unread is None:
+        unread = db.session.execute(select(_unread_count_expr(c.id, viewer_kind))).scalar()
+
+    out = {
         "id": str(c.id),
         "user_id": str(c.user_id),
         "admin_id": str(c.admin_id),
@@ -48,16 +94,120 @@ def _serialize_conversation(c: Conversation, viewer_kind: str):
         "last_message_at": _iso_z(c.last_message_at),
         "created_at": _iso_z(c.created_at),
     }
+    if last_message is not None:
+        out["last_message"] = last_message
+    return out
+
+def _encode_cursor(ts, row_id):
+    return cursors.encode(ts, row_id)
+
+def _decode_cursor(cursor: str):
+    """(timestamp, UUID) from a cursor made by _encode_cursor; ValueError if malformed."""
+    return cursors.decode(cursor, datetime, UUIDType)
+
+def _inbox_query(kind: str, me_id, limit: int, after=None):
+    """
+    One page of a principal's conversations, newest activity first, with the
+    peer's name (join) and the last message visible to the viewer (lateral).
+    Keyset on (last_message_at, id): ix_conversations_<kind>_last_message.
+    """
+    if kind == "admin":
+        Peer, peer_fk, peer_cols = User, Conversation.user_id, [User.full_name, User.email]
+        mine = [Conversation.admin_id == me_id, Conversation.hidden_for_admin_at.is_(None)]
+        visible = Message.deleted_for_admin_at.is_(None)
+    else:
+        Peer, peer_fk, peer_cols = Admin, Conversation.admin_id, [Admin.full_name]
+        mine = [Conversation.user_id == me_id, Conversation.hidden_for_user_at.is_(None)]
+        visible = Message.deleted_for_user_at.is_(None)
+
+    last = (
+        select(Message.id, Message.sender_role, Message.body, Message.created_at)
+        .where(Message.conversation_id == Conversation.id, Message.moderation_deleted_at.is_(None), visible)
+        .order_by(Message.created_at.desc())
+        .limit(1)
+        .lateral("last_message")
+    )
+    unread = _unread_count_expr(Conversation.id, kind).label("unread_count")
+    q = (
+        select(Conversation, *peer_cols, unread, last.c.id, last.c.sender_role, last.c.body, last.c.created_at)
+        .outerjoin(Peer, Peer.id == peer_fk)
+        .outerjoin(last, true())
+        .where(*mine)
+    )
+    if after is not None:
+        q = q.where(tuple_(Conversation.last_message_at, Conversation.id) < tuple_(*after))
+    return q.order_by(Conversation.last_message_at.desc(), Conversation.id.desc()).limit(limit)
+
+def _encode_search_cursor(rank, ts, row_id):
+    return cursors.encode(ts, row_id, repr(rank))
+
+def _decode_search_cursor(cursor: str):
+    """(rank, timestamp, UUID) from a cursor made by _encode_search_cursor."""
+    ts, row_id, rank = cursors.decode(cursor, datetime, UUIDType, float)
+    return rank, ts, row_id
+
+def _html_escaped(col):
+    return func.replace(func.replace(func.replace(col, "&", "&amp;"), "<", "&lt;"), ">", "&gt;")
+
+def _search_query(kind: str, me_id, q: str, limit: int, after=None):
+    """
+    One page of search hits visible to the viewer: (Message, rank, snippet,
+    *peer name columns). Matches come from ix_messages_body_tsv; only the
+    page is ranked into order and only its rows get a ts_headline snippet.
+    Keyset on (rank, created_at, id); rank is a float4, so the cursor value
+    is compared as one.
+    """
+    if kind == "admin":
+        Peer, peer_fk, peer_cols = User, Conversation.user_id, [User.full_name, User.email]
+        mine = [Conversation.admin_id == me_id, Conversation.hidden_for_admin_at.is_(None)]
+        visible = Message.deleted_for_admin_at.is_(None)
+    else:
+        Peer, peer_fk, peer_cols = Admin, Conversation.admin_id, [Admin.full_name]
+        mine = [Conversation.user_id == me_id, Conversation.hidden_for_user_at.is_(None)]
+        visible = Message.deleted_for_user_at.is_(None)
+
+    tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Message.body_tsv, tsquery)
+
+    hits = (
+        select(Message.id, rank.label("rank"), Message.created_at)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .where(Message.body_tsv.op("@@")(tsquery), Message.moderation_deleted_at.is_(None), visible, *mine)
+    )
+    if after is not None:
+        after_rank, after_ts, after_id = after
+        hits = hits.where(tuple_(rank, Message.created_at, Message.id)
+                          < tuple_(cast(after_rank, REAL), after_ts, after_id))
+    hits = hits.order_by(rank.desc(), Message.created_at.desc(), Message.id.desc()).limit(limit).subquery("hits")
+
+    snippet = func.ts_headline(SEARCH_CONFIG, _html_escaped(Message.body), tsquery, SEARCH_HEADLINE_OPTIONS)
+    return (
+        select(Message, hits.c.rank, snippet, *peer_cols)
+        .join(hits, hits.c.id == Message.id)
+        .join(Conversation, Conversation.id == Message.conversation_id)
+        .outerjoin(Peer, Peer.id == peer_fk)
+        .order_by(hits.c.rank.desc(), hits.c.created_at.desc(), hits.c.id.desc())
+    )
+
+def _conversation_reads(conversation_id):
+    """{'user': ConversationRead, 'admin': ConversationRead} for one conversation."""
+    rows = ConversationRead.query.filter_by(conversation_id=conversation_id).all()
+    return {r.participant_role: r for r in rows}
+
+def _serialize_message(m: Message, reads=None):
+    """read_by_<role>_at comes from that participant's watermark (see _conversation_reads)."""
+    def receipt(role):
+        r = (reads or {}).get(role)
+        return _iso_z(r.read_at) if r and m.created_at <= r.read_up_to else None
 
-def _serialize_message(m: Message):
     return {
         "id": str(m.id),
         "conversation_id": str(m.conversation_id),
         "sender_role": m.sender_role,
         "body": m.body,
         "created_at": _iso_z(m.created_at),
-        "read_by_user_at": _iso_z(m.read_by_user_at),
-        "read_by_admin_at": _iso_z(m.read_by_admin_at),
+        "read_by_user_at": receipt("user"),
+        "read_by_admin_at": receipt("admin"),
     }
 
 def _ensure_uuid(v, name="id"):
@@ -68,13 +218,23 @@ def _ensure_uuid(v, name="id"):
         raise BadRequest(f"Invalid {name}")
 
 def _get_or_create_conversation(user_id, admin_id) -> Conversation:
-    conv = Conversation.query.filter_by(user_id=user_id, admin_id=admin_id).one_or_none()
-    if conv:
-        return conv
-    conv = Conversation(user_id=user_id, admin_id=admin_id, last_message_at=_now_utc())
-    db.session.add(conv)
-    db.session.commit()
-    return conv
+    """
+    The (user, admin) conversation, created if missing. The insert is
+    ON CONFLICT DO NOTHING on ix_conversation_unique_pair, so concurrent
+    first messages (any worker) converge on one row instead of one of them
+    failing with a unique violation; the loser's insert waits for the
+    winner's commit and then reads its row. Joins the caller's transaction.
+    """
+    now = _now_utc()
+    new_id = db.session.execute(
+        pg_insert(Conversation)
+        .values(id=uuid.uuid4(), user_id=user_id, admin_id=admin_id, created_at=now, last_message_at=now)
+        .on_conflict_do_nothing(index_elements=[Conversation.user_id, Conversation.admin_id])
+        .returning(Conversation.id)
+    ).scalar()
+    if new_id is not None:
+        return db.session.get(Conversation, new_id)
+    return Conversation.query.filter_by(user_id=user_id, admin_id=admin_id).one()
 
 def _assert_member(conv: Conversation, kind: str, me) -> bool:
     if kind == "admin" and conv.admin_id != me.id:
@@ -83,12 +243,57 @@ def _assert_member(conv: Conversation, kind: str, me) -> bool:
         return False
     return True
 
-def _bump_unread_after_send(conv: Conversation, sender_kind: str):
-    if sender_kind == "admin":
-        conv.user_unread_count += 1
-    else:
-        conv.admin_unread_count += 1
-    conv.last_message_at = _now_utc()
+def _touch_after_send(conv: Conversation, sent_at):
+    """
+    Bump last_message_at in the database. greatest() keeps concurrent
+    senders from moving it backwards when commits land out of order.
+    """
+    last = db.session.execute(
+        Conversation.__table__.update()
+        .where(Conversation.id == conv.id)
+        .values(last_message_at=func.greatest(Conversation.last_message_at, sent_at))
+        .returning(Conversation.last_message_at)
+    ).scalar()
+    set_committed_value(conv, "last_message_at", last)
+
+def _mark_read(conv: Conversation, reader_kind: str, now, up_to=None) -> int:
+    """
+    Move the reader's watermark to message `up_to` ((id, created_at)), or to
+    the newest message when None. One upsert regardless of how many messages
+    that covers; the watermark never moves backwards. Returns the new
+    unread count.
+    """
+    if up_to is None:
+        up_to = (
+            db.session.query(Message.id, Message.created_at)
+            .filter(Message.conversation_id == conv.id)
+            .order_by(Message.created_at.desc())
+            .first()
+        )
+
+    if up_to is not None:
+        message_id, created_at = up_to
+        cur = ConversationRead.__table__.c
+        stmt = pg_insert(ConversationRead).values(
+            conversation_id=conv.id,
+            participant_role=reader_kind,
+            read_up_to=created_at,
+            last_read_message_id=message_id,
+            read_at=now,
+        )
+        advanced = stmt.excluded.read_up_to >= cur.read_up_to
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[cur.conversation_id, cur.participant_role],
+                set_={
+                    "read_up_to": func.greatest(cur.read_up_to, stmt.excluded.read_up_to),
+                    "last_read_message_id": case((advanced, stmt.excluded.last_read_message_id), else_=cur.last_read_message_id),
+                    "read_at": case((advanced, stmt.excluded.read_at), else_=cur.read_at),
+                },
+            )
+        )
+
+    return db.session.execute(select(_unread_count_expr(conv.id, reader_kind))).scalar()
 
 # ---------------------------------
 # Conversation Routes
@@ -101,17 +306,37 @@ def list_conversations():
     except AuthError as e:
         return jsonify({"error": "Unauthorized", "message": str(e)}), 401
 
-    q = Conversation.query
-    if kind == "admin":
-        q = q.filter(Conversation.admin_id == me.id, Conversation.hidden_for_admin_at.is_(None))
-    else:
-        q = q.filter(Conversation.user_id == me.id, Conversation.hidden_for_user_at.is_(None))
-
     limit = max(1, min(int(request.args.get("limit", 20)), 100))
-    offset = max(0, int(request.args.get("offset", 0)))
-
-    items = q.order_by(Conversation.last_message_at.desc().nullslast()).offset(offset).limit(limit).all()
-    return jsonify([_serialize_conversation(c, kind) for c in items]), 200
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_cursor(request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    rows = db.session.execute(_inbox_query(kind, me.id, limit, after)).all()
+
+    items = []
+    for row in rows:
+        conv, peer_cols, unread = row[0], row[1:-5], row[-5]
+        msg_id, sender_role, body, created_at = row[-4:]
+        preview = None
+        if msg_id is not None:
+            preview = {
+                "id": str(msg_id),
+                "sender_role": sender_role,
+                "body": body[:PREVIEW_CHARS],
+                "created_at": _iso_z(created_at),
+            }
+        peer = _peer_display_name(kind, *peer_cols)
+        items.append(_serialize_conversation(conv, kind, peer=peer, last_message=preview, unread=unread))
+
+    # Array body as before; the next page is GET ?cursor=<X-Next-Cursor>
+    resp = jsonify(items)
+    if len(rows) == limit:
+        tail = rows[-1][0]
+        resp.headers["X-Next-Cursor"] = _encode_cursor(tail.last_message_at, tail.id)
+    return resp, 200
 
 
 @messages_bp.route("/conversations", methods=["POST"])
@@ -218,7 +443,8 @@ def list_messages(conversation_id):
 
     msgs = q.order_by(Message.created_at.desc()).limit(limit).all()
     msgs = list(reversed(msgs))  # ascending order
-    return jsonify([_serialize_message(m) for m in msgs]), 200
+    reads = _conversation_reads(conv.id)
+    return jsonify([_serialize_message(m, reads) for m in msgs]), 200
 
 
 @messages_bp.route("/send", methods=["POST"])
@@ -270,339 +496,18 @@ def send_message():
         body=body,
     )
     db.session.add(msg)
-    _bump_unread_after_send(conv, kind)
-    db.session.commit()
-
-    return jsonify(_serialize_message(msg)), 201
-
-
-@messages_bp.route("/conversations/<uuid:conversation_id>/read", methods=["POST"])
-def mark_read(conversation_id):
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    conv = Conversation.query.get_or_404(conversation_id)
-    if not _assert_member(conv, kind, me):
-        return jsonify({"error": "Forbidden"}), 403
-
-    now = _now_utc()
-    q = Message.query.filter(Message.conversation_id == conv.id, Message.moderation_deleted_at.is_(None))
-
-    if kind == "admin":
-        for m in q.filter(Message.read_by_admin_at.is_(None)).all():
-            m.read_by_admin_at = now
-        conv.admin_unread_count = 0
-    else:
-        for m in q.filter(Message.read_by_user_at.is_(None)).all():
-            m.read_by_user_at = now
-        conv.user_unread_count = 0
-
-    db.session.commit()
-    return jsonify({"ok": True, "read_at": _iso_z(now)}), 200
-
-
-
-
-
-"""""
-# messages/routes.py
-
-from flask import Blueprint, request, jsonify
-from datetime import datetime, timedelta, timezone
-from uuid import UUID as UUIDType
-
-from extensions import db
-from messages.models import Conversation, Message
-from admin.models import Admin
-from users.models import User
-
-from messages.auth import resolve_principal, AuthError
-
-messages_bp = Blueprint("messages", __name__, url_prefix="/api/messages")
-
-# ---- helpers ----
-
-EDIT_GRACE = timedelta(minutes=15)
-
-def _now_utc():
-    return datetime.now(timezone.utc)
-
-def _iso_z(dt):
-   
-    if dt is None:
-        return None
-    if dt.tzinfo is None:
-        dt = dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
-
-def _serialize_conversation(c: Conversation, viewer_kind: str):
-  
-    if viewer_kind == "admin":
-        u = User.query.get(c.user_id)
-        peer = (u.full_name or u.email or "User") if u else "User"
-        unread = c.admin_unread_count
-    else:
-        a = Admin.query.get(c.admin_id)
-        peer = (a.full_name or "Coach/Admin") if a else "Coach/Admin"
-        unread = c.user_unread_count
-
-    return {
-        "id": str(c.id),
-        "user_id": str(c.user_id),
-        "admin_id": str(c.admin_id),
-        "peer_display_name": peer,
-        "unread_count": unread,
-        "last_message_at": _iso_z(c.last_message_at),
-        "created_at": _iso_z(c.created_at),
-    }
-
-def _serialize_message(m: Message):
-    return {
-        "id": str(m.id),
-        "conversation_id": str(m.conversation_id),
-        "sender_role": m.sender_role,
-        "body": m.body,
-        "created_at": _iso_z(m.created_at),
-        "read_by_user_at": _iso_z(m.read_by_user_at),
-        "read_by_admin_at": _iso_z(m.read_by_admin_at),
-    }
-
-def _ensure_uuid(v, name: str = "id"):
-    try:
-        return UUIDType(str(v))
-    except Exception:
-        from werkzeug.exceptions import BadRequest
-        raise BadRequest(f"Invalid {name}")
-
-def _get_or_create_conversation(user_id, admin_id) -> Conversation:
-    conv = Conversation.query.filter_by(user_id=user_id, admin_id=admin_id).one_or_none()
-    if conv:
-        return conv
-    conv = Conversation(user_id=user_id, admin_id=admin_id, last_message_at=_now_utc())
-    db.session.add(conv)
+    db.session.flush()
+    _touch_after_send(conv, msg.created_at)
     db.session.commit()
-    return conv
-
-def _assert_member(conv: Conversation, kind: str, me) -> bool:
-    if kind == "admin" and conv.admin_id != me.id:
-        return False
-    if kind == "user" and conv.user_id != me.id:
-        return False
-    return True
-
-def _bump_unread_after_send(conv: Conversation, sender_kind: str):
-    if sender_kind == "admin":
-        conv.user_unread_count += 1
-    else:
-        conv.admin_unread_count += 1
-    conv.last_message_at = _now_utc()
-
-# ---- conversations ----
-
-@messages_bp.route("/conversations", methods=["GET"])
-def list_conversations():
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    q = Conversation.query
-    if kind == "admin":
-        q = q.filter(
-            Conversation.admin_id == me.id,
-            Conversation.hidden_for_admin_at.is_(None),   # hide conversations the admin hid
-        )
-    else:
-        q = q.filter(
-            Conversation.user_id == me.id,
-            Conversation.hidden_for_user_at.is_(None),    # hide conversations the user hid
-        )
-
-    limit = max(1, min(int(request.args.get("limit", 20)), 100))
-    offset = max(0, int(request.args.get("offset", 0)))
-
-    items = (
-        q.order_by(Conversation.last_message_at.desc().nullslast())
-         .offset(offset).limit(limit).all()
-    )
-    return jsonify([_serialize_conversation(c, kind) for c in items]), 200
 
-
-@messages_bp.route("/conversations", methods=["POST"])
-def create_or_fetch_conversation():
-   
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    data = request.get_json() or {}
-
-    if kind == "admin":
-        user_id = data.get("user_id")
-        _ensure_uuid(user_id, "user_id")
-        if not User.query.get(user_id):
-            return jsonify({"error": "User not found"}), 404
-        conv = _get_or_create_conversation(user_id=user_id, admin_id=me.id)
-        # If previously hidden by admin, unhide on explicit create/fetch
-        conv.hidden_for_admin_at = None
-    else:
-        admin_id = data.get("admin_id")
-        _ensure_uuid(admin_id, "admin_id")
-        if not Admin.query.get(admin_id):
-            return jsonify({"error": "Admin not found"}), 404
-        conv = _get_or_create_conversation(user_id=me.id, admin_id=admin_id)
-        # If previously hidden by user, unhide
-        conv.hidden_for_user_at = None
-
-    db.session.commit()
-    return jsonify(_serialize_conversation(conv, kind)), 200
-
-
-@messages_bp.route("/conversations/<uuid:conversation_id>", methods=["GET"])
-def get_conversation(conversation_id):
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    conv = Conversation.query.get_or_404(conversation_id)
-    if not _assert_member(conv, kind, me):
-        return jsonify({"error": "Forbidden"}), 403
-    return jsonify(_serialize_conversation(conv, kind)), 200
-
-
-@messages_bp.route("/conversations/<uuid:conversation_id>", methods=["DELETE"])
-def delete_conversation(conversation_id):
-    
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    conv = Conversation.query.get_or_404(conversation_id)
-    if not _assert_member(conv, kind, me):
-        return jsonify({"error": "Forbidden"}), 403
-
-    mode = (request.args.get("for") or "me").lower()
-    now = _now_utc()
-
-    if mode == "everyone":
-        if kind != "admin" or conv.admin_id != me.id:
-            return jsonify({"error": "Only the admin participant can hide for everyone"}), 403
-        conv.hidden_for_admin_at = now
-        conv.hidden_for_user_at = now
-    else:
-        if kind == "admin":
-            conv.hidden_for_admin_at = now
-        else:
-            conv.hidden_for_user_at = now
-
-    db.session.commit()
-    return jsonify({"ok": True}), 200
-
-# ---- messages ----
-
-@messages_bp.route("/conversations/<uuid:conversation_id>/messages", methods=["GET"])
-def list_messages(conversation_id):
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    conv = Conversation.query.get_or_404(conversation_id)
-    if not _assert_member(conv, kind, me):
-        return jsonify({"error": "Forbidden"}), 403
-
-    limit = max(1, min(int(request.args.get("limit", 30)), 100))
-    before_iso = request.args.get("before")
-    q = Message.query.filter(Message.conversation_id == conv.id)
-
-    # Hide moderation-deleted for everyone
-    q = q.filter(Message.moderation_deleted_at.is_(None))
-
-    # Hide per-viewer soft-deleted
-    if kind == "admin":
-        q = q.filter(Message.deleted_for_admin_at.is_(None))
-    else:
-        q = q.filter(Message.deleted_for_user_at.is_(None))
-
-    if before_iso:
-        try:
-            parsed = before_iso.replace("Z", "+00:00") if before_iso.endswith("Z") else before_iso
-            before_dt = datetime.fromisoformat(parsed)
-            if before_dt.tzinfo is None:
-                before_dt = before_dt.replace(tzinfo=timezone.utc)
-            q = q.filter(Message.created_at < before_dt)
-        except Exception:
-            pass
-
-    msgs = q.order_by(Message.created_at.desc()).limit(limit).all()
-    msgs = list(reversed(msgs))  # ascending for UI
-    return jsonify([_serialize_message(m) for m in msgs]), 200
-
-
-@messages_bp.route("/send", methods=["POST"])
-def send_message():
-    try:
-        kind, me = resolve_principal()
-    except AuthError as e:
-        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
-
-    data = request.get_json() or {}
-    body = (data.get("body") or "").strip()
-    if not body:
-        return jsonify({"error": "Message body is required"}), 400
-
-    conv = None
-    conv_id = data.get("conversation_id")
-    if conv_id:
-        _ensure_uuid(conv_id, "conversation_id")
-        conv = Conversation.query.get(conv_id)
-        if not conv:
-            return jsonify({"error": "Conversation not found"}), 404
-        if not _assert_member(conv, kind, me):
-            return jsonify({"error": "Forbidden"}), 403
-        # Unhide for sender if they had hidden it
-        if kind == "admin":
-            conv.hidden_for_admin_at = None
-        else:
-            conv.hidden_for_user_at = None
-    else:
-        if kind == "admin":
-            user_id = data.get("user_id")
-            _ensure_uuid(user_id, "user_id")
-            if not User.query.get(user_id):
-                return jsonify({"error": "User not found"}), 404
-            conv = _get_or_create_conversation(user_id=user_id, admin_id=me.id)
-            conv.hidden_for_admin_at = None
-        else:
-            admin_id = data.get("admin_id")
-            _ensure_uuid(admin_id, "admin_id")
-            if not Admin.query.get(admin_id):
-                return jsonify({"error": "Admin not found"}), 404
-            conv = _get_or_create_conversation(user_id=me.id, admin_id=admin_id)
-            conv.hidden_for_user_at = None
-
-    msg = Message(
-        conversation_id=conv.id,
-        sender_role=kind,
-        sender_user_id=me.id if kind == "user" else None,
-        sender_admin_id=me.id if kind == "admin" else None,
-        body=body,
-    )
-    db.session.add(msg)
-    _bump_unread_after_send(conv, kind)
-    db.session.commit()
-
-    return jsonify(_serialize_message(msg)), 201
+    payload = _serialize_message(msg)
+    bus.publish(bus.conversation_channels(conv), "message.created",
+                conversation_id=str(conv.id), message=payload)
+    return jsonify(payload), 201
 
 
 @messages_bp.route("/messages/<uuid:message_id>", methods=["PATCH"])
 def edit_message(message_id):
-  
     try:
         kind, me = resolve_principal()
     except AuthError as e:
@@ -631,12 +536,15 @@ def edit_message(message_id):
 
     msg.body = body
     db.session.commit()
-    return jsonify(_serialize_message(msg)), 200
+
+    payload = _serialize_message(msg, _conversation_reads(conv.id))
+    bus.publish(bus.conversation_channels(conv), "message.updated",
+                conversation_id=str(conv.id), message=payload)
+    return jsonify(payload), 200
 
 
 @messages_bp.route("/messages/<uuid:message_id>", methods=["DELETE"])
 def delete_message(message_id):
-    
     try:
         kind, me = resolve_principal()
     except AuthError as e:
@@ -660,19 +568,14 @@ def delete_message(message_id):
         msg.moderation_deleted_by_admin_id = me.id
         msg.deleted_for_user_at = now
         msg.deleted_for_admin_at = now
-
-        # Adjust unread counters only if recipient hadn’t read yet
-        if msg.sender_role == "admin" and msg.read_by_user_at is None:
-            conv.user_unread_count = max(0, conv.user_unread_count - 1)
-        if msg.sender_role == "user" and msg.read_by_admin_at is None:
-            conv.admin_unread_count = max(0, conv.admin_unread_count - 1)
-
+        channels = bus.conversation_channels(conv)
     else:
-        # for=me: hide only for caller; do not change unread counters
+        # for=me: hide only for caller
         if kind == "admin":
             msg.deleted_for_admin_at = now
         else:
             msg.deleted_for_user_at = now
+        channels = [bus.principal_channel(kind, me.id)]
 
     # Recompute last_message_at using latest non-moderation-deleted message
     latest = (
@@ -684,15 +587,17 @@ def delete_message(message_id):
         .order_by(Message.created_at.desc())
         .first()
     )
-    conv.last_message_at = latest.created_at if latest else None
+    conv.last_message_at = latest.created_at if latest else conv.created_at
 
     db.session.commit()
+
+    bus.publish(channels, "message.deleted",
+                conversation_id=str(conv.id), message_id=str(msg.id), scope=mode)
     return jsonify({"ok": True}), 200
 
 
 @messages_bp.route("/conversations/<uuid:conversation_id>/read", methods=["POST"])
 def mark_read(conversation_id):
-   
     try:
         kind, me = resolve_principal()
     except AuthError as e:
@@ -702,29 +607,114 @@ def mark_read(conversation_id):
     if not _assert_member(conv, kind, me):
         return jsonify({"error": "Forbidden"}), 403
 
-    now = _now_utc()
-    q = Message.query.filter(
-        Message.conversation_id == conv.id,
-        Message.moderation_deleted_at.is_(None)  
-    )
-
-    if kind == "admin":
-        for m in q.filter(Message.read_by_admin_at.is_(None)).all():
-            m.read_by_admin_at = now
-        conv.admin_unread_count = 0
-    else:
-        for m in q.filter(Message.read_by_user_at.is_(None)).all():
-            m.read_by_user_at = now
-        conv.user_unread_count = 0
+    # Optional watermark: { "up_to_message_id": "<uuid>" } marks that message
+    # and everything before it; without it the whole conversation is read.
+    data = request.get_json(silent=True) or {}
+    up_to_id = data.get("up_to_message_id")
+    up_to = None
+    if up_to_id:
+        _ensure_uuid(up_to_id, "up_to_message_id")
+        up_to = (
+            db.session.query(Message.id, Message.created_at)
+            .filter(Message.id == up_to_id, Message.conversation_id == conv.id)
+            .first()
+        )
+        if up_to is None:
+            return jsonify({"error": "Message not found in this conversation"}), 404
 
+    now = _now_utc()
+    unread = _mark_read(conv, kind, now, up_to)
     db.session.commit()
-    return jsonify({"ok": True, "read_at": _iso_z(now)}), 200
 
+    bus.publish(bus.conversation_channels(conv), "conversation.read",
+                conversation_id=str(conv.id), reader=kind, read_at=_iso_z(now),
+                up_to_message_id=up_to_id, unread_count=unread)
+    return jsonify({"ok": True, "read_at": _iso_z(now), "up_to_message_id": up_to_id, "unread_count": unread}), 200
 
+# ---------------------------------
+# Search
+# ---------------------------------
 
+@messages_bp.route("/search", methods=["GET"])
+def search_messages():
+    """
+    ?q= web-search syntax ("knee pain", -ankle, "exact phrase") over the
+    caller's visible messages, best match first, each with an HTML-escaped
+    snippet whose matches are wrapped in <mark>. Paged like the inbox:
+    ?limit=, ?cursor= from the X-Next-Cursor header of the previous page.
+    """
+    try:
+        kind, me = resolve_principal()
+    except AuthError as e:
+        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
 
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+    if len(q) > SEARCH_MAX_QUERY_CHARS:
+        return jsonify({"error": f"q must be at most {SEARCH_MAX_QUERY_CHARS} characters"}), 400
 
+    limit = max(1, min(int(request.args.get("limit", 20)), 50))
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = _decode_search_cursor(request.args["cursor"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    rows = db.session.execute(_search_query(kind, me.id, q, limit, after)).all()
+
+    items = []
+    for m, rank, snippet, *peer_cols in rows:
+        items.append({
+            "id": str(m.id),
+            "conversation_id": str(m.conversation_id),
+            "sender_role": m.sender_role,
+            "body": m.body,
+            "created_at": _iso_z(m.created_at),
+            "snippet": snippet,
+            "rank": rank,
+            "peer_display_name": _peer_display_name(kind, *peer_cols),
+        })
+
+    resp = jsonify(items)
+    if len(rows) == limit:
+        last, last_rank = rows[-1][0], rows[-1][1]
+        resp.headers["X-Next-Cursor"] = _encode_search_cursor(last_rank, last.created_at, last.id)
+    return resp, 200
 
+# ---------------------------------
+# Live updates (Server-Sent Events)
+# ---------------------------------
 
+@messages_bp.route("/stream", methods=["GET"])
+def stream():
+    """
+    Pushes message.created / message.updated / message.deleted /
+    conversation.read events for every conversation of the caller.
+    EventSource cannot send headers, so ?access_token= is accepted here.
+    A "resync" event means events were dropped: refetch the open views.
+    """
+    try:
+        kind, me = resolve_principal(token=request.args.get("access_token"))
+    except AuthError as e:
+        return jsonify({"error": "Unauthorized", "message": str(e)}), 401
 
-"""""""""
\ No newline at end of file
+    channel = bus.principal_channel(kind, me.id)
+    db.session.remove()   # the stream itself never touches the database
+    sub = bus.get_bus().subscribe(channel)
+
+    def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                event = sub.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            sub.close()
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,29 @@
+"""calendar events updated_at
+
+Revision ID: 2c5e8f7a9b14
+Revises: e83b6c0d5a47
+Create Date: 2025-10-26 11:18:40.562317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c5e8f7a9b14'
+down_revision = 'e83b6c0d5a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('calendar_events', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE calendar_events SET updated_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table('calendar_events', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
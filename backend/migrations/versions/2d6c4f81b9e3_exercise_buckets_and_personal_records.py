@@ -0,0 +1,60 @@
+"""exercise buckets and personal records
+
+Revision ID: 2d6c4f81b9e3
+Revises: e7f2a95c3b18
+Create Date: 2025-10-11 16:22:08.930147
+
+Tables start empty; fill them with `flask workout_session backfill-rollups`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d6c4f81b9e3'
+down_revision = 'e7f2a95c3b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('workout_exercise_buckets',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_key', sa.String(length=100), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('bucket_start', sa.Date(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('weight_sum', sa.Float(), nullable=False),
+    sa.Column('weighted_sessions', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_key', 'period', 'bucket_start')
+    )
+    op.create_table('workout_personal_records',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_key', sa.String(length=100), nullable=False),
+    sa.Column('exercise_name', sa.String(length=100), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('best_1rm_on', sa.Date(), nullable=True),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('max_weight_on', sa.Date(), nullable=True),
+    sa.Column('best_volume', sa.Float(), nullable=False),
+    sa.Column('best_volume_on', sa.Date(), nullable=True),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('first_on', sa.Date(), nullable=True),
+    sa.Column('last_on', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_key')
+    )
+
+
+def downgrade():
+    op.drop_table('workout_personal_records')
+    op.drop_table('workout_exercise_buckets')
@@ -0,0 +1,37 @@
+"""conversation inbox keyset indexes
+
+Revision ID: 3e9b7c1d4a62
+Revises: 8a3f5d2e6c71
+Create Date: 2025-10-13 09:21:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9b7c1d4a62'
+down_revision = '8a3f5d2e6c71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # keyset pagination needs a non-null sort key
+    op.execute("UPDATE conversations SET last_message_at = created_at WHERE last_message_at IS NULL")
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.alter_column('last_message_at',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=False)
+        batch_op.create_index('ix_conversations_admin_last_message', ['admin_id', 'last_message_at', 'id'], unique=False)
+        batch_op.create_index('ix_conversations_user_last_message', ['user_id', 'last_message_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_index('ix_conversations_user_last_message')
+        batch_op.drop_index('ix_conversations_admin_last_message')
+        batch_op.alter_column('last_message_at',
+               existing_type=sa.DateTime(timezone=True),
+               nullable=True)
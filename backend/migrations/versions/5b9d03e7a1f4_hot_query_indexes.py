@@ -0,0 +1,42 @@
+"""hot query indexes
+
+Revision ID: 5b9d03e7a1f4
+Revises: c41e8b27d5a0
+Create Date: 2025-10-09 14:03:51.807412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9d03e7a1f4'
+down_revision = 'c41e8b27d5a0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.create_index('ix_workout_sessions_user_workout_date', ['user_id', 'workout_date'], unique=False)
+        batch_op.create_index('ix_workout_sessions_user_lower_exercise', ['user_id', sa.text('lower(exercise_name)')], unique=False)
+
+    with op.batch_alter_table('calendar_events', schema=None) as batch_op:
+        batch_op.create_index('ix_calendar_events_user_start_time', ['user_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_calendar_events_start_time', ['start_time'], unique=False)
+
+    with op.batch_alter_table('email_logs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_email_logs_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('email_logs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_email_logs_created_at'))
+
+    with op.batch_alter_table('calendar_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_calendar_events_start_time')
+        batch_op.drop_index('ix_calendar_events_user_start_time')
+
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_sessions_user_lower_exercise')
+        batch_op.drop_index('ix_workout_sessions_user_workout_date')
@@ -0,0 +1,69 @@
+"""calendar series
+
+Revision ID: 5d1a7c3e9f20
+Revises: 2c5e8f7a9b14
+Create Date: 2025-10-27 16:42:08.193254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a7c3e9f20'
+down_revision = '2c5e8f7a9b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('calendar_series',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('event_type', sa.String(length=50), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=True),
+    sa.Column('admin_id', sa.UUID(), nullable=True),
+    sa.Column('dtstart', sa.DateTime(), nullable=False),
+    sa.Column('timezone', sa.String(length=64), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('rrule', sa.String(length=255), nullable=False),
+    sa.Column('occurrence_count', sa.Integer(), nullable=False),
+    sa.Column('first_start', sa.DateTime(), nullable=False),
+    sa.Column('last_end', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['admin_id'], ['admins.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('calendar_series', schema=None) as batch_op:
+        batch_op.create_index('ix_calendar_series_admin_last_end', ['admin_id', 'last_end'], unique=False)
+        batch_op.create_index('ix_calendar_series_last_end', ['last_end'], unique=False)
+        batch_op.create_index('ix_calendar_series_user_last_end', ['user_id', 'last_end'], unique=False)
+
+    op.create_table('calendar_series_exceptions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('series_id', sa.UUID(), nullable=False),
+    sa.Column('original_start', sa.DateTime(), nullable=False),
+    sa.Column('cancelled', sa.Boolean(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['series_id'], ['calendar_series.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('series_id', 'original_start', name='uq_calendar_series_exceptions_occurrence')
+    )
+
+
+def downgrade():
+    op.drop_table('calendar_series_exceptions')
+    with op.batch_alter_table('calendar_series', schema=None) as batch_op:
+        batch_op.drop_index('ix_calendar_series_user_last_end')
+        batch_op.drop_index('ix_calendar_series_last_end')
+        batch_op.drop_index('ix_calendar_series_admin_last_end')
+
+    op.drop_table('calendar_series')
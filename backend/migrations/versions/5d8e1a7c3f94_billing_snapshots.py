@@ -0,0 +1,39 @@
+"""billing snapshots
+
+Revision ID: 5d8e1a7c3f94
+Revises: c41f7a9d2b58
+Create Date: 2025-10-14 15:40:26.318254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e1a7c3f94'
+down_revision = 'c41f7a9d2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('billing_snapshots',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('stripe_subscription_id', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=32), nullable=True),
+    sa.Column('has_subscription', sa.Boolean(), nullable=False),
+    sa.Column('cancel_at_period_end', sa.Boolean(), nullable=False),
+    sa.Column('plan_id', sa.UUID(), nullable=True),
+    sa.Column('plan_name', sa.String(length=100), nullable=False),
+    sa.Column('next_bill_amount', sa.Integer(), nullable=True),
+    sa.Column('next_bill_currency', sa.String(length=3), nullable=True),
+    sa.Column('next_bill_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('source', sa.String(length=10), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('billing_snapshots')
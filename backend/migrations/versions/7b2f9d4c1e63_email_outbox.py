@@ -0,0 +1,38 @@
+"""email outbox
+
+Revision ID: 7b2f9d4c1e63
+Revises: a9c3e5f71d26
+Create Date: 2025-10-22 09:41:17.208433
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2f9d4c1e63'
+down_revision = 'a9c3e5f71d26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('email_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('locked_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('sent_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_email_logs_outbox', ['next_attempt_at', 'created_at'], unique=False, postgresql_where=sa.text("status in ('queued','sending')"))
+
+    # emails sent before the outbox went out inline, at creation time
+    op.execute("UPDATE email_logs SET sent_at = created_at WHERE status = 'sent'")
+
+
+def downgrade():
+    with op.batch_alter_table('email_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_email_logs_outbox', postgresql_where=sa.text("status in ('queued','sending')"))
+        batch_op.drop_column('sent_at')
+        batch_op.drop_column('locked_at')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
+
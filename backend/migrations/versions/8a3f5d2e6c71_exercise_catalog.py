@@ -0,0 +1,225 @@
+"""exercise catalog
+
+Revision ID: 8a3f5d2e6c71
+Revises: 2d6c4f81b9e3
+Create Date: 2025-10-12 11:05:42.117893
+
+Creates exercises / exercise_aliases, seeds the built-in catalog, folds the
+free-text workout_sessions.exercise_name values into it (case/whitespace
+duplicates collapse to one entry, known spellings become aliases) and
+fills workout_sessions.exercise_id.
+
+workout_exercise_buckets / workout_personal_records are re-keyed by
+exercise_id and start empty; run `flask workout_session backfill-rollups`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3f5d2e6c71'
+down_revision = '2d6c4f81b9e3'
+branch_labels = None
+depends_on = None
+
+
+# (name, category, aliases)
+SEED = [
+    ("Deadlift", "Strength", ["conventional deadlift", "barbell deadlift"]),
+    ("Squat", "Strength", ["back squat", "barbell squat"]),
+    ("Flat Bench Press", "Strength", ["bench press", "barbell bench press", "flat bench"]),
+    ("Overhead Press", "Strength", ["ohp", "military press", "shoulder press"]),
+    ("Incline DB Press", "Strength", ["incline dumbbell press"]),
+    ("Bicep Curls", "Strength", ["bicep curl", "biceps curl", "biceps curls"]),
+    ("Lat Pulldown", "Strength", ["lat pulldowns"]),
+    ("Leg Press", "Strength", []),
+    ("Running", "Cardio", ["run", "jogging"]),
+    ("Cycling", "Cardio", ["bike", "biking"]),
+    ("Rowing", "Cardio", ["rowing machine", "rower"]),
+    ("Elliptical", "Cardio", []),
+    ("Stair Climber", "Cardio", ["stairmaster"]),
+    ("Vinyasa Flow", "Yoga", []),
+    ("Hatha Sequence", "Yoga", []),
+    ("Sun Salutations", "Yoga", []),
+    ("Power Yoga", "Yoga", []),
+    ("Burpees", "HIIT", ["burpee"]),
+    ("Kettlebell Swings", "HIIT", ["kettlebell swing", "kb swings"]),
+    ("Mountain Climbers", "HIIT", ["mountain climber"]),
+    ("Jump Squats", "HIIT", ["jump squat"]),
+]
+
+# Same normalization as workout_session/catalog.py: collapse whitespace, trim, lower-case
+SLUG_SQL = "lower(btrim(regexp_replace({col}, '\\s+', ' ', 'g')))"
+
+
+def upgrade():
+    op.create_table('exercises',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('slug', sa.String(length=100), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    op.create_table('exercise_aliases',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('slug', sa.String(length=100), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slug')
+    )
+    with op.batch_alter_table('exercise_aliases', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_exercise_aliases_exercise_id'), ['exercise_id'], unique=False)
+
+    # --- seed catalog + aliases ---
+    conn = op.get_bind()
+    for name, category, aliases in SEED:
+        exercise_id = conn.execute(
+            sa.text("INSERT INTO exercises (name, slug, category, created_at) "
+                    "VALUES (:name, :slug, :category, now()) RETURNING id"),
+            {"name": name, "slug": name.lower(), "category": category},
+        ).scalar()
+        for alias in aliases:
+            conn.execute(
+                sa.text("INSERT INTO exercise_aliases (exercise_id, slug) VALUES (:id, :slug)"),
+                {"id": exercise_id, "slug": alias},
+            )
+
+    # --- dedupe existing free-text names: one entry per slug, most used spelling wins ---
+    slug = SLUG_SQL.format(col="exercise_name")
+    op.execute(f"""
+        INSERT INTO exercises (name, slug, category, created_at)
+        SELECT DISTINCT ON (slug) name, slug, category, now()
+        FROM (
+            SELECT {slug} AS slug,
+                   btrim(regexp_replace(exercise_name, '\\s+', ' ', 'g')) AS name,
+                   nullif(btrim(workout_type), '') AS category,
+                   count(*) AS uses
+            FROM workout_sessions
+            WHERE {slug} <> ''
+            GROUP BY 1, 2, 3
+        ) names
+        WHERE slug NOT IN (SELECT slug FROM exercise_aliases)
+        ORDER BY slug, uses DESC, name
+        ON CONFLICT (slug) DO NOTHING
+    """)
+
+    # --- workout_sessions.exercise_id ---
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('exercise_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('workout_sessions_exercise_id_fkey', 'exercises', ['exercise_id'], ['id'], ondelete='SET NULL')
+
+    op.execute(f"""
+        UPDATE workout_sessions ws
+        SET exercise_id = m.exercise_id
+        FROM (
+            SELECT slug, id AS exercise_id FROM exercises
+            UNION ALL
+            SELECT slug, exercise_id FROM exercise_aliases
+        ) m
+        WHERE m.slug = {SLUG_SQL.format(col="ws.exercise_name")}
+    """)
+
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_sessions_user_lower_exercise')
+        batch_op.create_index('ix_workout_sessions_user_exercise_date', ['user_id', 'exercise_id', 'workout_date'], unique=False)
+
+    with op.batch_alter_table('workout_daily_rollups', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('exercise_id', sa.Integer(), nullable=True))
+
+    # --- derived per-exercise tables: re-key by exercise_id (rebuilt by backfill-rollups) ---
+    op.drop_table('workout_personal_records')
+    op.drop_table('workout_exercise_buckets')
+    op.create_table('workout_exercise_buckets',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('bucket_start', sa.Date(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('weight_sum', sa.Float(), nullable=False),
+    sa.Column('weighted_sessions', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id', 'period', 'bucket_start')
+    )
+    op.create_table('workout_personal_records',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('best_1rm_on', sa.Date(), nullable=True),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('max_weight_on', sa.Date(), nullable=True),
+    sa.Column('best_volume', sa.Float(), nullable=False),
+    sa.Column('best_volume_on', sa.Date(), nullable=True),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('first_on', sa.Date(), nullable=True),
+    sa.Column('last_on', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_id')
+    )
+
+
+def downgrade():
+    op.drop_table('workout_personal_records')
+    op.drop_table('workout_exercise_buckets')
+    op.create_table('workout_exercise_buckets',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_key', sa.String(length=100), nullable=False),
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('bucket_start', sa.Date(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('weight_sum', sa.Float(), nullable=False),
+    sa.Column('weighted_sessions', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_key', 'period', 'bucket_start')
+    )
+    op.create_table('workout_personal_records',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('exercise_key', sa.String(length=100), nullable=False),
+    sa.Column('exercise_name', sa.String(length=100), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('best_1rm_on', sa.Date(), nullable=True),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('max_weight_on', sa.Date(), nullable=True),
+    sa.Column('best_volume', sa.Float(), nullable=False),
+    sa.Column('best_volume_on', sa.Date(), nullable=True),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('first_on', sa.Date(), nullable=True),
+    sa.Column('last_on', sa.Date(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'exercise_key')
+    )
+
+    with op.batch_alter_table('workout_daily_rollups', schema=None) as batch_op:
+        batch_op.drop_column('exercise_id')
+
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_sessions_user_exercise_date')
+        batch_op.create_index('ix_workout_sessions_user_lower_exercise', ['user_id', sa.text('lower(exercise_name)')], unique=False)
+        batch_op.drop_constraint('workout_sessions_exercise_id_fkey', type_='foreignkey')
+        batch_op.drop_column('exercise_id')
+
+    with op.batch_alter_table('exercise_aliases', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_exercise_aliases_exercise_id'))
+
+    op.drop_table('exercise_aliases')
+    op.drop_table('exercises')
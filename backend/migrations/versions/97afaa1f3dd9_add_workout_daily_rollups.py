@@ -0,0 +1,41 @@
+"""add workout_daily_rollups
+
+Revision ID: 97afaa1f3dd9
+Revises: 70dfe3d25334
+Create Date: 2025-10-06 19:12:44.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '97afaa1f3dd9'
+down_revision = '70dfe3d25334'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('workout_daily_rollups',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('local_date', sa.Date(), nullable=False),
+    sa.Column('exercise_name', sa.String(length=100), nullable=False),
+    sa.Column('minutes', sa.Integer(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_volume', sa.Float(), nullable=False),
+    sa.Column('best_1rm', sa.Float(), nullable=False),
+    sa.Column('max_weight', sa.Float(), nullable=False),
+    sa.Column('weight_sum', sa.Float(), nullable=False),
+    sa.Column('weighted_sessions', sa.Integer(), nullable=False),
+    sa.Column('first_logged_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'local_date', 'exercise_name')
+    )
+    # Existing sessions are picked up by: flask workout_session backfill-rollups
+
+
+def downgrade():
+    op.drop_table('workout_daily_rollups')
@@ -0,0 +1,48 @@
+"""stripe events
+
+Revision ID: a9c3e5f71d26
+Revises: 5d8e1a7c3f94
+Create Date: 2025-10-15 09:52:13.448107
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9c3e5f71d26'
+down_revision = '5d8e1a7c3f94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stripe_events',
+    sa.Column('id', sa.String(length=255), nullable=False),
+    sa.Column('type', sa.String(length=100), nullable=False),
+    sa.Column('customer_id', sa.String(length=255), nullable=True),
+    sa.Column('ordering_key', sa.String(length=255), nullable=False),
+    sa.Column('stripe_created', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=12), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('received_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint("status in ('pending','processing','done','skipped','failed')", name='ck_stripe_events_status'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stripe_events', schema=None) as batch_op:
+        batch_op.create_index('ix_stripe_events_received_at', ['received_at'], unique=False)
+        batch_op.create_index('ix_stripe_events_unfinished', ['ordering_key', 'stripe_created', 'received_at', 'id'], unique=False, postgresql_where=sa.text("status in ('pending','processing')"))
+
+
+def downgrade():
+    with op.batch_alter_table('stripe_events', schema=None) as batch_op:
+        batch_op.drop_index('ix_stripe_events_unfinished', postgresql_where=sa.text("status in ('pending','processing')"))
+        batch_op.drop_index('ix_stripe_events_received_at')
+
+    op.drop_table('stripe_events')
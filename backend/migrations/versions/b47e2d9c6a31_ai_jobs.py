@@ -0,0 +1,49 @@
+"""ai jobs
+
+Revision ID: b47e2d9c6a31
+Revises: 5d1a7c3e9f20
+Create Date: 2025-10-28 10:15:37.604219
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'b47e2d9c6a31'
+down_revision = '5d1a7c3e9f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('ai_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('input', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('status', sa.String(length=12), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('plan_id', sa.UUID(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint("status in ('queued','running','succeeded','failed')", name='ck_ai_jobs_status'),
+    sa.ForeignKeyConstraint(['plan_id'], ['workout_plans.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('ai_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_ai_jobs_unfinished', ['created_at'], unique=False, postgresql_where=sa.text("status in ('queued','running')"))
+        batch_op.create_index('ix_ai_jobs_user_created', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('ai_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_ai_jobs_user_created')
+        batch_op.drop_index('ix_ai_jobs_unfinished', postgresql_where=sa.text("status in ('queued','running')"))
+
+    op.drop_table('ai_jobs')
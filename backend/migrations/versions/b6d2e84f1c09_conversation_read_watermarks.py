@@ -0,0 +1,81 @@
+"""conversation read watermarks
+
+Revision ID: b6d2e84f1c09
+Revises: 3e9b7c1d4a62
+Create Date: 2025-10-13 15:48:02.661390
+
+Replaces messages.read_by_user_at / read_by_admin_at and the
+conversations.*_unread_count counters with one watermark row per
+(conversation, participant). Each participant's watermark starts at the
+newest message they had a receipt for.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2e84f1c09'
+down_revision = '3e9b7c1d4a62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('conversation_reads',
+    sa.Column('conversation_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('participant_role', sa.String(length=10), nullable=False),
+    sa.Column('read_up_to', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('last_read_message_id', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('read_at', sa.DateTime(timezone=True), nullable=False),
+    sa.CheckConstraint("participant_role in ('user','admin')", name='ck_conversation_reads_role'),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['last_read_message_id'], ['messages.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('conversation_id', 'participant_role')
+    )
+
+    for role in ('user', 'admin'):
+        op.execute(f"""
+            INSERT INTO conversation_reads (conversation_id, participant_role, read_up_to, last_read_message_id, read_at)
+            SELECT DISTINCT ON (conversation_id)
+                   conversation_id, '{role}', created_at, id, read_by_{role}_at
+            FROM messages
+            WHERE read_by_{role}_at IS NOT NULL
+            ORDER BY conversation_id, created_at DESC
+        """)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('read_by_admin_at')
+        batch_op.drop_column('read_by_user_at')
+
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.drop_column('admin_unread_count')
+        batch_op.drop_column('user_unread_count')
+
+
+def downgrade():
+    with op.batch_alter_table('conversations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('user_unread_count', sa.INTEGER(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('admin_unread_count', sa.INTEGER(), server_default='0', nullable=False))
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('read_by_user_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+        batch_op.add_column(sa.Column('read_by_admin_at', postgresql.TIMESTAMP(timezone=True), nullable=True))
+
+    for role, peer in (('user', 'admin'), ('admin', 'user')):
+        op.execute(f"""
+            UPDATE messages m SET read_by_{role}_at = r.read_at
+            FROM conversation_reads r
+            WHERE r.conversation_id = m.conversation_id
+              AND r.participant_role = '{role}'
+              AND m.created_at <= r.read_up_to
+        """)
+        op.execute(f"""
+            UPDATE conversations c SET {role}_unread_count = (
+                SELECT count(*) FROM messages m
+                WHERE m.conversation_id = c.id AND m.sender_role = '{peer}'
+                  AND m.read_by_{role}_at IS NULL AND m.moderation_deleted_at IS NULL
+            )
+        """)
+
+    op.drop_table('conversation_reads')
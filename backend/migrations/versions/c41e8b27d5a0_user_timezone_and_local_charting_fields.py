@@ -0,0 +1,38 @@
+"""user timezone and local charting fields
+
+Revision ID: c41e8b27d5a0
+Revises: 97afaa1f3dd9
+Create Date: 2025-10-08 10:27:03.551920
+
+Schema only. Existing sessions keep their UTC-derived fields until
+`flask workout_session backfill-charting` then `backfill-rollups` are run.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e8b27d5a0'
+down_revision = '97afaa1f3dd9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), server_default='America/Chicago', nullable=False))
+
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('local_date', sa.Date(), nullable=True))
+        batch_op.create_index('ix_workout_sessions_user_week_start', ['user_id', 'week_start'], unique=False)
+        batch_op.create_index('ix_workout_sessions_user_month', ['user_id', 'month'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_sessions_user_month')
+        batch_op.drop_index('ix_workout_sessions_user_week_start')
+        batch_op.drop_column('local_date')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('timezone')
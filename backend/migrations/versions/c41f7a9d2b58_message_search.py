@@ -0,0 +1,56 @@
+"""message full-text search
+
+Revision ID: c41f7a9d2b58
+Revises: b6d2e84f1c09
+Create Date: 2025-10-14 10:12:08.551390
+
+Adds messages.body_tsv, kept equal to to_tsvector('english', body) by a
+BEFORE INSERT / UPDATE OF body trigger, backfills it and indexes it with GIN.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f7a9d2b58'
+down_revision = 'b6d2e84f1c09'
+branch_labels = None
+depends_on = None
+
+# keep in sync with messages.models.SEARCH_CONFIG
+SEARCH_CONFIG = 'english'
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('body_tsv', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(f"""
+        CREATE FUNCTION messages_body_tsv_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.body_tsv := to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(NEW.body, ''));
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER messages_body_tsv
+        BEFORE INSERT OR UPDATE OF body ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_body_tsv_update()
+    """)
+    op.execute(f"UPDATE messages SET body_tsv = to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce(body, ''))")
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_body_tsv', ['body_tsv'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_body_tsv', postgresql_using='gin')
+
+    op.execute("DROP TRIGGER IF EXISTS messages_body_tsv ON messages")
+    op.execute("DROP FUNCTION IF EXISTS messages_body_tsv_update()")
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_column('body_tsv')
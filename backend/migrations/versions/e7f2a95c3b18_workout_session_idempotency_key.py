@@ -0,0 +1,28 @@
+"""workout session idempotency key
+
+Revision ID: e7f2a95c3b18
+Revises: 5b9d03e7a1f4
+Create Date: 2025-10-10 09:41:17.264380
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f2a95c3b18'
+down_revision = '5b9d03e7a1f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+        batch_op.create_index('uq_workout_sessions_user_idempotency_key', ['user_id', 'idempotency_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('workout_sessions', schema=None) as batch_op:
+        batch_op.drop_index('uq_workout_sessions_user_idempotency_key')
+        batch_op.drop_column('idempotency_key')
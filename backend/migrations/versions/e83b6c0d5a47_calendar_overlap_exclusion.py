@@ -0,0 +1,45 @@
+"""calendar overlap exclusion
+
+Revision ID: e83b6c0d5a47
+Revises: 7b2f9d4c1e63
+Create Date: 2025-10-24 14:06:52.731905
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e83b6c0d5a47'
+down_revision = '7b2f9d4c1e63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # existing double bookings / inverted ranges must be fixed by hand first
+    bad = op.get_bind().execute(sa.text("""
+        SELECT count(*) FROM calendar_events a
+        WHERE a.end_time < a.start_time
+           OR (a.admin_id IS NOT NULL AND a.status IN ('approved', 'pending') AND EXISTS (
+                SELECT 1 FROM calendar_events b
+                WHERE b.admin_id = a.admin_id AND b.id <> a.id
+                  AND b.status IN ('approved', 'pending')
+                  AND b.start_time < a.end_time AND b.end_time > a.start_time))
+    """)).scalar()
+    if bad:
+        raise RuntimeError(f"{bad} calendar_events overlap another approved/pending event of the "
+                           "same coach or end before they start; resolve them before upgrading.")
+
+    # equality on uuid inside a GiST index
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    op.execute("""
+        ALTER TABLE calendar_events
+        ADD CONSTRAINT ex_calendar_events_admin_overlap
+        EXCLUDE USING gist (admin_id WITH =, tsrange(start_time, end_time, '[)') WITH &&)
+        WHERE (admin_id IS NOT NULL AND status IN ('approved', 'pending'))
+    """)
+
+
+def downgrade():
+    op.drop_constraint('ex_calendar_events_admin_overlap', 'calendar_events', type_='exclude')
@@ -0,0 +1,315 @@
+# payments/billing.py
+"""
+Billing summary for GET /api/payments/summary.
+
+Building the summary live takes up to five Stripe calls
+(Subscription.retrieve / .list, Invoice.upcoming / .retrieve / .list;
+the invoice ones run concurrently through payments.stripe_gateway).
+Each user therefore has a BillingSnapshot row, and /summary is served
+from it:
+
+  - the webhook event handlers (payments/events.py) refresh the snapshot
+    of every user an event touches (subscription and invoice events)
+  - routes that change the subscription drop it (invalidate_after_request),
+    so the next view goes live
+  - a missing snapshot, or one older than BILLING_SNAPSHOT_TTL seconds or
+    past its next bill date, is rebuilt live and stored
+
+STRIPE_API_BASE points the stripe client somewhere else, e.g. a local
+stripe-mock server; scripts/check_billing.py uses that to check the
+live / snapshot / stale paths of get_summary().
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+import stripe
+from flask import after_this_request
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions import db
+from memberships.models import MembershipPlan
+from payments import stripe_gateway
+from payments.models import BillingSnapshot
+
+SNAPSHOT_TTL = int(os.getenv("BILLING_SNAPSHOT_TTL", str(6 * 3600)))
+
+# stripe-python 12+ removed Invoice.upcoming in favour of Invoice.create_preview
+_upcoming_invoice = getattr(stripe.Invoice, "upcoming", None) or stripe.Invoice.create_preview
+
+if os.getenv("STRIPE_API_BASE"):
+    stripe.api_base = os.environ["STRIPE_API_BASE"]
+
+
+def _now_utc():
+    return datetime.now(timezone.utc)
+
+def to_seconds(v):
+    """Accept int, float, '1695600000', or ISO '2025-09-25T00:00:00Z'."""
+    if v is None:
+        return None
+    if isinstance(v, (int, float)):
+        return int(v)
+    if isinstance(v, str):
+        s = v.strip()
+        if s.isdigit():
+            return int(s)
+        try:
+            if s.endswith("Z"):
+                s = s[:-1] + "+00:00"
+            return int(datetime.fromisoformat(s).timestamp())
+        except Exception:
+            return None
+    return None
+
+def cents_from_items(items):
+    items = (items or {}).get("data") or []
+    if not items:
+        return None, None
+    price = (items[0] or {}).get("price") or {}
+    unit  = price.get("unit_amount")
+    qty   = (items[0] or {}).get("quantity") or 1
+    if unit is None:
+        return None, None
+    return unit * qty, (price.get("currency") or "usd").lower()
+
+def _next_bill(amount, currency, period_end_sec):
+    date_iso = datetime.fromtimestamp(period_end_sec, tz=timezone.utc).isoformat() if period_end_sec else None
+    return {
+        "amount": amount,
+        "currency": currency,
+        "date_unix": period_end_sec,
+        "date_iso": date_iso
+    }
+
+
+# ---------- live (Stripe) ----------
+
+def live_summary(user) -> dict:
+    """The /summary payload straight from Stripe. Raises stripe.error.StripeError."""
+    # --- Plan label from DB (fallback) ---
+    plan_id = getattr(user, "membership_plan_id", None)
+    plan_name = "Free"
+    try:
+        if plan_id:
+            p = MembershipPlan.query.get(plan_id)
+            if p and p.name:
+                plan_name = p.name
+    except Exception as e:
+        print("[/summary] plan lookup failed:", repr(e))
+
+    cust_id = getattr(user, "stripe_customer_id", None)
+    sub_id  = getattr(user, "stripe_subscription_id", None)
+
+    # --- Find a subscription for this customer ---
+    sub = None
+    if sub_id:
+        try:
+            sub = stripe_gateway.call(
+                stripe.Subscription.retrieve, sub_id,
+                expand=["items.data.price.product", "latest_invoice"]
+            )
+        except Exception as e:
+            print("[/summary] retrieve sub by id failed:", str(e))
+
+    if not sub and cust_id:
+        subs = stripe_gateway.call(stripe.Subscription.list, customer=cust_id, status="all", limit=20)
+        preferred = [s for s in subs.data if s.get("status") in ("active", "trialing", "past_due")]
+        chosen = preferred[0] if preferred else (subs.data[0] if subs.data else None)
+        if chosen:
+            sub = stripe_gateway.call(
+                stripe.Subscription.retrieve, chosen["id"],
+                expand=["items.data.price.product", "latest_invoice"]
+            )
+            # best-effort persist sub id
+            try:
+                if hasattr(user, "stripe_subscription_id") and not user.stripe_subscription_id:
+                    user.stripe_subscription_id = sub["id"]
+                    db.session.commit()
+            except Exception as e:
+                print("[/summary] warn persist sub id:", str(e))
+
+    if not sub:
+        return {
+            "has_subscription": False,
+            "plan": {"id": plan_id, "name": plan_name},
+            "next_bill": None,
+            "status": None,
+            "cancel_at_period_end": False
+        }
+
+    # --- Build summary from subscription ---
+    status = sub.get("status")
+    cancel_at_period_end = bool(sub.get("cancel_at_period_end"))
+    items = (sub.get("items") or {})
+
+    # Latest invoice period end (lines), when the expanded invoice has it
+    li_end_raw = None
+    li = sub.get("latest_invoice")
+    if isinstance(li, dict):
+        lines = (li.get("lines") or {}).get("data") or []
+        if lines and (lines[0].get("period") or {}).get("end"):
+            li_end_raw = lines[0]["period"]["end"]
+
+    # The invoice lookups only depend on the subscription: issue them together
+    calls = [(_upcoming_invoice, (), {"subscription": sub["id"]})]
+    if not li_end_raw:
+        if isinstance(li, str):
+            calls.append((stripe.Invoice.retrieve, (li,), {"expand": ["lines.data"]}))
+        calls.append((stripe.Invoice.list, (), {"subscription": sub["id"], "limit": 1}))
+    upcoming, *fallbacks = stripe_gateway.gather(*calls, return_exceptions=True)
+
+    # Amount/currency: prefer upcoming invoice, else derive from price*qty
+    amount, currency = None, None
+    if isinstance(upcoming, Exception):
+        upcoming = None
+
+    # Collect all possible period_end sources
+    inv_end_raw = None
+    if upcoming:
+        amount = upcoming.get("total") or upcoming.get("amount_due")
+        currency = (upcoming.get("currency") or "usd").lower()
+        inv_end_raw = upcoming.get("period_end")
+        if not inv_end_raw:
+            lines = (upcoming.get("lines") or {}).get("data") or []
+            if lines and (lines[0].get("period") or {}).get("end"):
+                inv_end_raw = lines[0]["period"]["end"]
+    else:
+        amount, currency = cents_from_items(items)
+
+    # Subscription current period end (may be int or ISO under newer API)
+    cpe_raw = sub.get("current_period_end")
+
+    # Otherwise the latest invoice by id, then the most recent invoice
+    for result in fallbacks:
+        if li_end_raw:
+            break
+        if isinstance(result, Exception):
+            print("[/summary] invoice fallback failed:", str(result))
+            continue
+        invoices = (result.get("data") or []) if result.get("object") == "list" else [result]
+        if invoices:
+            lines = (invoices[0].get("lines") or {}).get("data") or []
+            if lines and (lines[0].get("period") or {}).get("end"):
+                li_end_raw = lines[0]["period"]["end"]
+
+    # Pick the first available timestamp (convert anything to seconds)
+    period_end_sec = (
+        to_seconds(inv_end_raw) or
+        to_seconds(cpe_raw) or
+        to_seconds(li_end_raw)
+    )
+
+    # Improve plan label from Stripe
+    price = (items.get("data", [{}])[0] or {}).get("price") or {}
+    product = price.get("product") if isinstance(price.get("product"), dict) else None
+    nickname = price.get("nickname")
+    if plan_name == "Free":
+        if product and product.get("name"):
+            plan_name = product["name"]
+        elif nickname:
+            plan_name = nickname
+
+    has_sub = status in ("active", "trialing", "past_due")
+
+    return {
+        "has_subscription": bool(has_sub),
+        "plan": {"id": plan_id, "name": plan_name},
+        "next_bill": _next_bill(amount, currency, period_end_sec),
+        "status": status,
+        "cancel_at_period_end": cancel_at_period_end,
+        "subscription_id": sub["id"],
+    }
+
+
+# ---------- snapshots ----------
+
+def snapshot_summary(snap: BillingSnapshot) -> dict:
+    next_bill = None
+    if snap.stripe_subscription_id:
+        period_end_sec = int(snap.next_bill_at.timestamp()) if snap.next_bill_at else None
+        next_bill = _next_bill(snap.next_bill_amount, snap.next_bill_currency, period_end_sec)
+    return {
+        "has_subscription": snap.has_subscription,
+        "plan": {"id": str(snap.plan_id) if snap.plan_id else None, "name": snap.plan_name},
+        "next_bill": next_bill,
+        "status": snap.status,
+        "cancel_at_period_end": snap.cancel_at_period_end,
+    }
+
+def is_fresh(snap: BillingSnapshot, now=None) -> bool:
+    now = now or _now_utc()
+    if snap.refreshed_at + timedelta(seconds=SNAPSHOT_TTL) <= now:
+        return False
+    # a passed bill date means a new period (and amount) we haven't heard about
+    return snap.next_bill_at is None or snap.next_bill_at > now
+
+def store_snapshot(user_id, summary: dict, source: str):
+    """Upsert the snapshot for `user_id` from a live_summary() payload (caller commits)."""
+    next_bill = summary.get("next_bill") or {}
+    plan = summary.get("plan") or {}
+    values = {
+        "stripe_subscription_id": summary.get("subscription_id"),
+        "status": summary.get("status"),
+        "has_subscription": bool(summary.get("has_subscription")),
+        "cancel_at_period_end": bool(summary.get("cancel_at_period_end")),
+        "plan_id": plan.get("id"),
+        "plan_name": plan.get("name") or "Free",
+        "next_bill_amount": next_bill.get("amount"),
+        "next_bill_currency": next_bill.get("currency"),
+        "next_bill_at": (datetime.fromtimestamp(next_bill["date_unix"], tz=timezone.utc)
+                         if next_bill.get("date_unix") else None),
+        "source": source,
+        "refreshed_at": _now_utc(),
+    }
+    stmt = pg_insert(BillingSnapshot).values(user_id=user_id, **values)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=[BillingSnapshot.user_id], set_=values))
+
+def refresh_snapshot(user, source="webhook"):
+    """
+    Rebuild `user`'s snapshot from Stripe and commit. Best effort: on
+    failure the snapshot is dropped so the next /summary goes live.
+    """
+    try:
+        store_snapshot(user.id, live_summary(user), source)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print("[billing] snapshot refresh failed:", repr(e))
+        invalidate_snapshot(user.id)
+
+def invalidate_snapshot(user_id):
+    """Drop the snapshot of `user_id` (commits)."""
+    BillingSnapshot.query.filter_by(user_id=user_id).delete()
+    db.session.commit()
+
+def invalidate_after_request(user_id):
+    """Drop the snapshot once the current request (and its Stripe calls) is done."""
+    @after_this_request
+    def _drop(response):
+        try:
+            invalidate_snapshot(user_id)
+        except Exception as e:
+            db.session.rollback()
+            print("[billing] snapshot invalidation failed:", repr(e))
+        return response
+
+def get_summary(user, refresh=False):
+    """
+    (summary, source) for /summary: the stored snapshot when fresh
+    ('snapshot'), else built live and stored ('live'). If Stripe fails and
+    a stale snapshot exists, that is returned ('stale') instead of raising.
+    """
+    snap = db.session.get(BillingSnapshot, user.id)
+    if snap is not None and not refresh and is_fresh(snap):
+        return snapshot_summary(snap), "snapshot"
+
+    try:
+        summary = live_summary(user)
+    except Exception:
+        if snap is None:
+            raise
+        return snapshot_summary(snap), "stale"
+
+    store_snapshot(user.id, summary, "live")
+    db.session.commit()
+    summary.pop("subscription_id", None)
+    return summary, "live"
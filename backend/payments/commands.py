@@ -0,0 +1,86 @@
+# payments/commands.py
+"""
+CLI for the Stripe event queue, exposed under the blueprint group:
+
+    flask payments work-events [--once]
+    flask payments replay-events [EVENT_ID ...] [--status failed] [--since 2025-10-01] [--fetch]
+    flask payments event-stats
+
+Replayed events are reset to pending and picked up by the running worker
+(or by `work-events --once`).
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+import click
+import stripe
+from flask import current_app
+from extensions import db
+from .models import StripeEvent
+from .routes import payments_bp
+from . import events
+
+
+@payments_bp.cli.command("work-events")
+@click.option("--once", is_flag=True, help="Process what is due now on this thread, then exit.")
+def work_events(once):
+    """Run the Stripe event worker in the foreground."""
+    if once:
+        n = events.drain(limit=10**9)
+        click.echo(f"Processed {n} event(s).")
+        return
+
+    events.worker().start(current_app._get_current_object())
+    click.echo(f"Stripe event worker running with {events.WORKERS} thread(s); Ctrl-C to stop.")
+    while True:
+        time.sleep(60)
+        click.echo(json.dumps(events.stats(), default=str))
+        db.session.remove()
+
+
+@payments_bp.cli.command("replay-events")
+@click.argument("event_ids", nargs=-1)
+@click.option("--status", "statuses", multiple=True, help="Replay every event in this status (repeatable).")
+@click.option("--since", default=None, help="Only events received at or after this ISO date/time.")
+@click.option("--fetch", is_flag=True, help="Fetch EVENT_IDs we never stored from the Stripe API first.")
+def replay_events(event_ids, statuses, since, fetch):
+    """Reset stored events to pending so they are processed again."""
+    if not event_ids and not statuses:
+        raise click.UsageError("Give event ids and/or --status.")
+
+    if fetch:
+        known = {r[0] for r in db.session.query(StripeEvent.id).filter(StripeEvent.id.in_(event_ids))}
+        for event_id in event_ids:
+            if event_id not in known:
+                events.enqueue(stripe.Event.retrieve(event_id))
+                click.echo(f"fetched {event_id}")
+        db.session.commit()
+
+    q = StripeEvent.query
+    if event_ids and statuses:
+        q = q.filter(StripeEvent.id.in_(event_ids) | StripeEvent.status.in_(statuses))
+    elif event_ids:
+        q = q.filter(StripeEvent.id.in_(event_ids))
+    else:
+        q = q.filter(StripeEvent.status.in_(statuses))
+    if since:
+        ts = datetime.fromisoformat(since)
+        q = q.filter(StripeEvent.received_at >= (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)))
+    q = q.filter(StripeEvent.status != "processing")
+
+    n = q.update({
+        StripeEvent.status: "pending",
+        StripeEvent.attempts: 0,
+        StripeEvent.last_error: None,
+        StripeEvent.next_attempt_at: datetime.now(timezone.utc),
+        StripeEvent.processed_at: None,
+    }, synchronize_session=False)
+    db.session.commit()
+    click.echo(f"Queued {n} event(s) for replay.")
+
+
+@payments_bp.cli.command("event-stats")
+def event_stats():
+    """Queue depth by status and the age of the oldest unfinished event."""
+    click.echo(json.dumps(events.stats()["queue"], indent=2, default=str))
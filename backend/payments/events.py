@@ -0,0 +1,394 @@
+# payments/events.py
+"""
+Stripe webhook events: stored on receipt, processed in the background.
+
+POST /api/payments/webhook verifies the signature, inserts the event into
+stripe_events (ON CONFLICT DO NOTHING on the event id, so redeliveries are
+no-ops) and returns 200 straight away. The worker then:
+
+  - processes events of one customer one at a time, oldest (Stripe
+    `created`) first; different customers run in parallel on up to
+    STRIPE_EVENTS_WORKERS threads. Only the oldest unfinished event of a
+    customer can be claimed, and claiming is a conditional UPDATE, so
+    this also holds across processes.
+  - retries a failing event with jittered exponential backoff and marks
+    it failed after STRIPE_EVENTS_MAX_ATTEMPTS; later events of that
+    customer wait while it is being retried.
+  - skips a subscription event when a newer one for the same subscription
+    has already been applied (Stripe does not deliver in order).
+  - takes back events left 'processing' by a dead worker after
+    STRIPE_EVENTS_LEASE seconds.
+
+The worker runs inside the web process (started by the first webhook) or,
+with STRIPE_EVENTS_INLINE_WORKER=0, in a dedicated one:
+
+    flask payments work-events [--once]
+    flask payments replay-events [EVENT_ID ...] [--status failed] [--since 2025-10-01] [--fetch]
+    flask payments event-stats
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import stripe
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions import db
+from utils import background
+from utils.background import now_utc as _now_utc
+from memberships.models import MembershipPlan
+from users.models import User
+from payments import billing, stripe_gateway
+from payments.models import StripeEvent
+
+log = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("STRIPE_EVENTS_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("STRIPE_EVENTS_MAX_ATTEMPTS", "8"))
+LEASE_SECONDS = int(os.getenv("STRIPE_EVENTS_LEASE", "300"))
+POLL_SECONDS = float(os.getenv("STRIPE_EVENTS_POLL", "5"))
+INLINE_WORKER = os.getenv("STRIPE_EVENTS_INLINE_WORKER", "1").lower() not in ("0", "false", "no")
+RETRY_BASE = 5       # seconds; doubles per attempt
+RETRY_CAP = 3600
+
+UNFINISHED = ("pending", "processing")
+
+
+# ---------- handlers ----------
+
+def plan_from_price_id(price_id: str | None):
+    if not price_id:
+        return None
+    return MembershipPlan.query.filter_by(stripe_price_id=price_id).first()
+
+def find_user(*, user_id=None, customer_id=None, subscription_id=None, email=None):
+    if user_id:
+        u = User.query.get(user_id)
+        if u:
+            return u
+    if customer_id:
+        u = User.query.filter_by(stripe_customer_id=customer_id).first()
+        if u:
+            return u
+    if subscription_id:
+        u = User.query.filter_by(stripe_subscription_id=subscription_id).first()
+        if u:
+            return u
+    if email:
+        u = User.query.filter(func.lower(User.email) == (email or "").lower()).first()
+        if u:
+            return u
+    return None
+
+def attach_membership(u: User, *, subscription_id=None, customer_id=None, price_id=None):
+    if customer_id and getattr(u, "stripe_customer_id", None) != customer_id:
+        u.stripe_customer_id = customer_id
+    if subscription_id:
+        u.stripe_subscription_id = subscription_id
+
+    plan = plan_from_price_id(price_id) if price_id else None
+    if plan:
+        u.membership_plan_id = plan.id
+    db.session.commit()
+
+def downgrade_user(u: User):
+    u.stripe_subscription_id = None
+    u.membership_plan_id = None
+    db.session.commit()
+
+def handle(event: dict):
+    """Apply one event. Raises to have it retried."""
+    etype = event["type"]
+    obj = event["data"]["object"]
+
+    if etype == "checkout.session.completed":
+        session = obj
+        customer_id = session.get("customer")
+        subscription_id = session.get("subscription")
+        metadata = session.get("metadata") or {}
+        user_id = metadata.get("user_id") or None
+
+        email = None
+        if isinstance(session.get("customer_details"), dict):
+            email = session["customer_details"].get("email")
+        if not email and isinstance(session.get("customer"), dict):
+            email = session["customer"].get("email")
+
+        price_id = None
+        try:
+            if subscription_id:
+                sub = stripe_gateway.call(stripe.Subscription.retrieve, subscription_id, expand=["items.data.price"])
+                items = (sub.get("items") or {}).get("data") or []
+                if items:
+                    price_id = (items[0].get("price") or {}).get("id")
+        except stripe.error.InvalidRequestError:
+            pass   # subscription gone: nothing to retry for; other Stripe errors are retried
+
+        user = find_user(user_id=user_id, customer_id=customer_id, subscription_id=subscription_id, email=email)
+        if user:
+            attach_membership(user, subscription_id=subscription_id, customer_id=customer_id, price_id=price_id)
+            billing.refresh_snapshot(user)
+
+    elif etype in ("customer.subscription.created", "customer.subscription.updated"):
+        sub = obj
+        customer_id = sub.get("customer")
+        subscription_id = sub.get("id")
+        status = sub.get("status")
+        items = (sub.get("items") or {}).get("data") or []
+        price_id = (items[0].get("price") or {}).get("id") if items else None
+
+        user = find_user(customer_id=customer_id, subscription_id=subscription_id)
+        if not user:
+            return
+
+        if status in ("active", "trialing", "past_due"):
+            attach_membership(user, subscription_id=subscription_id, customer_id=customer_id, price_id=price_id)
+        elif status in ("canceled", "unpaid", "incomplete_expired"):
+            downgrade_user(user)
+        else:
+            attach_membership(user, subscription_id=subscription_id, customer_id=customer_id, price_id=price_id)
+        billing.refresh_snapshot(user)
+
+    elif etype == "customer.subscription.deleted":
+        sub = obj
+        user = find_user(customer_id=sub.get("customer"), subscription_id=sub.get("id"))
+        if user:
+            downgrade_user(user)
+            billing.refresh_snapshot(user)
+
+    elif etype.startswith("invoice."):
+        # invoice.paid / invoice.upcoming / invoice.payment_failed ... move the
+        # next bill date or amount shown by /summary
+        user = find_user(customer_id=obj.get("customer"), subscription_id=obj.get("subscription"))
+        if user:
+            billing.refresh_snapshot(user)
+
+def _superseded(row: StripeEvent) -> bool:
+    """A newer event for the same subscription has already been applied."""
+    if not row.type.startswith("customer.subscription."):
+        return False
+    sub_id = (row.payload.get("data") or {}).get("object", {}).get("id")
+    return db.session.query(
+        StripeEvent.query.filter(
+            StripeEvent.ordering_key == row.ordering_key,
+            StripeEvent.type.like("customer.subscription.%"),
+            StripeEvent.payload["data"]["object"]["id"].astext == sub_id,
+            StripeEvent.stripe_created > row.stripe_created,
+            StripeEvent.status == "done",
+        ).exists()
+    ).scalar()
+
+
+# ---------- queue ----------
+
+def _customer_of(obj):
+    customer = obj.get("customer") if isinstance(obj, dict) else None
+    if isinstance(customer, dict):
+        customer = customer.get("id")
+    return customer
+
+def enqueue(event) -> bool:
+    """Store a verified event; False if it was already stored (a redelivery). Caller commits."""
+    payload = event.to_dict() if hasattr(event, "to_dict") else dict(event)
+    customer_id = _customer_of(payload["data"]["object"])
+    created = payload.get("created")
+    inserted = db.session.execute(
+        pg_insert(StripeEvent)
+        .values(
+            id=payload["id"],
+            type=payload["type"],
+            customer_id=customer_id,
+            ordering_key=customer_id or payload["id"],
+            stripe_created=datetime.fromtimestamp(created, tz=timezone.utc) if created else _now_utc(),
+            payload=payload,
+            status="pending",
+            attempts=0,
+            received_at=_now_utc(),
+            next_attempt_at=_now_utc(),
+        )
+        .on_conflict_do_nothing(index_elements=[StripeEvent.id])
+        .returning(StripeEvent.id)
+    ).scalar()
+    metrics.count("duplicates" if inserted is None else "received")
+    return inserted is not None
+
+_HEADS_SQL = """
+    SELECT id, ordering_key FROM (
+        SELECT DISTINCT ON (ordering_key) id, ordering_key, status, next_attempt_at, locked_at
+        FROM stripe_events
+        WHERE status IN ('pending', 'processing') {key_filter}
+        ORDER BY ordering_key, stripe_created, received_at, id
+    ) heads
+    WHERE (status = 'pending' AND next_attempt_at <= now())
+       OR (status = 'processing' AND locked_at < now() - make_interval(secs => :lease))
+    LIMIT :limit
+"""
+
+def _due_heads(limit, ordering_key=None):
+    """(id, ordering_key) of claimable events: the oldest unfinished event of each key, if due."""
+    sql = _HEADS_SQL.format(key_filter="AND ordering_key = :key" if ordering_key else "")
+    params = {"lease": LEASE_SECONDS, "limit": limit}
+    if ordering_key:
+        params["key"] = ordering_key
+    return [tuple(r) for r in db.session.execute(text(sql), params)]
+
+def _claim(event_id):
+    """Mark one event processing if it is still claimable; the StripeEvent or None."""
+    lease_cutoff = _now_utc() - timedelta(seconds=LEASE_SECONDS)
+    claimed = db.session.execute(
+        StripeEvent.__table__.update()
+        .where(StripeEvent.id == event_id)
+        .where(((StripeEvent.status == "pending") & (StripeEvent.next_attempt_at <= func.now()))
+               | ((StripeEvent.status == "processing") & (StripeEvent.locked_at < lease_cutoff)))
+        .values(status="processing", locked_at=func.now(), attempts=StripeEvent.attempts + 1)
+        .returning(StripeEvent.id)
+    ).scalar()
+    db.session.commit()
+    return db.session.get(StripeEvent, claimed) if claimed else None
+
+def _retry_delay(attempts):
+    return background.retry_delay(attempts, RETRY_BASE, RETRY_CAP)
+
+def process(row: StripeEvent):
+    """Run the handler for a claimed event and record the outcome (commits)."""
+    event_id, ordering_key = row.id, row.ordering_key
+    started = time.monotonic()
+    try:
+        if _superseded(row):
+            outcome = "skipped"
+        else:
+            handle(row.payload)
+            outcome = "done"
+    except Exception as e:
+        db.session.rollback()
+        row = db.session.get(StripeEvent, event_id)
+        row.last_error = f"{type(e).__name__}: {e}"[:2000]
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = "failed"
+            outcome = "failed"
+        else:
+            row.status = "pending"
+            row.next_attempt_at = _now_utc() + timedelta(seconds=_retry_delay(row.attempts))
+            outcome = "retried"
+        log.warning("stripe event %s (%s) %s: %s", event_id, row.type, outcome, row.last_error)
+    else:
+        row = db.session.get(StripeEvent, event_id)
+        row.status = outcome
+        row.last_error = None
+        row.processed_at = _now_utc()
+    row.locked_at = None
+    db.session.commit()
+
+    metrics.record(outcome, handle_seconds=time.monotonic() - started,
+                   lag_seconds=(row.processed_at - row.received_at).total_seconds() if row.processed_at else None)
+    return ordering_key, outcome
+
+def drain(limit=500):
+    """Process due events on the calling thread until none are left (or `limit`). For CLI use."""
+    n = 0
+    while n < limit:
+        ids = _due_heads(min(50, limit - n))
+        if not ids:
+            break
+        for event_id, _ in ids:
+            row = _claim(event_id)
+            if row:
+                process(row)
+                n += 1
+    return n
+
+
+# ---------- worker ----------
+
+class EventWorker(background.Runner):
+    """Dispatcher thread + bounded pool; one ordering key is in flight at a time."""
+
+    def __init__(self, workers=WORKERS):
+        super().__init__("stripe-events-dispatch", 1, POLL_SECONDS)
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stripe-events")
+        self._in_flight = set()   # ordering keys being processed here
+
+    def work(self):
+        with self._lock:
+            free = self.workers - len(self._in_flight)
+        if free <= 0:
+            return
+        for event_id, key in _due_heads(free * 2):
+            with self._lock:
+                if key in self._in_flight:
+                    continue   # its lane picks the next event up itself
+                self._in_flight.add(key)
+            if _claim(event_id) is None:
+                with self._lock:
+                    self._in_flight.discard(key)
+                continue
+            self._pool.submit(self._lane, key, event_id)
+            free -= 1
+            if free <= 0:
+                return
+
+    def _lane(self, ordering_key, event_id):
+        """Process the claimed event, then keep going with this key's next due event."""
+        try:
+            with self._app.app_context():
+                row = db.session.get(StripeEvent, event_id)
+                while row is not None:
+                    _, outcome = process(row)
+                    if outcome == "retried":
+                        break   # later events of this key wait for the retry
+                    ids = _due_heads(1, ordering_key)
+                    row = _claim(ids[0][0]) if ids else None
+                db.session.remove()
+        except Exception:
+            log.exception("stripe events: lane %s failed", ordering_key)
+        finally:
+            with self._lock:
+                self._in_flight.discard(ordering_key)
+            self._wake.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+_worker = EventWorker()
+
+def worker():
+    return _worker
+
+
+# ---------- metrics ----------
+
+class Metrics(background.Metrics):
+    """Event counters and timings, plus events finished per minute."""
+
+    def __init__(self):
+        super().__init__("handle_seconds", "lag_seconds")
+        self.finished_at = deque(maxlen=10000)
+
+    def record(self, outcome=None, **seconds):
+        super().record(outcome, **seconds)
+        if outcome in ("done", "skipped"):
+            with self._lock:
+                self.finished_at.append(time.monotonic())
+
+    def snapshot(self):
+        now = time.monotonic()
+        snap = super().snapshot()
+        with self._lock:
+            per_minute = sum(1 for t in self.finished_at if now - t <= 60)
+        return {"counts": snap.pop("counts"), "per_minute": per_minute, **snap}
+
+metrics = Metrics()
+
+def stats():
+    """Queue depth from the database plus this process's metrics."""
+    return {
+        "queue": background.queue_stats(StripeEvent.status, StripeEvent.received_at, UNFINISHED, _now_utc(),
+                                        reported=("done", "skipped", "failed")),
+        "worker": {"workers": _worker.workers, "in_flight": _worker.in_flight(), "inline": INLINE_WORKER},
+        "process": metrics.snapshot(),
+    }
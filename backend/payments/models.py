@@ -0,0 +1,70 @@
+# payments/models.py
+from datetime import datetime, timezone
+from sqlalchemy import Index, CheckConstraint, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from extensions import db
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+class BillingSnapshot(db.Model):
+    """
+    Last known Stripe billing state of one user, as served by
+    GET /api/payments/summary. Written by the Stripe webhook and by live
+    fallbacks; see payments/billing.py.
+    """
+    __tablename__ = "billing_snapshots"
+
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+
+    # None when no Stripe subscription was found for the user
+    stripe_subscription_id = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(32), nullable=True)
+    has_subscription = db.Column(db.Boolean, nullable=False, default=False)
+    cancel_at_period_end = db.Column(db.Boolean, nullable=False, default=False)
+
+    plan_id = db.Column(UUID(as_uuid=True), nullable=True)
+    plan_name = db.Column(db.String(100), nullable=False, default="Free")
+
+    next_bill_amount = db.Column(db.Integer, nullable=True)    # cents
+    next_bill_currency = db.Column(db.String(3), nullable=True)
+    next_bill_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    source = db.Column(db.String(10), nullable=False)          # 'webhook' | 'live'
+    refreshed_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+
+
+class StripeEvent(db.Model):
+    """
+    A Stripe webhook event, stored on receipt and processed in the
+    background by payments/events.py. The Stripe event id is the primary
+    key, so redeliveries of an event collapse onto one row.
+    """
+    __tablename__ = "stripe_events"
+
+    id = db.Column(db.String(255), primary_key=True)            # evt_...
+    type = db.Column(db.String(100), nullable=False)
+    customer_id = db.Column(db.String(255), nullable=True)
+    # events sharing a key are processed one at a time, oldest first:
+    # the customer id, or the event id for events without a customer
+    ordering_key = db.Column(db.String(255), nullable=False)
+    stripe_created = db.Column(db.DateTime(timezone=True), nullable=False)
+    payload = db.Column(JSONB, nullable=False)
+
+    # pending -> processing -> done | skipped (superseded) | failed (out of attempts)
+    status = db.Column(db.String(12), nullable=False, default="pending")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text, nullable=True)
+
+    received_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False, default=utcnow)
+    locked_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    processed_at = db.Column(db.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        CheckConstraint("status in ('pending','processing','done','skipped','failed')", name="ck_stripe_events_status"),
+        # queue heads: unfinished events per ordering key, oldest first
+        Index("ix_stripe_events_unfinished", "ordering_key", "stripe_created", "received_at", "id",
+              postgresql_where=text("status in ('pending','processing')")),
+        Index("ix_stripe_events_received_at", "received_at"),
+    )
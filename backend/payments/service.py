@@ -0,0 +1,343 @@
+# payments/service.py
+"""
+Checkout, membership binding and subscription changes, shared by the
+payments routes. Functions take the acting user and plain arguments and
+return the JSON payload; anything the client should see as an error is
+raised as PaymentError (the routes turn it into {"error": ..., "message"?}).
+
+Reads go through payments.stripe_gateway; the billing summary and the
+webhook queue live in payments/billing.py and payments/events.py.
+"""
+
+import os
+import stripe
+from sqlalchemy import func
+from extensions import db
+from memberships.models import MembershipPlan
+from users.models import User
+from payments import billing, stripe_gateway
+
+stripe.api_key = os.environ.get("STRIPE_SECRET_KEY")
+
+# Toggle Automatic Tax via env (enable only if your test-mode origin address is set in Stripe)
+ENABLE_AUTO_TAX = os.getenv("STRIPE_AUTOMATIC_TAX", "0").lower() in ("1", "true", "yes")
+
+# plan ids the client sends for "no paid plan"
+FREE_PLAN_IDS = {"free", "basic", "null", "none"}
+
+
+class PaymentError(Exception):
+    def __init__(self, error, status=400, message=None):
+        super().__init__(message or error)
+        self.error = error
+        self.status = status
+        self.message = message
+
+    def body(self):
+        if self.message is None:
+            return {"error": self.error}
+        return {"error": self.error, "message": self.message}
+
+def _stripe_error(e):
+    """PaymentError carrying Stripe's user-facing message."""
+    return PaymentError("StripeError", message=getattr(e, "user_message", None) or str(e))
+
+
+def frontend_domain() -> str:
+    return (os.environ.get("FRONTEND_URL", "http://localhost:3000") or "").rstrip("/")
+
+def _plan_id_str(raw_plan_id) -> str:
+    return ("" if raw_plan_id is None else str(raw_plan_id)).strip()
+
+def _is_free(plan_id: str) -> bool:
+    return not plan_id or plan_id.lower() in FREE_PLAN_IDS
+
+
+# ---------- customers ----------
+
+def customer_if_valid(customer_id):
+    try:
+        cust = stripe_gateway.call(stripe.Customer.retrieve, customer_id)
+        return cust["id"]
+    except stripe.error.InvalidRequestError:
+        # Stale or wrong-account customer; ignore it so Checkout creates a fresh one
+        return None
+
+def validated_customer_id(user):
+    """Return a usable Stripe customer id for this account, or None if stale/invalid."""
+    if not user or not getattr(user, "stripe_customer_id", None):
+        return None
+    return customer_if_valid(user.stripe_customer_id)
+
+def _downgrade_locally(user, clear_subscription=True):
+    """Best effort: drop the membership (and subscription id) on our side."""
+    try:
+        if clear_subscription:
+            user.stripe_subscription_id = None
+        user.membership_plan_id = None
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+# ---------- checkout ----------
+
+def _create_checkout_session(plan, user, customer_id, success_path, cancel_path):
+    domain = frontend_domain()
+    session_args = {
+        "mode": "subscription",
+        "line_items": [{"price": plan.stripe_price_id, "quantity": 1}],
+        "success_url": f"{domain}{success_path}?planId={plan.id}&session_id={{CHECKOUT_SESSION_ID}}",
+        "cancel_url": f"{domain}{cancel_path}",
+        "allow_promotion_codes": True,
+        "metadata": {
+            "plan_id": str(plan.id),
+            "user_id": str(user.id) if user else "",
+        },
+    }
+
+    # Only pass one of these
+    customer_email = user.email if user else None
+    if customer_id:
+        session_args["customer"] = customer_id
+    elif customer_email:
+        session_args["customer_email"] = customer_email
+
+    # Conditionally enable Automatic Tax if configured
+    if ENABLE_AUTO_TAX:
+        session_args["automatic_tax"] = {"enabled": True}
+        # Optional: require address so taxes can be calculated accurately
+        session_args["billing_address_collection"] = "required"
+
+    try:
+        return stripe.checkout.Session.create(**session_args)
+    except stripe.error.StripeError as e:
+        try:
+            err = e.json_body.get("error", {})
+            print("StripeError:", {
+                "message": err.get("message"),
+                "code": err.get("code"),
+                "param": err.get("param"),
+                "type": err.get("type"),
+            })
+        except Exception:
+            print("StripeError:", str(e))
+        raise _stripe_error(e)
+
+def checkout(user, raw_plan_id, success_path="/billing/success", cancel_path="/"):
+    """Stripe Checkout for a paid plan; a free plan goes straight to the success page."""
+    plan_id = _plan_id_str(raw_plan_id)
+    if _is_free(plan_id):
+        return {"url": f"{frontend_domain()}{success_path}?planId=free"}
+
+    plan = MembershipPlan.query.get(plan_id)
+    if not plan:
+        raise PaymentError(f"Unknown plan_id '{plan_id}'")
+
+    if not getattr(plan, "stripe_price_id", None):
+        raise PaymentError(
+            "MissingStripePriceId",
+            message=f"Plan '{plan.name}' (id={plan.id}) has no stripe_price_id configured. "
+                    f"Please add a valid Stripe Price ID in your DB or when creating the plan."
+        )
+
+    # Validate any saved customer id (avoid 400 if it's from a different account)
+    try:
+        customer_id = validated_customer_id(user)
+    except stripe.error.StripeError as e:
+        raise _stripe_error(e)
+
+    session = _create_checkout_session(plan, user, customer_id, success_path, cancel_path)
+    # Return both so the client can prefer hosted URL (avoids pk/sk/account mismatch issues)
+    return {"sessionId": session["id"], "url": session.get("url")}
+
+
+def _session_user(session, current_user):
+    meta = session.get("metadata") or {}
+    user = None
+    if meta.get("user_id"):
+        user = User.query.get(meta["user_id"])
+    if not user and current_user:
+        user = current_user
+    if not user:
+        email = None
+        cust = session.get("customer")
+        if isinstance(cust, dict):
+            email = cust.get("email")
+        if not email:
+            email = (session.get("customer_details") or {}).get("email")
+        if email:
+            user = User.query.filter(func.lower(User.email) == email.lower()).first()
+    return user
+
+def confirm_checkout(current_user, session_id, plan_id=None):
+    """Bind the plan bought in Checkout session `session_id` to its user."""
+    if not session_id:
+        raise PaymentError("Missing session_id")
+
+    try:
+        session = stripe.checkout.Session.retrieve(
+            session_id, expand=["subscription", "customer", "customer_details"]
+        )
+    except Exception as e:
+        raise PaymentError(f"Unable to retrieve session: {e}")
+
+    if session.get("payment_status") not in ("paid", "no_payment_required"):
+        raise PaymentError("Payment not completed")
+
+    user = _session_user(session, current_user)
+    if not user:
+        raise PaymentError("Could not resolve user to attach membership")
+
+    # Resolve plan
+    plan_id = plan_id or (session.get("metadata") or {}).get("plan_id")
+    plan = MembershipPlan.query.get(plan_id) if plan_id else None
+    if not plan:
+        raise PaymentError("Could not resolve plan")
+
+    # Persist Stripe IDs
+    stripe_customer_id = None
+    cust_obj = session.get("customer")
+    if isinstance(cust_obj, str):
+        stripe_customer_id = cust_obj
+    elif isinstance(cust_obj, dict):
+        stripe_customer_id = cust_obj.get("id")
+
+    stripe_subscription_id = None
+    if session.get("mode") == "subscription":
+        sub = session.get("subscription")
+        stripe_subscription_id = sub if isinstance(sub, str) else (sub or {}).get("id")
+
+    if hasattr(user, "stripe_customer_id") and stripe_customer_id:
+        if not user.stripe_customer_id:
+            user.stripe_customer_id = stripe_customer_id
+    if hasattr(user, "stripe_subscription_id"):
+        user.stripe_subscription_id = stripe_subscription_id
+
+    user.membership_plan_id = plan.id
+    db.session.commit()
+    billing.invalidate_snapshot(user.id)
+
+    return {
+        "message": "Membership updated",
+        "user_id": str(user.id),
+        "plan_id": str(plan.id),
+        "stripe_customer_id": stripe_customer_id,
+        "stripe_subscription_id": stripe_subscription_id,
+    }
+
+
+# ---------- billing portal ----------
+
+def billing_portal(user):
+    """Stripe billing portal URL, creating the Stripe customer if needed."""
+    try:
+        # Validate any existing customer id; returns None if stale/invalid
+        customer_id = validated_customer_id(user)
+
+        # If missing or invalid, create a fresh Stripe Customer now
+        if not customer_id:
+            cust = stripe.Customer.create(
+                email=getattr(user, "email", None) or None,
+                name=getattr(user, "full_name", None) or None,
+                metadata={"user_id": str(user.id)},
+            )
+            customer_id = cust["id"]
+
+            # Best-effort persist so future calls don't recreate
+            try:
+                if hasattr(user, "stripe_customer_id"):
+                    user.stripe_customer_id = customer_id
+                    db.session.commit()
+            except Exception as persist_err:
+                # Don't block portal on a DB write issue
+                db.session.rollback()
+                print("[/portal] warning: failed to persist stripe_customer_id:", repr(persist_err))
+
+        portal = stripe.billing_portal.Session.create(
+            customer=customer_id,
+            return_url=f"{frontend_domain()}/profile/{user.id}",
+        )
+        return {"url": portal.url}
+    except stripe.error.StripeError as e:
+        raise _stripe_error(e)
+
+
+# ---------- subscription changes ----------
+
+def cancel_subscription(user, at_period_end=True):
+    """Cancel the user's subscription (at period end by default) and fall back to Free."""
+    sub_id = getattr(user, "stripe_subscription_id", None)
+    if not sub_id:
+        # Idempotent success: nothing to cancel on Stripe, but downgrade the
+        # account so the UI becomes consistent.
+        _downgrade_locally(user, clear_subscription=False)
+        return {"ok": True, "noop": True, "message": "No active subscription on file"}
+
+    try:
+        if at_period_end:
+            stripe.Subscription.modify(sub_id, cancel_at_period_end=True)
+            return {"ok": True, "at_period_end": True}
+        stripe.Subscription.delete(sub_id)
+        # clear locally too; the webhook will also do it
+        _downgrade_locally(user)
+        return {"ok": True, "at_period_end": False}
+
+    except stripe.error.InvalidRequestError as e:
+        # "No such subscription" => reconcile locally so UI isn't stuck
+        _downgrade_locally(user)
+        return {"ok": True, "reconciled": True, "message": getattr(e, "user_message", None) or str(e)}
+    except stripe.error.StripeError as e:
+        raise _stripe_error(e)
+
+def change_plan(user, raw_plan_id, at_period_end=True):
+    """
+    1-click upgrade/downgrade: a free plan cancels, an existing subscription
+    has its price swapped, otherwise a Checkout session is created.
+    """
+    plan_id = _plan_id_str(raw_plan_id)
+    if not plan_id:
+        raise PaymentError("Missing plan_id", 422)
+
+    if _is_free(plan_id):
+        return cancel_subscription(user, at_period_end)
+
+    # The Stripe lookup (subscription, or else the saved customer) runs on
+    # the gateway pool while the plan is read from the DB
+    sub_id = getattr(user, "stripe_subscription_id", None)
+    cust_id = getattr(user, "stripe_customer_id", None)
+    if sub_id:
+        pending = stripe_gateway.submit(stripe.Subscription.retrieve, sub_id, expand=["items.data"])
+    else:
+        pending = stripe_gateway.executor().submit(customer_if_valid, cust_id) if cust_id else None
+
+    plan = MembershipPlan.query.get(plan_id)
+    if not plan or not plan.stripe_price_id:
+        if pending:
+            pending.cancel()
+        raise PaymentError("Target plan invalid or not billable")
+
+    try:
+        if not sub_id:
+            # No active subscription: create Checkout and return URL
+            customer_id = pending.result() if pending else None
+            session = _create_checkout_session(plan, user, customer_id, "/billing/success", "/")
+            return {"created_checkout": True, "sessionId": session["id"], "url": session.get("url")}
+
+        # Active subscription: do a price swap
+        sub = pending.result()
+        items = (sub.get("items") or {}).get("data") or []
+        if not items:
+            raise PaymentError("Subscription has no items")
+        current_price = (items[0].get("price") or {}).get("id")
+        if current_price == plan.stripe_price_id:
+            return {"ok": True, "subscription_id": sub["id"], "noop": True}
+
+        updated = stripe.Subscription.modify(
+            sub["id"],
+            items=[{"id": items[0]["id"], "price": plan.stripe_price_id}],
+            proration_behavior="create_prorations",
+        )
+        return {"ok": True, "subscription_id": updated["id"]}
+    except stripe.error.StripeError as e:
+        raise _stripe_error(e)
@@ -0,0 +1,116 @@
+# payments/stripe_gateway.py
+"""
+Stripe calls for the payments routes.
+
+    call(stripe.Subscription.retrieve, sub_id)       # timeouts + retries, this thread
+    fut = submit(stripe.Customer.retrieve, cus_id)   # same, on the shared pool
+    a, b = gather((stripe.Invoice.upcoming, (), {"subscription": sid}),
+                  (stripe.Invoice.list, (), {"subscription": sid, "limit": 1}),
+                  return_exceptions=True)
+
+Independent calls issued through gather()/submit() run concurrently on a
+bounded pool of STRIPE_GATEWAY_WORKERS threads, so a page that needs
+three lookups waits for the slowest one, not for all three in turn.
+
+Every Stripe request in the process (including plain stripe.* calls)
+goes through one requests.Session with a keep-alive connection pool and
+(STRIPE_CONNECT_TIMEOUT, STRIPE_READ_TIMEOUT) timeouts. call() retries
+connection errors, rate limits and 5xx up to STRIPE_CALL_RETRIES times
+with full-jitter exponential backoff. It is meant for reads; a write must
+pass idempotency_key=, which every attempt reuses, so a retried write is
+applied once.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+
+MAX_WORKERS = int(os.getenv("STRIPE_GATEWAY_WORKERS", "8"))
+CONNECT_TIMEOUT = float(os.getenv("STRIPE_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("STRIPE_READ_TIMEOUT", "10"))
+RETRIES = int(os.getenv("STRIPE_CALL_RETRIES", "2"))
+BACKOFF_BASE = 0.25   # seconds
+BACKOFF_CAP = 2.0
+
+
+# ---------- HTTP client ----------
+
+def _http_client():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=MAX_WORKERS * 2, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)   # local stubs (STRIPE_API_BASE)
+    return stripe.RequestsClient(timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), session=session)
+
+stripe.default_http_client = _http_client()
+
+
+# ---------- retries ----------
+
+def _retryable(e):
+    if isinstance(e, (stripe.error.APIConnectionError, stripe.error.RateLimitError)):
+        return True
+    return isinstance(e, stripe.error.APIError) and (e.http_status or 500) >= 500
+
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+def call(fn, *args, retries=None, **params):
+    """fn(*args, **params) with jittered retries; stripe's own retry loop is disabled."""
+    retries = RETRIES if retries is None else retries
+    params.setdefault("max_network_retries", 0)
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **params)
+        except stripe.error.StripeError as e:
+            if attempt == retries or not _retryable(e):
+                raise
+            time.sleep(_backoff(attempt))
+
+
+# ---------- concurrency ----------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="stripe-gateway")
+        return _pool
+
+def deadline():
+    """Worst case for one call(): every attempt times out, plus the backoffs."""
+    return (RETRIES + 1) * (CONNECT_TIMEOUT + READ_TIMEOUT) + RETRIES * BACKOFF_CAP
+
+def submit(fn, *args, **params):
+    """Future of call(fn, *args, **params) on the gateway pool."""
+    return executor().submit(call, fn, *args, **params)
+
+def gather(*calls, return_exceptions=False, timeout=None):
+    """
+    Run (fn, args, kwargs) tuples concurrently and return their results in
+    order. With return_exceptions, a failed call yields its exception
+    instead of raising. Calls still running after `timeout` (default
+    deadline()) are reported as TimeoutError.
+    """
+    futures = [submit(fn, *args, **kwargs) for fn, args, kwargs in calls]
+    wait(futures, timeout=deadline() if timeout is None else timeout)
+
+    results = []
+    for fut in futures:
+        if not fut.done():
+            fut.cancel()
+            err = TimeoutError("Stripe call did not finish in time")
+        else:
+            err = fut.exception()
+        if err is not None and not return_exceptions:
+            raise err
+        results.append(err if err is not None else fut.result())
+    return results
@@ -0,0 +1,94 @@
+# scripts/bench_auth.py
+"""
+Microbenchmark: per-request authentication overhead, old decorators vs utils.auth.
+
+    cd backend && python scripts/bench_auth.py [--requests 2000] [--email someone@example.com]
+
+"before" repeats what each of the old token decorators did per request:
+decode the JWT and load the user by primary key (ai/decorators also printed
+the header and payload; pass --with-prints to include that). "after" runs
+utils.auth.authenticate(), i.e. one memoized decode plus a principal-cache
+lookup. Each iteration gets a fresh request context and session, as a real
+request would.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from app import create_app
+from extensions import db
+from users.models import User
+from utils import auth, principal_cache
+from utils.jwt_token import generate_jwt_token
+
+
+def _before(token, with_prints):
+    header = f"Bearer {token}"
+    if with_prints:
+        print(f"Raw Authorization header: {header}")
+    payload = jwt.decode(header.split()[1], auth.SECRET, algorithms=["HS256"])
+    if with_prints:
+        print(f"JWT payload: {payload}")
+    return db.session.get(User, payload["id"])
+
+def _after(token, with_prints):
+    return auth.authenticate("user")[1]
+
+def _run(app, fn, token, n, with_prints):
+    headers = {"Authorization": f"Bearer {token}"}
+    timings = []
+    sink = io.StringIO()
+    for _ in range(n):
+        with app.test_request_context("/", headers=headers), contextlib.redirect_stdout(sink):
+            t0 = time.perf_counter()
+            user = fn(token, with_prints)
+            timings.append(time.perf_counter() - t0)
+            assert user is not None
+            db.session.remove()
+        sink.seek(0)
+        sink.truncate()
+    return timings
+
+def _report(label, timings):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1e6
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1e6
+    print(f"{label:<7} mean {statistics.fmean(timings) * 1e6:8.1f} us   p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--email", help="user to authenticate as (default: first user)")
+    ap.add_argument("--with-prints", action="store_true", help="include the old ai/decorators prints in 'before'")
+    args = ap.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        q = User.query.filter_by(email=args.email) if args.email else User.query
+        user = q.first()
+        if user is None:
+            sys.exit("no user to authenticate as")
+        token = generate_jwt_token(str(user.id), user.email)
+        db.session.remove()
+
+    principal_cache.clear()
+    before = _run(app, _before, token, args.requests, args.with_prints)
+    after = _run(app, _after, token, args.requests, args.with_prints)
+
+    print(f"{args.requests} requests each")
+    _report("before", before)
+    _report("after", after)
+    print(f"speedup {statistics.fmean(before) / statistics.fmean(after):.1f}x   cache {principal_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# scripts/bench_recurrence.py
+"""
+Benchmark: reading one week of a recurring appointment, one row per
+occurrence vs one CalendarSeries row expanded lazily.
+
+    cd backend && python scripts/bench_recurrence.py [--lengths 52,520,5200,52000] [--repeat 200]
+
+For every series length N (weekly sessions) it builds, inside a
+transaction that is rolled back at the end:
+
+  rows    N CalendarEvent rows, read with the admin feed's range query
+  series  one CalendarSeries, read with series_query() + occurrences()
+          (indexed lookups of the series and its exceptions, rule
+          fast-forwarded to the window)
+  naive   the same rule expanded from DTSTART with dateutil's between(),
+          i.e. what the series read would cost without fast-forwarding
+
+The window is the last full week of the series, the worst case for
+expanding from the start. "event rows" / "series rows" is what the same
+schedule occupies in each table.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dateutil.rrule import rrulestr
+from sqlalchemy import insert, select
+from app import create_app
+from extensions import db
+from users.models import User
+from appointments.models import CalendarEvent, CalendarSeries
+from appointments import recurrence
+
+TZ = "America/Chicago"
+FIRST = datetime(2030, 1, 7, 16)    # a Monday, 10am Chicago
+DURATION = timedelta(hours=1)
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000, n
+
+def _setup(n, user):
+    rule, dtstart, starts = recurrence.build_rule(f"FREQ=WEEKLY;COUNT={n}", FIRST, TZ, max_occurrences=n)
+    tag = uuid.uuid4().hex[:8]
+    db.session.execute(insert(CalendarEvent), [
+        {"id": uuid.uuid4(), "title": f"bench-{tag}", "event_type": "workout", "user_id": user.id,
+         "status": "approved", "start_time": s, "end_time": s + DURATION, "created_at": FIRST}
+        for s in starts
+    ])
+    series = CalendarSeries(title=f"bench-{tag}", event_type="workout", user_id=user.id, status="approved",
+                            dtstart=dtstart, timezone=TZ, duration_minutes=60, rrule=rule,
+                            occurrence_count=n, first_start=starts[0], last_end=starts[-1] + DURATION)
+    db.session.add(series)
+    db.session.flush()
+    window = (starts[-1] - timedelta(days=7), starts[-1] + DURATION)
+    return tag, series, window
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lengths", default="52,520,5200,52000", help="comma-separated series lengths")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    lengths = [int(n) for n in args.lengths.split(",")]
+
+    app = create_app()
+    with app.app_context():
+        user = User(full_name="Recurrence Bench", email=f"bench-{uuid.uuid4().hex[:8]}@example.invalid",
+                    password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+
+        print(f"{'length':>8} {'event rows':>11} {'series rows':>12} {'rows ms':>9} {'series ms':>10} {'naive ms':>9}  in window")
+        try:
+            for n in lengths:
+                tag, series, (start, end) = _setup(n, user)
+                ce = CalendarEvent
+
+                def read_rows():
+                    return len(db.session.execute(
+                        select(ce.id, ce.start_time, ce.end_time)
+                        .where(ce.start_time >= start, ce.end_time <= end, ce.title == f"bench-{tag}")
+                        .order_by(ce.start_time, ce.id)).all())
+
+                def read_series():
+                    found = (recurrence.series_query(start, end)
+                             .filter(CalendarSeries.id == series.id).all())
+                    return len(recurrence.occurrences(found, start, end))
+
+                naive_rule = rrulestr(series.rrule, dtstart=series.dtstart)
+                local_lo = recurrence.to_local(start, recurrence.zone_for(TZ)) - DURATION
+                local_hi = recurrence.to_local(end, recurrence.zone_for(TZ))
+
+                def read_naive():
+                    return len(naive_rule.between(local_lo, local_hi, inc=True))
+
+                rows_ms, rows_n = _time(read_rows, args.repeat)
+                series_ms, series_n = _time(read_series, args.repeat)
+                naive_ms, _ = _time(read_naive, max(1, args.repeat // 10))
+                assert rows_n == series_n, (rows_n, series_n)
+                print(f"{n:>8} {n:>11} {1:>12} {rows_ms:>9.3f} {series_ms:>10.3f} {naive_ms:>9.3f}  {series_n}")
+        finally:
+            db.session.rollback()
+
+
+if __name__ == "__main__":
+    main()
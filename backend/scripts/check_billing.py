@@ -0,0 +1,184 @@
+# scripts/check_billing.py
+"""
+Check of the billing summary snapshot (payments/billing.py) against a
+Stripe stand-in.
+
+    stripe-mock -http-port 12111 &
+    cd backend && python scripts/check_billing.py [--stripe-base http://localhost:12111]
+
+    cd backend && python scripts/check_billing.py --stub   # no stripe-mock at hand
+
+It points the stripe client at stripe-mock (STRIPE_API_BASE, default
+http://localhost:12111) or, with --stub, at a minimal in-process server
+that answers the subscription and invoice lookups the summary makes.
+Stripe requests are counted on the client side, so both work the same.
+For a throwaway user with a customer and subscription id it asserts:
+
+  1. no snapshot      get_summary() goes 'live', calls Stripe, stores one
+  2. fresh snapshot   get_summary() is 'snapshot' with zero Stripe calls
+  3. Stripe down      with the snapshot expired and Stripe unreachable,
+                      get_summary() is 'stale' and returns the snapshot
+  4. Stripe down, no snapshot: get_summary() raises
+
+The user (and with it the snapshot) is deleted at the end. Exits non-zero
+on the first mismatch.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stripe
+from app import create_app
+from extensions import db
+from payments import billing
+from payments.models import BillingSnapshot
+from users.models import User
+
+UNREACHABLE = "http://127.0.0.1:9"   # discard port: connection refused
+
+_calls = {"n": 0}
+
+
+def _check(label, expected, actual):
+    ok = expected == actual
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}: expected {expected}, got {actual}")
+    if not ok:
+        sys.exit(1)
+
+def _count(response, *args, **kwargs):
+    _calls["n"] += 1
+
+def _summary(user):
+    before = _calls["n"]
+    summary, source = billing.get_summary(user)
+    return summary, source, _calls["n"] - before
+
+
+# ---------- in-process stand-in (--stub) ----------
+
+PERIOD_END = int(time.time()) + 20 * 86400
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Just enough of the Stripe API for live_summary()."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _subscription(self, sub_id):
+        return {
+            "id": sub_id, "object": "subscription", "status": "active",
+            "cancel_at_period_end": False, "current_period_end": PERIOD_END,
+            "items": {"object": "list", "data": [{
+                "object": "subscription_item", "quantity": 1,
+                "price": {"object": "price", "unit_amount": 4900, "currency": "usd", "nickname": "Pro",
+                          "product": {"object": "product", "name": "Pro Membership"}},
+            }]},
+            "latest_invoice": {"object": "invoice", "lines": {"object": "list", "data": [
+                {"object": "line_item", "period": {"end": PERIOD_END}}]}},
+        }
+
+    def _route(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/v1/subscriptions/"):
+            return self._reply(200, self._subscription(path.rsplit("/", 1)[1]))
+        if path == "/v1/subscriptions":
+            return self._reply(200, {"object": "list", "data": [self._subscription("sub_stub")]})
+        if path in ("/v1/invoices/upcoming", "/v1/invoices/create_preview"):
+            return self._reply(200, {"object": "invoice", "total": 4900, "currency": "usd",
+                                     "period_end": PERIOD_END})
+        if path == "/v1/invoices":
+            return self._reply(200, {"object": "list", "data": []})
+        self._reply(404, {"error": {"type": "invalid_request_error", "message": f"no stub for {path}"}})
+
+    def do_GET(self):
+        self._route()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._route()
+
+
+# ---------- checks ----------
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--stripe-base", default=os.getenv("STRIPE_API_BASE", "http://localhost:12111"),
+                    help="stripe-mock base URL")
+    ap.add_argument("--stub", action="store_true", help="use the in-process stand-in instead of stripe-mock")
+    args = ap.parse_args()
+
+    if args.stub:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+    else:
+        base = args.stripe_base
+    stripe.api_key = stripe.api_key or "sk_test_123"
+    stripe.default_http_client._session.hooks["response"].append(_count)
+
+    app = create_app()
+    with app.app_context():
+        tag = uuid.uuid4().hex[:10]
+        user = User(full_name="Billing Check", email=f"billing-{tag}@example.invalid", password_hash="!",
+                    stripe_customer_id=f"cus_check{tag}", stripe_subscription_id=f"sub_check{tag}")
+        db.session.add(user)
+        db.session.commit()
+        try:
+            print(f"1. no snapshot (Stripe at {base})")
+            stripe.api_base = base
+            summary, source, calls = _summary(user)
+            _check("source", "live", source)
+            _check("Stripe called", True, calls > 0)
+            _check("snapshot stored", True, db.session.get(BillingSnapshot, user.id) is not None)
+            live = {k: summary[k] for k in ("has_subscription", "status", "next_bill")}
+
+            print("2. fresh snapshot")
+            summary, source, calls = _summary(user)
+            _check("source", "snapshot", source)
+            _check("Stripe calls", 0, calls)
+            _check("same summary", live, {k: summary[k] for k in live})
+
+            print("3. snapshot expired, Stripe unreachable")
+            snap = db.session.get(BillingSnapshot, user.id)
+            snap.refreshed_at -= timedelta(seconds=billing.SNAPSHOT_TTL + 1)
+            db.session.commit()
+            stripe.api_base = UNREACHABLE
+            summary, source, calls = _summary(user)
+            _check("source", "stale", source)
+            _check("same summary", live, {k: summary[k] for k in live})
+
+            print("4. no snapshot, Stripe unreachable")
+            billing.invalidate_snapshot(user.id)
+            try:
+                billing.get_summary(user)
+                raised = None
+            except Exception as e:
+                raised = type(e).__name__
+            _check("raises", "APIConnectionError", raised)
+            print("all sources as expected")
+        finally:
+            stripe.api_base = base
+            db.session.rollback()
+            User.query.filter_by(id=user.id).delete()
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
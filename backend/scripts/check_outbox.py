@@ -0,0 +1,178 @@
+# scripts/check_outbox.py
+"""
+End-to-end check of the email outbox against the local SMTP stand-in.
+
+    cd backend && python scripts/check_outbox.py [--batch 4]
+
+Starts scripts/smtp_sink.py in-process on a free port, points the outbox
+at it and runs outbox.drain() through five scenarios, asserting the
+resulting EmailLog rows and the sink's counters:
+
+  1. clean      every row sent on its first attempt over one connection
+  2. 451 / 550  every 3rd DATA answered 451 and one recipient refused
+                with 550: the 451s are queued for a retry, the 550 failed,
+                the rest sent, still over one connection
+  3. delay      a slow relay (0.2 s per DATA) delays but loses nothing
+  4. refused    the relay greets with 554: the first batch goes back to
+                'queued' for a retry with its attempt given back, nothing
+                is failed and drain() stops instead of claiming the next
+                batch; refused again on more drains than
+                EMAIL_OUTBOX_MAX_ATTEMPTS, still nothing is failed
+  5. bad login  every AUTH answered 535: one login for the whole batch,
+                not one per email, and nothing is failed
+
+It refuses to run while other emails are due (drain() would send them to
+the sink); stop any sender using the same database first. Its own rows
+are deleted at the end. Exits non-zero on the first mismatch.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+from app import create_app
+from extensions import db
+from appointments import outbox
+from appointments.email_utils import SmtpConnection
+from appointments.models import EmailLog
+from scripts import smtp_sink
+
+SUBJECT = f"outbox-check {uuid.uuid4().hex[:10]}"
+
+
+def _check(label, expected, actual):
+    ok = expected == actual
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}: expected {expected}, got {actual}")
+    if not ok:
+        sys.exit(1)
+
+def _queue(recipients):
+    for r in recipients:
+        outbox.queue_email(r, SUBJECT, "Your session is confirmed.")
+    db.session.commit()
+
+def _rows():
+    return EmailLog.query.filter_by(subject=SUBJECT).order_by(EmailLog.created_at).all()
+
+def _by_status(rows):
+    found = {}
+    for row in rows:
+        found[row.status] = found.get(row.status, 0) + 1
+    return found
+
+def _reset():
+    EmailLog.query.filter_by(subject=SUBJECT).delete()
+    db.session.commit()
+
+def _connection(port, login=False):
+    os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT=str(port), SMTP_STARTTLS="0",
+                      SMTP_USER="outbox-check" if login else "", SMTP_PASS="secret" if login else "")
+    return SmtpConnection()
+
+def _scenario(title, server, port, recipients, login=False, **sink_opts):
+    print(title)
+    server.opts = argparse.Namespace(**dict(
+        dict(delay=0.0, fail_every=0, reject_domain=None, refuse=False, reject_auth=False), **sink_opts))
+    _reset()
+    _queue(recipients)
+    before = dict(smtp_sink._counts)
+    conn = _connection(port, login)
+    started = time.monotonic()
+    try:
+        outcomes = outbox.drain(conn=conn)
+    finally:
+        conn.close()
+    elapsed = time.monotonic() - started
+    sink = {k: smtp_sink._counts[k] - before[k] for k in before}
+    db.session.expire_all()
+    return outcomes, sink, _rows(), elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--batch", type=int, default=4, help="outbox batch size for the run")
+    args = ap.parse_args()
+    outbox.BATCH = args.batch
+
+    server = smtp_sink.SinkServer(("127.0.0.1", 0), smtp_sink.SinkHandler)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    app = create_app()
+    with app.app_context():
+        due = (EmailLog.query
+               .filter(or_(EmailLog.status == "sending",
+                           (EmailLog.status == "queued") & (EmailLog.next_attempt_at <= datetime.utcnow())))
+               .count())
+        if due:
+            sys.exit(f"{due} email(s) are due in the outbox; send them first (flask appointments send-emails --once)")
+
+        try:
+            n = 2 * args.batch
+            outcomes, sink, rows, _ = _scenario(f"1. clean: {n} emails", server, port,
+                                                [f"client{i}@example.test" for i in range(n)])
+            _check("sent rows", {"sent": n}, _by_status(rows))
+            _check("attempts", [1] * n, [r.attempts for r in rows])
+            _check("connections to the sink", 1, sink["connections"])
+            _check("connections_opened", 1, outcomes["connections_opened"])
+
+            good = [f"client{i}@example.test" for i in range(6)]
+            outcomes, sink, rows, _ = _scenario("2. every 3rd DATA -> 451, one RCPT -> 550", server, port,
+                                                good + ["nobody@bad.test"], fail_every=3, reject_domain="bad.test")
+            _check("sink: messages / 451s / 550s", (4, 2, 1),
+                   (sink["messages"], sink["temp_failures"], sink["rejected"]))
+            _check("rows by status", {"sent": 4, "queued": 2, "failed": 1}, _by_status(rows))
+            _check("451 rows scheduled for later", True,
+                   all(r.next_attempt_at > datetime.utcnow() and "451" in r.error_message
+                       for r in rows if r.status == "queued"))
+            _check("550 row", ("nobody@bad.test", 1, True),
+                   next((r.recipient, r.attempts, "550" in r.error_message) for r in rows if r.status == "failed"))
+            _check("connections to the sink", 1, sink["connections"])
+
+            outcomes, sink, rows, elapsed = _scenario("3. slow relay, 0.2 s per DATA", server, port,
+                                                      good[:3], delay=0.2)
+            _check("rows by status", {"sent": 3}, _by_status(rows))
+            _check("took at least 3 x 0.2 s", True, elapsed >= 0.6)
+            _check("connections to the sink", 1, sink["connections"])
+
+            outcomes, sink, rows, _ = _scenario(f"4. relay greets with 554, {n} emails", server, port,
+                                                [f"client{i}@example.test" for i in range(n)], refuse=True)
+            _check("rows by status", {"queued": n}, _by_status(rows))
+            _check("attempts", [0] * n, [r.attempts for r in rows])
+            _check("put back (first batch only)", args.batch, outcomes["put_back"])
+            _check("smtp_unavailable", 1, outcomes["smtp_unavailable"])
+            _check("connections to the sink", 1, sink["connections"])
+
+            for _ in range(outbox.MAX_ATTEMPTS + 1):
+                EmailLog.query.filter_by(subject=SUBJECT).update({"next_attempt_at": datetime.utcnow()})
+                db.session.commit()
+                conn = _connection(port)
+                try:
+                    outbox.drain(conn=conn)
+                finally:
+                    conn.close()
+            db.session.expire_all()
+            rows = _rows()
+            _check(f"after {outbox.MAX_ATTEMPTS + 1} more refused drains", {"queued": n}, _by_status(rows))
+            _check("attempts", [0] * n, [r.attempts for r in rows])
+
+            outcomes, sink, rows, _ = _scenario(f"5. login answered 535, {args.batch} emails", server, port,
+                                                good[:args.batch], login=True, reject_auth=True)
+            _check("rows by status", {"queued": args.batch}, _by_status(rows))
+            _check("login attempts", 1, sink["auth_failures"])
+            _check("connections to the sink", 1, sink["connections"])
+            print("all outcomes as expected")
+        finally:
+            _reset()
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
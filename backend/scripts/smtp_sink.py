@@ -0,0 +1,125 @@
+# scripts/smtp_sink.py
+"""
+Local SMTP stand-in for the email outbox.
+
+    cd backend && python scripts/smtp_sink.py [--port 2525] [--delay 0.2] [--fail-every 5] [--reject-domain bad.test]
+                                              [--refuse] [--reject-auth]
+
+then run the app (or `flask appointments send-emails`) with
+
+    SMTP_HOST=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=0
+
+It accepts any mail without authentication and prints one line per
+message and per connection, so connection reuse is visible. --delay
+slows down every DATA like a sluggish relay, --fail-every N answers
+every Nth message with a temporary 451 (the outbox retries it), and
+--reject-domain answers RCPT for that domain with a permanent 550.
+--refuse greets every connection with 554 and hangs up, like a relay
+that is turning clients away, and --reject-auth offers AUTH and answers
+every login with 535.
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+
+_lock = threading.Lock()
+_counts = {"connections": 0, "messages": 0, "temp_failures": 0, "rejected": 0, "auth_failures": 0}
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        opts = self.server.opts
+        with _lock:
+            _counts["connections"] += 1
+            conn_no = _counts["connections"]
+        print(f"[sink] connection {conn_no} from {self.client_address[0]}")
+        if opts.refuse:
+            self.reply("554 smtp-sink not accepting connections")
+            return
+        self.reply("220 smtp-sink ready")
+        rcpt = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            cmd = line.decode(errors="replace").strip()
+            verb = cmd[:4].upper()
+            if verb == "EHLO" and opts.reject_auth:
+                self.reply("250-smtp-sink")
+                self.reply("250 AUTH PLAIN")
+            elif verb in ("EHLO", "HELO"):
+                self.reply("250 smtp-sink")
+            elif verb == "AUTH":
+                with _lock:
+                    _counts["auth_failures"] += 1
+                self.reply("535 authentication failed")
+            elif verb == "MAIL":
+                rcpt = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                addr = cmd.split(":", 1)[-1].strip().strip("<>")
+                if opts.reject_domain and addr.lower().endswith("@" + opts.reject_domain):
+                    with _lock:
+                        _counts["rejected"] += 1
+                    self.reply("550 no such user")
+                else:
+                    rcpt.append(addr)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with .")
+                while self.rfile.readline().rstrip(b"\r\n") != b".":
+                    pass
+                time.sleep(opts.delay)
+                with _lock:
+                    n = _counts["messages"] + _counts["temp_failures"] + 1
+                    fail = opts.fail_every and n % opts.fail_every == 0
+                    _counts["temp_failures" if fail else "messages"] += 1
+                if fail:
+                    self.reply("451 try again later")
+                else:
+                    print(f"[sink] conn {conn_no}: message for {', '.join(rcpt)}")
+                    self.reply("250 OK queued")
+            elif verb == "RSET":
+                rcpt = []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                break
+            else:
+                self.reply("502 not implemented")
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=2525)
+    ap.add_argument("--delay", type=float, default=0.0, help="seconds to wait before answering DATA")
+    ap.add_argument("--fail-every", type=int, default=0, help="answer every Nth message with 451")
+    ap.add_argument("--reject-domain", default=None, help="answer RCPT for this domain with 550")
+    ap.add_argument("--refuse", action="store_true", help="greet every connection with 554")
+    ap.add_argument("--reject-auth", action="store_true", help="offer AUTH and answer it with 535")
+    args = ap.parse_args()
+
+    with SinkServer((args.host, args.port), SinkHandler) as server:
+        server.opts = args
+        print(f"[sink] listening on {args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print(f"[sink] {_counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# scripts/stress_messages.py
+"""
+Concurrency check for POST /api/messages/send.
+
+    cd backend && python scripts/stress_messages.py [--threads 16] [--messages 25]
+
+Creates a throwaway user and admin and then runs two rounds.
+
+  1. Every thread sends --messages messages as the user to the admin by
+     admin_id, starting together behind a barrier. The first sends all
+     race to create the conversation.
+  2. The user and the admin both send, in parallel, into that
+     conversation.
+
+After each round it asserts exact results:
+  - exactly one conversation exists for the pair
+  - every send returned 201 and every message row exists
+  - each side's unread_count equals what the other side sent
+  - last_message_at equals the newest message's created_at
+
+The throwaway rows are deleted at the end (conversations and messages
+cascade). Exits non-zero on the first mismatch.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from app import create_app
+from extensions import db
+from admin.models import Admin
+from admin.jwt_token import generate_admin_jwt_token
+from messages.models import Conversation, Message
+from users.models import User
+from utils import principal_cache
+from utils.jwt_token import generate_jwt_token
+
+
+def _send_many(app, token, payload, n, barrier, statuses, lock):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    barrier.wait()
+    got = Counter()
+    for i in range(n):
+        resp = client.post("/api/messages/send", json=dict(payload, body=f"stress {i}"), headers=headers)
+        got[resp.status_code] += 1
+    with lock:
+        statuses.update(got)
+
+def _round(app, senders, n):
+    """senders: [(token, payload)], one thread each."""
+    barrier = threading.Barrier(len(senders))
+    statuses, lock = Counter(), threading.Lock()
+    threads = [
+        threading.Thread(target=_send_many, args=(app, token, payload, n, barrier, statuses, lock))
+        for token, payload in senders
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return statuses
+
+def _unread(app, token, conversation_id):
+    resp = app.test_client().get(f"/api/messages/conversations/{conversation_id}",
+                                 headers={"Authorization": f"Bearer {token}"})
+    return resp.get_json()["unread_count"]
+
+def _check(label, expected, actual):
+    ok = expected == actual
+    print(f"  {'ok  ' if ok else 'FAIL'} {label}: expected {expected}, got {actual}")
+    if not ok:
+        sys.exit(1)
+
+def _verify(app, user, admin, tokens, sent_by_user, sent_by_admin):
+    with app.app_context():
+        convs = Conversation.query.filter_by(user_id=user, admin_id=admin).all()
+        _check("conversations for the pair", 1, len(convs))
+        conv = convs[0]
+        counts = dict(
+            db.session.query(Message.sender_role, func.count())
+            .filter(Message.conversation_id == conv.id)
+            .group_by(Message.sender_role)
+        )
+        _check("user message rows", sent_by_user, counts.get("user", 0))
+        _check("admin message rows", sent_by_admin, counts.get("admin", 0))
+        newest = db.session.query(func.max(Message.created_at)).filter(Message.conversation_id == conv.id).scalar()
+        _check("last_message_at", newest, conv.last_message_at)
+        conv_id = conv.id
+        db.session.remove()
+    _check("admin unread_count", sent_by_user, _unread(app, tokens["admin"], conv_id))
+    _check("user unread_count", sent_by_admin, _unread(app, tokens["user"], conv_id))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--messages", type=int, default=25, help="messages per thread per round")
+    args = ap.parse_args()
+
+    app = create_app()
+    tag = uuid.uuid4().hex[:10]
+    with app.app_context():
+        user = User(full_name="Stress User", email=f"stress-user-{tag}@example.invalid", password_hash="!")
+        admin = Admin(full_name="Stress Admin", email=f"stress-admin-{tag}@example.invalid", password_hash="!")
+        db.session.add_all([user, admin])
+        db.session.commit()
+        user_id, admin_id = user.id, admin.id
+        tokens = {
+            "user": generate_jwt_token(str(user.id), user.email),
+            "admin": generate_admin_jwt_token(str(admin.id), admin.email),
+        }
+        db.session.remove()
+
+    try:
+        n, t = args.messages, args.threads
+        print(f"round 1: {t} threads x {n} sends, user -> admin, conversation created by the race")
+        statuses = _round(app, [(tokens["user"], {"admin_id": str(admin_id)})] * t, n)
+        _check("201 responses", t * n, statuses[201])
+        _verify(app, user_id, admin_id, tokens, t * n, 0)
+
+        with app.app_context():
+            conv_id = str(Conversation.query.filter_by(user_id=user_id, admin_id=admin_id).one().id)
+            db.session.remove()
+        half = max(1, t // 2)
+        print(f"round 2: {half} user + {half} admin threads x {n} sends into conversation {conv_id}")
+        senders = ([(tokens["user"], {"conversation_id": conv_id})] * half
+                   + [(tokens["admin"], {"conversation_id": conv_id})] * half)
+        statuses = _round(app, senders, n)
+        _check("201 responses", 2 * half * n, statuses[201])
+        _verify(app, user_id, admin_id, tokens, t * n + half * n, half * n)
+        print("all counts exact")
+    finally:
+        with app.app_context():
+            db.session.query(User).filter_by(id=user_id).delete()
+            db.session.query(Admin).filter_by(id=admin_id).delete()
+            db.session.commit()
+        principal_cache.clear()
+
+
+if __name__ == "__main__":
+    main()
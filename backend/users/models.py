@@ -7,6 +7,9 @@ from extensions import db
 
 from memberships.models import MembershipPlan
 
+# Used for charting until the user picks a timezone
+DEFAULT_TIMEZONE = "America/Chicago"
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -29,6 +32,9 @@ class User(db.Model):
     experience_level = db.Column(db.String(50))
     medical_conditions = db.Column(db.Text)
 
+    # IANA name; workout charts bucket days/weeks/months in this zone
+    timezone = db.Column(db.String(64), nullable=False, default=DEFAULT_TIMEZONE, server_default=DEFAULT_TIMEZONE)
+
     # ✅ Stripe fields (add these)
     stripe_customer_id = db.Column(db.String(255), index=True, unique=True, nullable=True)
     stripe_subscription_id = db.Column(db.String(255), index=True, unique=True, nullable=True)
@@ -6,7 +6,8 @@ from admin.models import Admin
 
 from .models import User, db
 from utils.jwt_token import generate_jwt_token
-from utils.decorators import token_required
+from utils.auth import token_required
+from workout_session import charting, rollups
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
@@ -25,6 +26,7 @@ def _norm_user_dict(u: User) -> dict:
         "phone_number": getattr(u, "phone_number", None),
         "profile_image_url": getattr(u, "profile_image_url", None),
         "membership_plan_id": str(u.membership_plan_id) if u.membership_plan_id else None,
+        "timezone": u.timezone,
         # Helpful extras for the Memberships tab (safe even if no plan):
         "plan_name": u.membership_plan.name if getattr(u, "membership_plan", None) else "Free",
         "plan_price": u.membership_plan.price if getattr(u, "membership_plan", None) else 0.0,
@@ -169,6 +171,15 @@ def update_user(current_user, user_id):
         if k in data:
             setattr(user, k, data[k])
 
+    # Workout charts are bucketed in this zone; re-derive the stored local fields on change
+    if 'timezone' in data and data['timezone'] != user.timezone:
+        if not charting.is_valid_timezone(data['timezone']):
+            return jsonify({'error': 'Invalid timezone'}), 400
+        user.timezone = data['timezone']
+        db.session.flush()
+        charting.recompute_user(user.id)
+        rollups.rebuild_user(user.id)
+
     db.session.commit()
 
     return jsonify(_norm_user_dict(user)), 200
@@ -0,0 +1,171 @@
+# utils/auth.py
+"""
+Token authentication shared by every blueprint.
+
+    token = bearer_token()             # Authorization: Bearer <jwt> (legacy: bare token, x-access-tokens)
+    payload = decode(token)            # verified once per request, memoized on flask.g
+    role, principal = authenticate()   # payload -> User/Admin via the role's principal loader
+
+Principal loaders live in PRINCIPAL_LOADERS (role -> fn(payload) -> object
+or None) and can be replaced with @principal_loader(role). The defaults
+resolve through utils.principal_cache. The result is stored on
+g.principal / g.principal_role / g.token_payload for the rest of the
+request.
+
+Tokens are HS256-signed with DB_SECRET_KEY. If AUTH_JWKS_URL is set, tokens
+whose header carries a `kid` are verified against that key set instead;
+the set is fetched once and cached for AUTH_JWKS_TTL seconds (RS*/ES* keys
+need the `cryptography` package).
+"""
+
+import os
+import threading
+from functools import wraps
+import jwt
+from flask import g, request, jsonify
+from utils import principal_cache
+
+SECRET = os.getenv("DB_SECRET_KEY", "dev-secret")
+ALGORITHMS = ["HS256"]
+
+JWKS_URL = os.getenv("AUTH_JWKS_URL")
+JWKS_TTL = int(os.getenv("AUTH_JWKS_TTL", "300"))
+JWKS_ALGORITHMS = os.getenv("AUTH_JWKS_ALGORITHMS", "RS256").split(",")
+
+
+class AuthError(Exception):
+    def __init__(self, message, status=401):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+# ---------- token ----------
+
+def bearer_token():
+    auth = request.headers.get("Authorization", "")
+    parts = auth.split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        return parts[1]
+    if len(parts) == 1:
+        return parts[0]
+    return request.headers.get("x-access-tokens")
+
+_jwks_lock = threading.Lock()
+_jwks_client = None
+
+def _jwks():
+    global _jwks_client
+    with _jwks_lock:
+        if _jwks_client is None:
+            _jwks_client = jwt.PyJWKClient(JWKS_URL, cache_keys=True, cache_jwk_set=True, lifespan=JWKS_TTL)
+        return _jwks_client
+
+def _verify(token):
+    if JWKS_URL and jwt.get_unverified_header(token).get("kid"):
+        key = _jwks().get_signing_key_from_jwt(token).key
+        return jwt.decode(token, key, algorithms=JWKS_ALGORITHMS, options={"verify_aud": False})
+    return jwt.decode(token, SECRET, algorithms=ALGORITHMS)
+
+def decode(token):
+    """Verified payload of `token`; decoded at most once per request."""
+    if g.get("_auth_token") == token:
+        if g.get("_auth_error"):
+            raise g._auth_error
+        return g.token_payload
+
+    g._auth_token, g._auth_error, g.token_payload = token, None, None
+    try:
+        g.token_payload = _verify(token)
+    except jwt.ExpiredSignatureError:
+        g._auth_error = AuthError("Token expired")
+    except jwt.PyJWTError:
+        g._auth_error = AuthError("Invalid token")
+    if g._auth_error:
+        raise g._auth_error
+    return g.token_payload
+
+
+# ---------- principal loaders ----------
+
+PRINCIPAL_LOADERS = {}
+
+def principal_loader(role):
+    """Register fn(payload) -> principal or None for tokens of `role`."""
+    def wrap(fn):
+        PRINCIPAL_LOADERS[role] = fn
+        return fn
+    return wrap
+
+@principal_loader("user")
+def _load_user(payload):
+    user_id = payload.get("id") or payload.get("user_id")
+    if not user_id:
+        raise AuthError("Invalid token payload: missing id")
+    return principal_cache.load_user(user_id)
+
+@principal_loader("admin")
+def _load_admin(payload):
+    role = payload.get("role")
+    if role and role != "admin":
+        raise AuthError("Forbidden: not an admin token", 403)
+    admin_id = payload.get("admin_id") or payload.get("user_id") or payload.get("id")
+    if not admin_id:
+        raise AuthError("Invalid token payload: admin_id missing")
+    return principal_cache.load_admin(admin_id)
+
+
+# ---------- authenticate ----------
+
+def authenticate(role=None, token=None):
+    """
+    (role, principal) for the current request. `role` picks the loader;
+    None takes it from the token's role claim (user or admin). `token`
+    overrides the request headers (e.g. EventSource, which cannot set them).
+    """
+    if g.get("principal") is not None and role in (None, g.principal_role):
+        return g.principal_role, g.principal
+
+    token = token or bearer_token()
+    if not token:
+        raise AuthError("Token is missing")
+    payload = decode(token)
+
+    role = role or payload.get("role")
+    loader = PRINCIPAL_LOADERS.get(role)
+    if loader is None:
+        raise AuthError("Invalid role in token")
+    principal = loader(payload)
+    if principal is None:
+        raise AuthError(f"{role.capitalize()} not found", 404)
+
+    g.principal_role, g.principal = role, principal
+    return role, principal
+
+def resolve_principal(token=None):
+    """(kind, principal) for endpoints shared by users and admins."""
+    return authenticate(token=token)
+
+
+# ---------- decorators ----------
+
+def _auth_decorator(role, optional):
+    def decorator(fn):
+        @wraps(fn)
+        def decorated(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return "", 200
+            try:
+                _, principal = authenticate(role)
+            except AuthError as e:
+                if optional:
+                    return fn(None, *args, **kwargs)   # guest
+                return jsonify({"error": e.message}), e.status
+            return fn(principal, *args, **kwargs)
+        return decorated
+    return decorator
+
+token_required = _auth_decorator("user", optional=False)
+token_required_optional = _auth_decorator("user", optional=True)
+admin_token_required = _auth_decorator("admin", optional=False)
+admin_token_required_optional = _auth_decorator("admin", optional=True)
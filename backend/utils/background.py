@@ -0,0 +1,142 @@
+# utils/background.py
+"""
+Pieces shared by the database-backed background queues: the email outbox
+(appointments/outbox.py), AI jobs (ai/jobs.py) and Stripe events
+(payments/events.py).
+
+  - retry_delay(): jittered exponential backoff
+  - Metrics: in-process counters plus p50/p95 of recent timings
+  - Runner: daemon threads that wake on wake() or every `poll` seconds
+    and call work() inside an app context
+  - queue_stats(): depth, rows per status and the oldest unfinished row
+
+Each queue keeps its own claiming and running.
+"""
+
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from sqlalchemy import func
+from extensions import db
+
+log = logging.getLogger(__name__)
+
+
+def now_utc():
+    return datetime.now(timezone.utc)
+
+def retry_delay(attempts, base, cap):
+    """base seconds doubled per attempt, capped at `cap`, times 0.5-1.5 so retries spread out."""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+
+
+# ---------- metrics ----------
+
+class Metrics:
+    """In-process counters plus the last `keep` values of each named timing."""
+
+    def __init__(self, *timings, keep=1000, digits=4):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self.timings = {name: deque(maxlen=keep) for name in timings}
+        self.digits = digits
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+
+    def record(self, outcome=None, **seconds):
+        """Count `outcome` (if given) and add every timing that is not None."""
+        with self._lock:
+            if outcome:
+                self.counts[outcome] += 1
+            for name, value in seconds.items():
+                if value is not None:
+                    self.timings[name].append(value)
+
+    def _pct(self, values, p):
+        if not values:
+            return None
+        values = sorted(values)
+        return round(values[min(len(values) - 1, int(len(values) * p))], self.digits)
+
+    def snapshot(self):
+        with self._lock:
+            snap = {"counts": dict(self.counts)}
+            for name, values in self.timings.items():
+                snap[name] = {"p50": self._pct(values, 0.5), "p95": self._pct(values, 0.95)}
+            return snap
+
+
+# ---------- runner ----------
+
+class Runner:
+    """
+    `threads` daemon threads named `name`-N. Each waits for wake() (or
+    `poll` seconds), then calls work(*state) in an app context, where state
+    is what thread_state() returned for that thread. Started once per process.
+    """
+
+    def __init__(self, name, threads, poll):
+        self.name = name
+        self.threads = threads
+        self.poll = poll
+        self._app = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def thread_state(self):
+        """Per-thread arguments for work(), e.g. a connection."""
+        return ()
+
+    def work(self, *state):
+        raise NotImplementedError
+
+    def start(self, app):
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._app = app
+            self._threads = [threading.Thread(target=self._run, args=self.thread_state(), daemon=True,
+                                              name=f"{self.name}-{n}")
+                             for n in range(self.threads)]
+            for t in self._threads:
+                t.start()
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self, *state):
+        while True:
+            self._wake.wait(self.poll)
+            self._wake.clear()
+            try:
+                with self._app.app_context():
+                    self.work(*state)
+                    db.session.remove()
+            except Exception:
+                log.exception("%s: loop failed", self.name)
+                time.sleep(1)
+
+
+# ---------- stats ----------
+
+def queue_stats(status, since, unfinished, now, reported=("failed",)):
+    """
+    Queue depth (rows in `unfinished` statuses), rows per status for
+    `unfinished` + `reported`, and the age of the oldest unfinished row by
+    its `since` column. `now` must match that column's tz-awareness.
+    """
+    by_status = dict(db.session.query(status, func.count())
+                     .filter(status.in_(tuple(unfinished) + tuple(reported)))
+                     .group_by(status).all())
+    oldest = db.session.query(func.min(since)).filter(status.in_(unfinished)).scalar()
+    return {
+        "depth": sum(by_status.get(s, 0) for s in unfinished),
+        "by_status": by_status,
+        "oldest_unfinished_age_seconds": round((now - oldest).total_seconds(), 1) if oldest else None,
+    }
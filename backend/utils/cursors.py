@@ -0,0 +1,26 @@
+# utils/cursors.py
+"""
+Opaque keyset cursors for paginated lists (X-Next-Cursor headers).
+
+    cursor = encode(row.created_at, row.id)
+    created_at, row_id = decode(cursor, datetime, UUID)
+"""
+
+import base64
+from datetime import datetime
+
+
+def encode(*parts) -> str:
+    raw = "|".join(p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode(cursor: str, *types):
+    """The parts of a cursor made by encode(), parsed with `types`; ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        parts = raw.split("|", len(types) - 1)
+        if len(parts) != len(types):
+            raise ValueError
+        return tuple(datetime.fromisoformat(p) if t is datetime else t(p) for t, p in zip(types, parts))
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,254 @@
+# utils/index_advisor.py
+"""
+EXPLAIN-based index advisor for the hot query shapes.
+
+Each shape is a function registered with @hot_query that builds a SELECT
+from a `sample` dict (real ids/values picked from the current database).
+`flask index-advisor` plans every shape with EXPLAIN (FORMAT JSON) and
+reports the ones that still read a table with a sequential scan.
+
+By default seq scans are disabled for the EXPLAIN (enable_seqscan = off),
+so a Seq Scan in the plan means *no usable index exists*, not merely that
+the planner prefers a scan on a small seeded table. --planner-costs shows
+the plan the planner would really pick.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, func, text, tuple_
+from sqlalchemy.dialects import postgresql
+from extensions import db
+
+HOT_QUERIES = {}
+
+
+def hot_query(name):
+    """Register a shape builder: fn(sample) -> SQLAlchemy Select."""
+    def wrap(fn):
+        HOT_QUERIES[name] = fn
+        return fn
+    return wrap
+
+
+# ---------- plan inspection ----------
+
+def explain(stmt, analyze=False):
+    """Return the JSON plan tree of `stmt`."""
+    compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True})
+    opts = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    conn = db.session.connection()
+    plan = conn.exec_driver_sql(f"EXPLAIN ({opts}) {compiled}", compiled.params).scalar()
+    return plan[0]["Plan"]
+
+def seq_scans(plan):
+    """Relations read with a Seq Scan anywhere in the plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+def index_names(plan):
+    found = []
+    if plan.get("Index Name"):
+        found.append(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found.extend(index_names(child))
+    return found
+
+
+# ---------- sample values ----------
+
+def _sample():
+    """Pick the busiest user/exercise so every shape is planned with realistic values."""
+    from workout_session.models import WorkoutSession
+    from appointments.models import CalendarEvent
+    from messages.models import Conversation
+
+    ws = WorkoutSession
+    user_id, exercise_id = (db.session.query(ws.user_id, ws.exercise_id)
+                            .filter(ws.exercise_id.isnot(None))
+                            .group_by(ws.user_id, ws.exercise_id)
+                            .order_by(func.count().desc())
+                            .first()) or (None, None)
+    event_user_id = (db.session.query(CalendarEvent.user_id)
+                     .filter(CalendarEvent.user_id.isnot(None))
+                     .limit(1).scalar())
+    event_admin_id = (db.session.query(CalendarEvent.admin_id)
+                      .filter(CalendarEvent.admin_id.isnot(None))
+                      .limit(1).scalar())
+    inbox_admin_id = (db.session.query(Conversation.admin_id)
+                      .group_by(Conversation.admin_id)
+                      .order_by(func.count().desc())
+                      .limit(1).scalar())
+    now = datetime.utcnow()
+    return {
+        "user_id": user_id,
+        "exercise_id": exercise_id,
+        "event_user_id": event_user_id or user_id,
+        "event_admin_id": event_admin_id or uuid.UUID(int=0),
+        "inbox_admin_id": inbox_admin_id,
+        "start": now - timedelta(days=90),
+        "end": now,
+    }
+
+
+# ---------- hot query shapes ----------
+
+@hot_query("workout_sessions: user + date range (weekly/history/monthly)")
+def _workout_range(s):
+    from workout_session.models import WorkoutSession as ws
+    return (select(ws.id, ws.workout_date, ws.duration_minutes)
+            .where(ws.user_id == s["user_id"])
+            .where(ws.workout_date >= s["start"], ws.workout_date < s["end"]))
+
+@hot_query("workout_sessions: user + exercise_id + range (exercise_trend)")
+def _workout_exercise(s):
+    from workout_session.models import WorkoutSession as ws
+    return (select(ws.id, ws.reps, ws.sets, ws.weight_lbs)
+            .where(ws.user_id == s["user_id"], ws.exercise_id == s["exercise_id"])
+            .where(ws.workout_date >= s["start"], ws.workout_date <= s["end"]))
+
+@hot_query("workout_sessions: user + week_start (rollup refresh)")
+def _workout_weeks(s):
+    from workout_session.models import WorkoutSession as ws
+    monday = s["end"].date() - timedelta(days=s["end"].weekday())
+    return (select(ws.id, ws.local_date)
+            .where(ws.user_id == s["user_id"])
+            .where(ws.week_start.in_([monday, monday - timedelta(days=7)])))
+
+@hot_query("workout_daily_rollups: user + local_date range")
+def _rollup_range(s):
+    from workout_session.models import WorkoutDailyRollup as R
+    return (select(R.local_date, R.exercise_name, R.sessions, R.minutes)
+            .where(R.user_id == s["user_id"])
+            .where(R.local_date >= s["start"].date(), R.local_date <= s["end"].date())
+            .order_by(R.local_date))
+
+@hot_query("workout_exercise_buckets: user + exercise + period range (exercise_trend)")
+def _trend_buckets(s):
+    from workout_session.models import WorkoutExerciseBucket as B
+    return (select(B.bucket_start, B.best_1rm, B.total_volume)
+            .where(B.user_id == s["user_id"], B.exercise_id == s["exercise_id"], B.period == "week")
+            .where(B.bucket_start >= s["start"].date(), B.bucket_start <= s["end"].date())
+            .order_by(B.bucket_start))
+
+@hot_query("workout_personal_records: user's PRs (/exercise/prs)")
+def _personal_records(s):
+    from workout_session.models import WorkoutPersonalRecord as P
+    return select(P.exercise_id, P.best_1rm).where(P.user_id == s["user_id"])
+
+@hot_query("calendar_events: user's events (/my-events)")
+def _my_events(s):
+    from appointments.models import CalendarEvent as ce
+    return (select(ce.id, ce.start_time)
+            .where(ce.user_id == s["event_user_id"])
+            .order_by(ce.start_time))
+
+@hot_query("calendar_events: admin range page, keyset (/admin/all-events)")
+def _admin_events(s):
+    from appointments.models import CalendarEvent as ce
+    return (select(ce.id, ce.start_time)
+            .where(ce.start_time >= s["start"], ce.end_time <= s["end"])
+            .where(tuple_(ce.start_time, ce.id) > tuple_(s["start"], uuid.UUID(int=0)))
+            .order_by(ce.start_time, ce.id)
+            .limit(500))
+
+@hot_query("calendar_events: coach's bookings overlapping a window (/availability)")
+def _availability(s):
+    from appointments.models import CalendarEvent as ce
+    window = func.tsrange(s["end"], s["end"] + timedelta(days=7), "[)")
+    return (select(ce.start_time, ce.end_time)
+            .where(ce.admin_id == s["event_admin_id"], ce.status.in_(["approved", "pending"]))
+            .where(func.tsrange(ce.start_time, ce.end_time, "[)").op("&&")(window)))
+
+@hot_query("calendar_series: series touching the admin range (/admin/all-events)")
+def _series_range(s):
+    from appointments.models import CalendarSeries as cs
+    return (select(cs.id, cs.rrule)
+            .where(cs.first_start < s["end"], cs.last_end > s["start"]))
+
+@hot_query("calendar_series: coach's series touching a window (conflicts, /availability)")
+def _series_coach(s):
+    from appointments.models import CalendarSeries as cs
+    return (select(cs.id, cs.rrule)
+            .where(cs.admin_id == s["event_admin_id"], cs.status.in_(["approved", "pending"]))
+            .where(cs.first_start < s["end"], cs.last_end > s["start"]))
+
+@hot_query("calendar_series_exceptions: exceptions of the series in a window")
+def _series_exceptions(s):
+    from appointments.models import CalendarSeriesException as x
+    return (select(x.id)
+            .where(x.series_id.in_([uuid.UUID(int=0), uuid.UUID(int=1)]))
+            .where(x.original_start >= s["start"], x.original_start < s["end"]))
+
+@hot_query("email_logs: newest first, keyset (/admin/email-logs)")
+def _email_logs(s):
+    from appointments.models import EmailLog as el
+    return (select(el.id, el.created_at)
+            .where(tuple_(el.created_at, el.id) < tuple_(s["end"], uuid.UUID(int=0)))
+            .order_by(el.created_at.desc(), el.id.desc())
+            .limit(50))
+
+@hot_query("email_logs: due outbox batch (email sender claim)")
+def _email_outbox(s):
+    from appointments.models import EmailLog as el
+    return (select(el.id)
+            .where(el.status == "queued", el.next_attempt_at <= s["end"])
+            .order_by(el.next_attempt_at, el.created_at)
+            .limit(20))
+
+@hot_query("ai_jobs: oldest due job (AI job runner claim)")
+def _ai_job_claim(s):
+    from ai.models import AiJob as j
+    return (select(j.id)
+            .where(j.status.in_(["queued", "running"]))
+            .order_by(j.created_at)
+            .limit(1))
+
+@hot_query("conversations: admin inbox page, keyset (/messages/conversations)")
+def _inbox(s):
+    from messages.models import Conversation as c
+    return (select(c.id, c.last_message_at)
+            .where(c.admin_id == s["inbox_admin_id"], c.hidden_for_admin_at.is_(None))
+            .where(tuple_(c.last_message_at, c.id) < tuple_(s["end"], uuid.UUID(int=0)))
+            .order_by(c.last_message_at.desc(), c.id.desc())
+            .limit(20))
+
+@hot_query("messages: full-text search (/messages/search)")
+def _message_search(s):
+    from messages.models import Message as m, SEARCH_CONFIG
+    return (select(m.id)
+            .where(m.body_tsv.op("@@")(func.websearch_to_tsquery(SEARCH_CONFIG, "knee pain")))
+            .limit(20))
+
+
+# ---------- CLI ----------
+
+@click.command("index-advisor")
+@click.option("--planner-costs", is_flag=True, help="Keep seq scans enabled and show the planner's real choice.")
+@click.option("--analyze", is_flag=True, help="Use EXPLAIN ANALYZE (runs the queries).")
+@with_appcontext
+def index_advisor_command(planner_costs, analyze):
+    """EXPLAIN every registered hot query shape and report sequential scans."""
+    if not planner_costs:
+        db.session.execute(text("SET LOCAL enable_seqscan = off"))
+
+    sample = _sample()
+    flagged = 0
+    for name, build in HOT_QUERIES.items():
+        plan = explain(build(sample), analyze=analyze)
+        scans = seq_scans(plan)
+        if scans:
+            flagged += 1
+            click.echo(f"SEQ SCAN  {name}  -> {', '.join(sorted(set(scans)))}")
+        else:
+            click.echo(f"ok        {name}  -> {', '.join(index_names(plan)) or plan.get('Node Type')}")
+
+    db.session.rollback()
+    click.echo(f"\n{flagged} of {len(HOT_QUERIES)} shape(s) need an index.")
+    if flagged:
+        raise SystemExit(1)
@@ -0,0 +1,138 @@
+# utils/principal_cache.py
+"""
+Per-process cache of authenticated principals (User / Admin rows).
+
+Every token-protected request used to decode the JWT and then load the
+user or admin by primary key. The decode still happens on every request
+(it is what checks the signature and expiry), but the row is served from
+here: a detached snapshot of its columns, keyed by (model, subject id),
+merged into the request's session without touching the database.
+
+Entries expire after PRINCIPAL_CACHE_TTL seconds and the least recently
+used ones are evicted past PRINCIPAL_CACHE_SIZE. Any flushed update or
+delete of a User/Admin (profile edits, plan changes, deletes) drops the
+entry in this process; logout drops it explicitly. Other worker processes
+pick the change up when their entry expires.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from extensions import db
+
+CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()   # (model name, UUID) -> (expires_at, snapshot)
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+# Models whose flushed changes invalidate entries (by class name: the model
+# modules import blueprints that import this module)
+PRINCIPAL_MODELS = ("User", "Admin")
+
+
+def _key(model, principal_id):
+    try:
+        return model.__name__, uuid.UUID(str(principal_id))
+    except (TypeError, ValueError):
+        return None
+
+def _snapshot(obj):
+    """Detached copy holding only column values, safe to share across requests."""
+    mapper = inspect(obj).mapper
+    copy = mapper.class_manager.new_instance()
+    for attr in mapper.column_attrs:
+        set_committed_value(copy, attr.key, getattr(obj, attr.key))
+    make_transient_to_detached(copy)
+    return copy
+
+
+# ---------- lookups ----------
+
+def load(model, principal_id):
+    """
+    `model` row for `principal_id` attached to the current session, or None.
+    A hit costs no query; a miss loads by primary key and caches the row.
+    """
+    key = _key(model, principal_id)
+    if key is None:
+        return None
+
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(key)
+        if entry and entry[0] > now:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            snapshot = entry[1]
+        else:
+            _stats["misses"] += 1
+            snapshot = None
+
+    if snapshot is not None:
+        return db.session.merge(snapshot, load=False)
+
+    obj = db.session.get(model, key[1])
+    if obj is None:
+        return None
+    snapshot = _snapshot(obj)
+    with _lock:
+        _entries[key] = (now + CACHE_TTL, snapshot)
+        _entries.move_to_end(key)
+        while len(_entries) > CACHE_SIZE:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+    return obj
+
+def load_user(user_id):
+    from users.models import User
+    return load(User, user_id)
+
+def load_admin(admin_id):
+    from admin.models import Admin
+    return load(Admin, admin_id)
+
+
+# ---------- invalidation ----------
+
+def invalidate(model, principal_id):
+    key = _key(model, principal_id)
+    with _lock:
+        if key is not None and _entries.pop(key, None) is not None:
+            _stats["invalidations"] += 1
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+def stats():
+    with _lock:
+        return dict(_stats, size=len(_entries), max_size=CACHE_SIZE, ttl_seconds=CACHE_TTL)
+
+
+# ---------- ORM hooks ----------
+
+@event.listens_for(db.session, "after_flush")
+def _drop_changed_principals(session, flush_context):
+    # Drop now, and again after commit: a concurrent request could re-cache
+    # the old committed row between this flush and the commit.
+    stale = session.info.setdefault("principal_cache_stale", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if type(obj).__name__ in PRINCIPAL_MODELS and obj.id is not None:
+            stale.add((type(obj), obj.id))
+            invalidate(type(obj), obj.id)
+
+@event.listens_for(db.session, "after_commit")
+def _drop_committed_principals(session):
+    for model, principal_id in session.info.pop("principal_cache_stale", ()):
+        invalidate(model, principal_id)
+
+@event.listens_for(db.session, "after_rollback")
+def _forget_stale(session):
+    session.info.pop("principal_cache_stale", None)
@@ -2,3 +2,4 @@
 
 # workout_session/__init__.py
 from .routes import workout_sessions_bp
+from . import commands  # registers `flask workout_session ...` CLI commands
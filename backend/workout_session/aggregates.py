@@ -0,0 +1,113 @@
+# workout_session/aggregates.py
+"""
+SQL-side aggregation for the workout charts.
+
+`workout_date` is stored as a naive UTC timestamp, so every bucket is computed
+in PostgreSQL as `(workout_date AT TIME ZONE 'UTC') AT TIME ZONE :tz` and
+grouped there. The routes only ever see one row per (local day, exercise) or
+per local month instead of one ORM object per session.
+"""
+
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+from sqlalchemy import func, cast, Date
+from extensions import db
+from .models import WorkoutSession
+
+LABELS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+# ---------- SQL expressions ----------
+
+def naive_utc(dt):
+    """Bind values must match the naive-UTC column, not the DB session timezone."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+
+def local_timestamp(tz: str):
+    """workout_date (naive UTC) -> naive local wall-clock time in `tz`."""
+    return func.timezone(tz, func.timezone("UTC", WorkoutSession.workout_date))
+
+def exercise_label():
+    """Same fallback the charts always used: exercise_name, then workout_type, then 'Unknown'."""
+    raw = func.coalesce(
+        func.nullif(WorkoutSession.exercise_name, ""),
+        func.nullif(WorkoutSession.workout_type, ""),
+        "Unknown",
+    )
+    return func.coalesce(func.nullif(func.trim(raw), ""), "Unknown")
+
+def _range_filter(q, user_id, start_utc, end_utc):
+    q = q.filter(WorkoutSession.user_id == user_id)
+    if start_utc is not None:
+        q = q.filter(WorkoutSession.workout_date >= naive_utc(start_utc))
+    if end_utc is not None:
+        q = q.filter(WorkoutSession.workout_date < naive_utc(end_utc))
+    return q
+
+
+# ---------- aggregate queries ----------
+
+def daily_exercise_totals(user_id, start_utc, end_utc, tz: str):
+    """
+    One row per (local date, exercise label) in [start_utc, end_utc):
+      (local_date, exercise, sessions, minutes)
+    Ordered by day, then by the first time the exercise was logged that day.
+    """
+    local_date = cast(local_timestamp(tz), Date).label("local_date")
+    label = exercise_label().label("exercise")
+    q = db.session.query(
+        local_date,
+        label,
+        func.count(WorkoutSession.id).label("sessions"),
+        func.coalesce(func.sum(WorkoutSession.duration_minutes), 0).label("minutes"),
+    )
+    q = _range_filter(q, user_id, start_utc, end_utc)
+    return (q.group_by(local_date, label)
+             .order_by(local_date, func.min(WorkoutSession.workout_date), label)
+             .all())
+
+def monthly_totals(user_id, start_utc, tz: str, end_utc=None):
+    """One row per local month since start_utc: (month 'YYYY-MM', sessions, minutes)."""
+    month = func.to_char(local_timestamp(tz), "YYYY-MM").label("month")
+    q = db.session.query(
+        month,
+        func.count(WorkoutSession.id).label("sessions"),
+        func.coalesce(func.sum(WorkoutSession.duration_minutes), 0).label("minutes"),
+    )
+    q = _range_filter(q, user_id, start_utc, end_utc)
+    return q.group_by(month).order_by(month).all()
+
+
+# ---------- JSON shaping shared by /weekly and /history/weeks ----------
+
+def empty_week_points():
+    return [{
+        "label": LABELS[i],
+        "minutes": 0,
+        "sessions": 0,
+        "workouts": [],
+        "exercises": []
+    } for i in range(7)]
+
+def add_to_week_points(points, local_date, exercise, sessions, minutes):
+    """Fold one aggregate row into a Mon..Sun `points` list (rows arrive in first-seen order)."""
+    p = points[local_date.weekday()]
+    p["minutes"] += int(minutes or 0)
+    p["sessions"] += int(sessions or 0)
+    p["workouts"].append(exercise)
+    p["exercises"].append({
+        "name": exercise,
+        "sessions": int(sessions or 0),
+        "minutes": int(minutes or 0),
+    })
+
+def weeks_from_daily_rows(rows):
+    """Group daily aggregate rows into {monday_iso: points}."""
+    weeks = {}
+    for local_date, exercise, sessions, minutes in rows:
+        monday = local_date - timedelta(days=local_date.weekday())
+        points = weeks.setdefault(monday.isoformat(), empty_week_points())
+        add_to_week_points(points, local_date, exercise, sessions, minutes)
+    return weeks
@@ -0,0 +1,278 @@
+# workout_session/bulk.py
+"""
+Bulk ingestion for POST /api/workout_sessions/bulk.
+
+The body is read incrementally (NDJSON line by line, or a JSON array item
+by item), each row is validated on its own, and valid rows are inserted in
+batches with a single multi-row INSERT ... ON CONFLICT DO NOTHING each.
+Rows carrying an idempotency key already stored for the user are skipped,
+so a retried upload never duplicates sessions.
+
+Charting fields and catalog exercise ids are computed here in Python (same
+code as the ORM path) and the touched rollup days are refreshed once per
+upload.
+"""
+
+import codecs
+import json
+import math
+import uuid
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions import db
+from .models import WorkoutSession, charting_values
+from . import rollups, catalog
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+MAX_ROWS = 5000
+BATCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+
+_INT_FIELDS = ("sets", "reps", "duration_minutes")
+_FLOAT_FIELDS = ("weight_lbs", "calories_burned")
+_INT_MAX = 2**31 - 1   # PostgreSQL integer
+_STR_FIELDS = {"workout_type": 100, "exercise_name": 100, "idempotency_key": 100}
+_SOURCES = {"planned", "extra"}
+
+
+class BulkBodyError(ValueError):
+    """The body itself is unreadable (not just one bad row)."""
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+# ---------- streaming readers ----------
+
+def _iter_ndjson(stream):
+    """Yield (row_no, obj | None, error | None) per non-blank line."""
+    row_no = 0
+    for raw in stream:
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        row_no += 1
+        try:
+            yield row_no, json.loads(line), None
+        except ValueError as e:
+            yield row_no, None, f"invalid JSON: {e.msg}"
+
+def _iter_json_array(stream):
+    """Yield (row_no, obj, None) per array element without loading the whole body."""
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buf, pos, row_no = "", 0, 0
+    state = "start"   # start -> item -> sep -> ... -> done
+    eof = False
+
+    while True:
+        # skip whitespace, refilling as needed
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = stream.read(CHUNK_SIZE)
+            eof = not chunk
+            buf = buf[pos:] + text_decoder.decode(chunk or b"", final=eof)
+            pos = 0
+
+        if pos >= len(buf):
+            if state != "done":
+                raise BulkBodyError("unexpected end of JSON array")
+            return
+
+        ch = buf[pos]
+        if state == "start":
+            if ch != "[":
+                raise BulkBodyError("expected a JSON array or NDJSON body")
+            pos += 1
+            state = "first"
+        elif state == "first" and ch == "]":
+            pos += 1
+            state = "done"
+        elif state in ("first", "item"):
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise BulkBodyError(f"invalid JSON at row {row_no + 1}")
+                chunk = stream.read(CHUNK_SIZE)
+                eof = not chunk
+                buf = buf[pos:] + text_decoder.decode(chunk or b"", final=eof)
+                pos = 0
+                continue
+            row_no += 1
+            pos = end
+            state = "sep"
+            yield row_no, obj, None
+            # drop consumed text so the buffer stays bounded
+            buf, pos = buf[pos:], 0
+        elif state == "sep":
+            if ch == ",":
+                state = "item"
+            elif ch == "]":
+                state = "done"
+            else:
+                raise BulkBodyError(f"expected ',' or ']' after row {row_no}")
+            pos += 1
+        else:  # done: only whitespace may follow
+            raise BulkBodyError("unexpected data after JSON array")
+
+def iter_rows(stream, mimetype):
+    if mimetype in NDJSON_TYPES:
+        return _iter_ndjson(stream)
+    return _iter_json_array(stream)
+
+
+# ---------- validation ----------
+
+def parse_client_datetime(value, tz):
+    """Strict ISO-8601 -> naive UTC; naive input is taken as local time in `tz`. ValueError if invalid."""
+    try:
+        dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        raise ValueError("must be ISO-8601")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo(tz))
+    try:
+        return dt.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+    except OverflowError:   # e.g. 9999-12-31T23:00-05:00 is past datetime.max in UTC
+        raise ValueError("is out of range")
+
+def _parse_workout_date(value, tz):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("workout_date is required (ISO-8601)")
+    try:
+        return parse_client_datetime(value, tz)
+    except ValueError as e:
+        raise ValueError(f"workout_date {e}")
+
+def validate_row(obj, user_id, tz, key_prefix=None, row_no=None):
+    """Return a column dict ready for INSERT, or raise ValueError with a client-facing message."""
+    if not isinstance(obj, dict):
+        raise ValueError("row must be a JSON object")
+
+    workout_date = _parse_workout_date(obj.get("workout_date"), tz)
+    row = {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "workout_date": workout_date,
+        "source": None,
+    }
+
+    for field in _INT_FIELDS:
+        v = obj.get(field)
+        if v is None:
+            row[field] = None
+        # json.loads turns 1e400 into inf: check finiteness before int(v)
+        elif (isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v)
+              or v < 0 or v > _INT_MAX or v != int(v)):
+            raise ValueError(f"{field} must be a non-negative integer")
+        else:
+            row[field] = int(v)
+
+    for field in _FLOAT_FIELDS:
+        v = obj.get(field)
+        if v is None:
+            row[field] = None
+        elif isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v) or v < 0:
+            raise ValueError(f"{field} must be a non-negative number")
+        else:
+            row[field] = float(v)
+
+    for field, max_len in _STR_FIELDS.items():
+        v = obj.get(field)
+        if v is None:
+            row[field] = None
+        elif not isinstance(v, str):
+            raise ValueError(f"{field} must be a string")
+        elif len(v) > max_len:
+            raise ValueError(f"{field} is longer than {max_len} characters")
+        else:
+            row[field] = v.strip() or None
+
+    source = obj.get("source")
+    if source is not None:
+        if source not in _SOURCES:
+            raise ValueError("source must be 'planned' or 'extra'")
+        row["source"] = source
+
+    if not row["idempotency_key"] and key_prefix:
+        row["idempotency_key"] = f"{key_prefix}:{row_no}"[:100]
+
+    row["exercise_id"] = catalog.resolve(row["exercise_name"], row["workout_type"]) if row["exercise_name"] else None
+    try:
+        row.update(charting_values(workout_date, tz))
+    except OverflowError:   # in range as UTC, not in the user's timezone
+        raise ValueError("workout_date is out of range")
+    return row
+
+
+# ---------- insert ----------
+
+def _insert_batch(rows):
+    """Multi-row INSERT; returns the inserted rows' (local_date,) — conflicts are skipped."""
+    stmt = (pg_insert(WorkoutSession.__table__)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["user_id", "idempotency_key"])
+            .returning(WorkoutSession.__table__.c.local_date))
+    return db.session.execute(stmt).all()
+
+def ingest(stream, mimetype, user_id, tz, key_prefix=None):
+    """
+    Validate and insert every row of the body. Does not commit.
+    Returns {"received", "inserted", "duplicates", "errors": [{"row", "error"}]}.
+    """
+    received = inserted = 0
+    errors = []
+    batch = []
+    seen_keys = set()
+    days = set()
+
+    def flush():
+        nonlocal inserted
+        if not batch:
+            return
+        for (local_date,) in _insert_batch(batch):
+            inserted += 1
+            days.add(local_date)
+        batch.clear()
+
+    for row_no, obj, error in iter_rows(stream, mimetype):
+        received += 1
+        if received > MAX_ROWS:
+            raise TooManyRows(f"at most {MAX_ROWS} rows per request")
+        if error:
+            errors.append({"row": row_no, "error": error})
+            continue
+        try:
+            row = validate_row(obj, user_id, tz, key_prefix, row_no)
+        except ValueError as e:
+            errors.append({"row": row_no, "error": str(e)})
+            continue
+
+        # A repeated key inside one upload would make the multi-row INSERT conflict with itself
+        key = row["idempotency_key"]
+        if key:
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    # Core INSERTs bypass the ORM flush hooks, so refresh the rollups here
+    rollups.refresh_days(user_id, days)
+
+    return {
+        "received": received,
+        "inserted": inserted,
+        "duplicates": received - inserted - len(errors),
+        "errors": errors,
+    }
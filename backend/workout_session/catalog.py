@@ -0,0 +1,142 @@
+# workout_session/catalog.py
+"""
+Exercise catalog lookups (exercises / exercise_aliases).
+
+Free-text names are normalized (trimmed, lower-cased, whitespace collapsed)
+and resolved to an integer exercise id through the canonical slug or an
+alias. Unknown names are added to the catalog on first use, so sessions
+always get an id when they have an exercise_name.
+
+The catalog is small and read on every chart request, so each process keeps
+a copy in memory. It is reloaded after CACHE_TTL seconds (other workers may
+have added names) and patched in place when this process adds one.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from extensions import db
+from .models import Exercise, ExerciseAlias, WorkoutSession
+
+CACHE_TTL = int(os.getenv("EXERCISE_CATALOG_TTL", "300"))
+MISS_RELOAD_AFTER = 5   # seconds; bounds reloads caused by lookups of unknown names
+
+CatalogEntry = namedtuple("CatalogEntry", "id name category")
+
+_lock = threading.Lock()
+_cache = {"loaded_at": 0.0, "by_slug": {}, "by_id": {}}
+
+_WS = re.compile(r"\s+")
+
+
+def normalize(name):
+    """'  Flat  Bench press ' -> 'flat bench press'; None for blank input."""
+    if not isinstance(name, str):
+        return None
+    slug = _WS.sub(" ", name).strip().lower()
+    return slug[:100] or None
+
+
+# ---------- cache ----------
+
+def _load(conn=None):
+    conn = conn or db.session.connection()
+    by_id, by_slug = {}, {}
+    for row in conn.execute(select(Exercise.id, Exercise.name, Exercise.category, Exercise.slug)):
+        by_id[row.id] = CatalogEntry(row.id, row.name, row.category)
+        by_slug[row.slug] = row.id
+    for row in conn.execute(select(ExerciseAlias.slug, ExerciseAlias.exercise_id)):
+        by_slug.setdefault(row.slug, row.exercise_id)
+    with _lock:
+        _cache.update(loaded_at=time.monotonic(), by_slug=by_slug, by_id=by_id)
+
+def _fresh(conn=None):
+    if time.monotonic() - _cache["loaded_at"] > CACHE_TTL:
+        _load(conn)
+    return _cache
+
+def _reload_on_miss(conn=None):
+    """Another worker may have added the entry since our last load."""
+    if time.monotonic() - _cache["loaded_at"] > MISS_RELOAD_AFTER:
+        _load(conn)
+    return _cache
+
+def invalidate():
+    with _lock:
+        _cache["loaded_at"] = 0.0
+
+
+# ---------- lookups ----------
+
+def lookup(name, conn=None):
+    """Exercise id for a name or alias, or None. Never writes."""
+    slug = normalize(name)
+    if not slug:
+        return None
+    cache = _fresh(conn)
+    if slug not in cache["by_slug"]:
+        cache = _reload_on_miss(conn)
+    return cache["by_slug"].get(slug)
+
+def get(exercise_id, conn=None):
+    """CatalogEntry for an id, or None."""
+    if exercise_id is None:
+        return None
+    cache = _fresh(conn)
+    if exercise_id not in cache["by_id"]:
+        cache = _reload_on_miss(conn)
+    return cache["by_id"].get(exercise_id)
+
+def name_of(exercise_id, conn=None):
+    entry = get(exercise_id, conn)
+    return entry.name if entry else None
+
+def resolve(name, category=None, conn=None):
+    """Exercise id for `name`, adding it to the catalog if it is new."""
+    slug = normalize(name)
+    if not slug:
+        return None
+    exercise_id = lookup(name, conn)
+    if exercise_id is not None:
+        return exercise_id
+
+    conn = conn or db.session.connection()
+    exercise_id = conn.execute(
+        pg_insert(Exercise.__table__)
+        .values(name=_WS.sub(" ", name).strip()[:100], slug=slug, category=category)
+        .on_conflict_do_nothing(index_elements=["slug"])
+        .returning(Exercise.__table__.c.id)
+    ).scalar()
+    if exercise_id is None:   # lost a race with another writer
+        exercise_id = conn.execute(select(Exercise.id).where(Exercise.slug == slug)).scalar()
+
+    with _lock:
+        _cache["by_slug"][slug] = exercise_id
+        _cache["by_id"][exercise_id] = CatalogEntry(exercise_id, _WS.sub(" ", name).strip()[:100], category)
+    return exercise_id
+
+def all_entries(conn=None):
+    return sorted(_fresh(conn)["by_id"].values(), key=lambda e: e.name.lower())
+
+
+# ---------- ORM hooks ----------
+
+@event.listens_for(db.session, "after_rollback")
+def _drop_uncommitted_entries(session):
+    # resolve() may have cached ids from a transaction that never committed
+    invalidate()
+
+@event.listens_for(db.session, "before_flush")
+def _resolve_exercise_ids(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, WorkoutSession):
+            continue
+        if obj in session.new:
+            if obj.exercise_id is None and obj.exercise_name:
+                obj.exercise_id = resolve(obj.exercise_name, obj.workout_type, session.connection())
+        elif inspect(obj).attrs.exercise_name.history.has_changes():
+            obj.exercise_id = resolve(obj.exercise_name, obj.workout_type, session.connection())
@@ -0,0 +1,101 @@
+# workout_session/charting.py
+"""
+Per-user local charting fields on workout_sessions.
+
+local_date / day_of_week / week_start / month / year / hour_of_day are
+derived from workout_date (naive UTC) in the owner's users.timezone:
+  - on flush, for new sessions and sessions whose date or owner changed;
+  - in SQL, in id-ordered batches, for backfills and timezone changes.
+"""
+
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import event, inspect, func, cast, update, select, Date, Integer
+from extensions import db
+from users.models import User, DEFAULT_TIMEZONE
+from .models import WorkoutSession
+
+
+def user_timezone(user) -> str:
+    return getattr(user, "timezone", None) or DEFAULT_TIMEZONE
+
+def is_valid_timezone(tz) -> bool:
+    if not isinstance(tz, str) or not tz:
+        return False
+    try:
+        ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+# ---------- ORM flush hook ----------
+
+def _owner_timezone(session, obj):
+    if obj.user is not None:
+        return user_timezone(obj.user)
+    return user_timezone(session.get(User, obj.user_id)) if obj.user_id else DEFAULT_TIMEZONE
+
+def _needs_fields(session, obj):
+    if obj.workout_date is None:
+        return False
+    if obj in session.new:
+        return obj.local_date is None
+    state = inspect(obj)
+    return (state.attrs.workout_date.history.has_changes()
+            or state.attrs.user_id.history.has_changes())
+
+# Registered before rollups' listener (rollups imports this module), so the
+# rollup sync always sees the fresh local_date.
+@event.listens_for(db.session, "before_flush")
+def _set_charting_fields(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, WorkoutSession) and _needs_fields(session, obj):
+            obj.set_charting_fields(_owner_timezone(session, obj))
+
+
+# ---------- SQL recompute ----------
+
+def _sql_values():
+    """SET clause computing every charting field from the joined users.timezone."""
+    local = func.timezone(User.timezone, func.timezone("UTC", WorkoutSession.workout_date))
+    return {
+        "local_date":  cast(local, Date),
+        "day_of_week": func.to_char(local, "Dy"),
+        "week_start":  cast(func.date_trunc("week", local), Date),   # ISO weeks start Monday
+        "month":       func.to_char(local, "YYYY-MM"),
+        "year":        cast(func.extract("year", local), Integer),
+        "hour_of_day": cast(func.extract("hour", local), Integer),
+    }
+
+def recompute_batch(after_id=None, batch_size=1000, user_id=None, connection=None):
+    """
+    Recompute the next `batch_size` sessions (by id) after `after_id`.
+    Returns (rows_updated, last_id); last_id is None once there is nothing left.
+    """
+    conn = connection or db.session.connection()
+    ids = select(WorkoutSession.id).where(WorkoutSession.workout_date.isnot(None))
+    if user_id is not None:
+        ids = ids.where(WorkoutSession.user_id == user_id)
+    if after_id is not None:
+        ids = ids.where(WorkoutSession.id > after_id)
+    ids = [r[0] for r in conn.execute(ids.order_by(WorkoutSession.id).limit(batch_size))]
+    if not ids:
+        return 0, None
+
+    conn.execute(
+        update(WorkoutSession)
+        .where(WorkoutSession.user_id == User.id)
+        .where(WorkoutSession.id.in_(ids))
+        .values(**_sql_values())
+        .execution_options(synchronize_session=False)
+    )
+    return len(ids), ids[-1]
+
+def recompute_user(user_id, batch_size=1000, connection=None):
+    """Recompute all of one user's sessions (e.g. after a timezone change)."""
+    total, last_id = 0, None
+    while True:
+        n, last_id = recompute_batch(last_id, batch_size, user_id, connection)
+        if last_id is None:
+            return total
+        total += n
@@ -0,0 +1,49 @@
+# workout_session/commands.py
+"""
+CLI for workout analytics maintenance, exposed under the blueprint group:
+
+    flask workout_session backfill-charting [--user-id <uuid>] [--batch-size N]
+    flask workout_session backfill-rollups [--user-id <uuid>]
+
+Run backfill-charting first: rollups are grouped by the stored local_date.
+"""
+
+import click
+from extensions import db
+from .models import WorkoutSession
+from .routes import workout_sessions_bp
+from . import rollups, charting
+
+
+@workout_sessions_bp.cli.command("backfill-charting")
+@click.option("--user-id", default=None, help="Only recompute this user's sessions.")
+@click.option("--batch-size", default=1000, show_default=True, type=int)
+def backfill_charting(user_id, batch_size):
+    """Recompute local charting fields in each owner's timezone, one batch per transaction."""
+    total, last_id = 0, None
+    while True:
+        n, last_id = charting.recompute_batch(last_id, batch_size, user_id)
+        db.session.commit()
+        if last_id is None:
+            break
+        total += n
+        click.echo(f"updated {total} session(s) (last id {last_id})")
+
+    click.echo(f"Done. Recomputed charting fields for {total} session(s).")
+
+
+@workout_sessions_bp.cli.command("backfill-rollups")
+@click.option("--user-id", default=None, help="Only rebuild this user's rollups.")
+def backfill_rollups(user_id):
+    """Rebuild workout_daily_rollups from workout_sessions, one user per transaction."""
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = [r[0] for r in db.session.query(WorkoutSession.user_id).distinct().all()]
+
+    for i, uid in enumerate(user_ids, start=1):
+        rollups.rebuild_user(uid)
+        db.session.commit()
+        click.echo(f"[{i}/{len(user_ids)}] rebuilt rollups for user {uid}")
+
+    click.echo(f"Done. Rebuilt rollups for {len(user_ids)} user(s).")
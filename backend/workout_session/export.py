@@ -0,0 +1,99 @@
+# workout_session/export.py
+"""
+Streaming export for GET /api/workout_sessions/export.
+
+Rows come off a server-side cursor (stream_results + yield_per), are
+formatted one at a time and optionally gzip-compressed on the fly, so
+memory stays flat no matter how many sessions a user has.
+"""
+
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select, false
+from extensions import db
+from . import catalog
+from .models import WorkoutSession
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+YIELD_PER = 1000
+FLUSH_BYTES = 64 * 1024   # coalesce small rows into ~64KB response chunks
+
+COLUMNS = [
+    "id", "workout_date", "local_date", "workout_type", "exercise_name",
+    "sets", "reps", "weight_lbs", "duration_minutes", "calories_burned", "source",
+]
+
+
+def export_query(user_id, start_utc=None, end_utc=None, exercise=None):
+    """Oldest first; served by ix_workout_sessions_user_workout_date / _user_exercise_date."""
+    ws = WorkoutSession.__table__.c
+    q = select(*[ws[c] for c in COLUMNS]).where(ws.user_id == user_id)
+    if start_utc is not None:
+        q = q.where(ws.workout_date >= start_utc)
+    if end_utc is not None:
+        q = q.where(ws.workout_date < end_utc)
+    if exercise:
+        # Catalog name or alias; an unknown name matches nothing
+        exercise_id = catalog.lookup(exercise)
+        q = q.where(ws.exercise_id == exercise_id if exercise_id is not None else false())
+    return q.order_by(ws.workout_date, ws.id)
+
+def _record(row):
+    rec = dict(row._mapping)
+    rec["id"] = str(rec["id"])
+    rec["workout_date"] = rec["workout_date"].isoformat() + "Z" if rec["workout_date"] else None
+    rec["local_date"] = rec["local_date"].isoformat() if rec["local_date"] else None
+    return rec
+
+def _iter_rows(stmt):
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=YIELD_PER))
+    try:
+        for row in result:
+            yield _record(row)
+    finally:
+        result.close()
+
+def _csv_lines(records):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=COLUMNS, lineterminator="\n")
+    writer.writeheader()
+    yield buf.getvalue()
+    for rec in records:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(rec)
+        yield buf.getvalue()
+
+def _ndjson_lines(records):
+    for rec in records:
+        yield json.dumps(rec) + "\n"
+
+def _chunked(lines, gzip=False):
+    """Encode, optionally gzip, and group lines into FLUSH_BYTES-sized chunks."""
+    compressor = zlib.compressobj(wbits=31) if gzip else None   # wbits=31: gzip container
+    pending, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            pending.append(data)
+            size += len(data)
+        if size >= FLUSH_BYTES:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if compressor:
+        pending.append(compressor.flush())
+    if pending:
+        yield b"".join(pending)
+
+def generate(fmt, stmt, gzip=False):
+    records = _iter_rows(stmt)
+    lines = _csv_lines(records) if fmt == "csv" else _ndjson_lines(records)
+    return _chunked(lines, gzip=gzip)
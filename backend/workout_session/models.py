@@ -3,25 +3,53 @@
 
 import uuid
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from extensions import db
 from sqlalchemy.dialects.postgresql import UUID
 
 
+class Exercise(db.Model):
+    """Canonical exercise catalog; sessions reference it by exercise_id (see catalog.py)."""
+    __tablename__ = 'exercises'
+
+    id       = db.Column(db.Integer, primary_key=True)
+    name     = db.Column(db.String(100), nullable=False)                # display name, e.g. Flat Bench Press
+    slug     = db.Column(db.String(100), nullable=False, unique=True)   # normalized name, e.g. flat bench press
+    category = db.Column(db.String(50))                                 # Strength, Cardio, Yoga, HIIT, ...
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    aliases = db.relationship("ExerciseAlias", backref="exercise", cascade="all, delete-orphan")
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "category": self.category}
+
+
+class ExerciseAlias(db.Model):
+    """Other spellings that resolve to an exercise, e.g. 'bench press' -> Flat Bench Press."""
+    __tablename__ = 'exercise_aliases'
+
+    id          = db.Column(db.Integer, primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete="CASCADE"), nullable=False, index=True)
+    slug        = db.Column(db.String(100), nullable=False, unique=True)   # normalized alias
+
+
 class WorkoutSession(db.Model):
     __tablename__ = 'workout_sessions'
 
     id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
     # 👇 Cascade delete at the DB level
-    user_id = db.Column(
+    # active_history: rollups need the previous user/day when a session is moved
+    user_id = db.column_property(db.Column(
         UUID(as_uuid=True),
         db.ForeignKey('users.id', ondelete="CASCADE"),
         nullable=False
-    )
+    ), active_history=True)
 
     # High-level category and specific exercise
     workout_type   = db.Column(db.String(100))   # e.g., Strength, Cardio, Yoga
-    exercise_name  = db.Column(db.String(100))   # e.g., Deadlift, Bench Press
+    exercise_name  = db.Column(db.String(100))   # e.g., Deadlift, Bench Press (as entered)
+    exercise_id    = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete="SET NULL"))  # resolved from exercise_name
 
     # Optional performance details
     sets           = db.Column(db.Integer)       # total working sets
@@ -31,14 +59,19 @@ class WorkoutSession(db.Model):
     # Source of the session relative to plan
     source         = db.Column(db.String(12))    # 'planned' or 'extra'
 
+    # Client-supplied key for bulk uploads; retries with the same key are ignored
+    idempotency_key = db.Column(db.String(100))
+
     # Duration / calories
     duration_minutes = db.Column(db.Integer)     # time spent working out
     calories_burned  = db.Column(db.Float)       # optional
 
     # Core timestamp for the workout (stored in UTC ideally)
-    workout_date = db.Column(db.DateTime, default=datetime.utcnow)
+    workout_date = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
 
-    # Pre-computed fields for easier charting
+    # Pre-computed fields for easier charting, in the owner's local timezone
+    # (users.timezone); kept in sync by workout_session/charting.py
+    local_date  = db.column_property(db.Column(db.Date), active_history=True)  # local calendar day
     day_of_week = db.Column(db.String(3))        # e.g., Mon, Tue, Wed
     week_start  = db.Column(db.Date)             # Monday's date for weekly aggregation
     month       = db.Column(db.String(7))        # e.g., 2025-08
@@ -51,69 +84,137 @@ class WorkoutSession(db.Model):
         cascade="all, delete-orphan"
     ))
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        if self.workout_date:
-            # Ensure charting fields are derived from workout_date
-            self.day_of_week = self.workout_date.strftime("%a")
-            self.week_start  = self.workout_date.date() - timedelta(days=self.workout_date.weekday())
-            self.month       = self.workout_date.strftime("%Y-%m")
-            self.year        = self.workout_date.year
-            self.hour_of_day = self.workout_date.hour
-
-
-
-
-"""""""""""
-import uuid
-from datetime import datetime, timedelta
-from extensions import db
-from sqlalchemy.dialects.postgresql import UUID
-
-
-class WorkoutSession(db.Model):
-    __tablename__ = 'workout_sessions'
-
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
+    __table_args__ = (
+        db.Index("ix_workout_sessions_user_workout_date", "user_id", "workout_date"),
+        db.Index("ix_workout_sessions_user_exercise_date", "user_id", "exercise_id", "workout_date"),
+        db.Index("ix_workout_sessions_user_week_start", "user_id", "week_start"),
+        db.Index("ix_workout_sessions_user_month", "user_id", "month"),
+        db.Index("uq_workout_sessions_user_idempotency_key", "user_id", "idempotency_key", unique=True),
+    )
 
-    # High-level category and specific exercise
-    workout_type   = db.Column(db.String(100))   # e.g., Strength, Cardio, Yoga
-    exercise_name  = db.Column(db.String(100))   # e.g., Deadlift, Bench Press (NEW)
+    def __init__(self, tz=None, **kwargs):
+        super().__init__(**kwargs)
+        # Without `tz` the fields are filled at flush time from the owner's timezone
+        if tz and self.workout_date:
+            self.set_charting_fields(tz)
+
+    def set_charting_fields(self, tz: str):
+        """Derive the charting fields from workout_date (naive UTC) as seen in `tz`."""
+        for key, value in charting_values(self.workout_date, tz).items():
+            setattr(self, key, value)
+
+
+def charting_values(workout_date, tz: str) -> dict:
+    """Charting column values for a (naive UTC or aware) workout_date in `tz`."""
+    if workout_date.tzinfo is None:
+        workout_date = workout_date.replace(tzinfo=ZoneInfo("UTC"))
+    local = workout_date.astimezone(ZoneInfo(tz))
+    return {
+        "local_date":  local.date(),
+        "day_of_week": local.strftime("%a"),
+        "week_start":  local.date() - timedelta(days=local.weekday()),
+        "month":       local.strftime("%Y-%m"),
+        "year":        local.year,
+        "hour_of_day": local.hour,
+    }
+
+
+class WorkoutDailyRollup(db.Model):
+    """
+    One row per (user, local day, exercise label), maintained by workout_session/rollups.py.
+    Charts read these O(days) rows instead of rescanning workout_sessions.
+    """
+    __tablename__ = 'workout_daily_rollups'
 
-    # Optional performance details
-    sets           = db.Column(db.Integer)       # total working sets (NEW)
-    reps           = db.Column(db.Integer)       # reps of top/avg set (NEW)
-    weight_lbs     = db.Column(db.Float)         # weight for top/avg set (NEW)
+    user_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey('users.id', ondelete="CASCADE"),
+        primary_key=True
+    )
+    local_date    = db.Column(db.Date, primary_key=True)          # WorkoutSession.local_date
+    exercise_name = db.Column(db.String(100), primary_key=True)   # exercise_name -> workout_type -> 'Unknown'
+    exercise_id   = db.Column(db.Integer)                         # catalog id of that label (None for type-only sessions)
+
+    minutes           = db.Column(db.Integer, nullable=False, default=0)
+    sessions          = db.Column(db.Integer, nullable=False, default=0)
+    total_reps        = db.Column(db.Integer, nullable=False, default=0)   # reps * sets
+    total_volume      = db.Column(db.Float, nullable=False, default=0.0)   # reps * sets * weight
+    best_1rm          = db.Column(db.Float, nullable=False, default=0.0)   # Epley, best single session
+    max_weight        = db.Column(db.Float, nullable=False, default=0.0)
+    weight_sum        = db.Column(db.Float, nullable=False, default=0.0)   # for avg_weight
+    weighted_sessions = db.Column(db.Integer, nullable=False, default=0)
+
+    # First session of the day for this exercise (keeps chart ordering stable)
+    first_logged_at = db.Column(db.DateTime)
+    updated_at      = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class WorkoutExerciseBucket(db.Model):
+    """
+    Per-(user, exercise, day|week|month) strength stats for exercise_trend,
+    derived from workout_daily_rollups by workout_session/records.py.
+    """
+    __tablename__ = 'workout_exercise_buckets'
 
-    # Source of the session relative to plan
-    source         = db.Column(db.String(12))    # 'planned' or 'extra' (NEW)
+    user_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey('users.id', ondelete="CASCADE"),
+        primary_key=True
+    )
+    exercise_id  = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete="CASCADE"), primary_key=True)
+    period       = db.Column(db.String(5), primary_key=True)    # 'day' | 'week' | 'month'
+    bucket_start = db.Column(db.Date, primary_key=True)         # day, Monday or 1st of month
 
-    # Duration / calories
-    duration_minutes = db.Column(db.Integer)     # time spent working out
-    calories_burned  = db.Column(db.Float)       # optional
+    sessions          = db.Column(db.Integer, nullable=False, default=0)
+    total_reps        = db.Column(db.Integer, nullable=False, default=0)
+    total_volume      = db.Column(db.Float, nullable=False, default=0.0)
+    best_1rm          = db.Column(db.Float, nullable=False, default=0.0)
+    max_weight        = db.Column(db.Float, nullable=False, default=0.0)
+    weight_sum        = db.Column(db.Float, nullable=False, default=0.0)
+    weighted_sessions = db.Column(db.Integer, nullable=False, default=0)
 
-    # Core timestamp for the workout (stored in UTC ideally)
-    workout_date = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Pre-computed fields for easier charting
-    day_of_week = db.Column(db.String(3))        # e.g., Mon, Tue, Wed
-    week_start  = db.Column(db.Date)             # Monday's date for weekly aggregation
-    month       = db.Column(db.String(7))        # e.g., 2025-08
-    year        = db.Column(db.Integer)          # e.g., 2025
-    hour_of_day = db.Column(db.Integer)          # 0-23 (for hourly patterns)
 
-    user = db.relationship("User", backref="workout_sessions")
+class WorkoutPersonalRecord(db.Model):
+    """All-time bests per (user, exercise), maintained by workout_session/records.py."""
+    __tablename__ = 'workout_personal_records'
 
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        if self.workout_date:
-            # Ensure charting fields are derived from workout_date
-            self.day_of_week = self.workout_date.strftime("%a")
-            self.week_start  = self.workout_date.date() - timedelta(days=self.workout_date.weekday())
-            self.month       = self.workout_date.strftime("%Y-%m")
-            self.year        = self.workout_date.year
-            self.hour_of_day = self.workout_date.hour
-            
-
-"""
\ No newline at end of file
+    user_id = db.Column(
+        UUID(as_uuid=True),
+        db.ForeignKey('users.id', ondelete="CASCADE"),
+        primary_key=True
+    )
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete="CASCADE"), primary_key=True)
+
+    best_1rm       = db.Column(db.Float, nullable=False, default=0.0)
+    best_1rm_on    = db.Column(db.Date)
+    max_weight     = db.Column(db.Float, nullable=False, default=0.0)
+    max_weight_on  = db.Column(db.Date)
+    best_volume    = db.Column(db.Float, nullable=False, default=0.0)   # best single day
+    best_volume_on = db.Column(db.Date)
+
+    sessions      = db.Column(db.Integer, nullable=False, default=0)
+    total_reps    = db.Column(db.Integer, nullable=False, default=0)
+    total_volume  = db.Column(db.Float, nullable=False, default=0.0)
+    first_on      = db.Column(db.Date)
+    last_on       = db.Column(db.Date)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self, exercise_name=None):
+        return {
+            "exercise_id": self.exercise_id,
+            "exercise": exercise_name,
+            "best_1rm": round(self.best_1rm or 0.0, 2),
+            "best_1rm_date": self.best_1rm_on.isoformat() if self.best_1rm_on else None,
+            "max_weight": round(self.max_weight or 0.0, 2),
+            "max_weight_date": self.max_weight_on.isoformat() if self.max_weight_on else None,
+            "best_volume": round(self.best_volume or 0.0, 2),
+            "best_volume_date": self.best_volume_on.isoformat() if self.best_volume_on else None,
+            "sessions": int(self.sessions or 0),
+            "total_reps": int(self.total_reps or 0),
+            "total_volume": round(self.total_volume or 0.0, 2),
+            "first_date": self.first_on.isoformat() if self.first_on else None,
+            "last_date": self.last_on.isoformat() if self.last_on else None,
+        }
@@ -0,0 +1,186 @@
+# workout_session/records.py
+"""
+Per-exercise stats derived from workout_daily_rollups:
+
+  - workout_exercise_buckets: day/week/month buckets for exercise_trend
+  - workout_personal_records: all-time bests per (user, exercise)
+
+Both are keyed by catalog exercise_id (catalog.py); rollup rows without an
+id (type-only sessions) are not tracked. rollups.refresh_days() calls
+refresh() with the days and exercise ids it just rebuilt, so only the buckets containing those days and the PR rows of those
+exercises are recomputed. Both are built from daily rollup rows, never from
+raw sessions.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func, cast, case, select, insert, delete, literal, Date
+from sqlalchemy.dialects.postgresql import aggregate_order_by, ARRAY
+from extensions import db
+from .models import WorkoutDailyRollup, WorkoutExerciseBucket, WorkoutPersonalRecord
+
+PERIODS = ("day", "week", "month")
+
+
+def bucket_start(day, period):
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def bucket_end(start, period):
+    """Last day of the bucket starting at `start`."""
+    if period == "week":
+        return start + timedelta(days=6)
+    if period == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return start
+
+
+# ---------- rebuild ----------
+
+_BUCKET_COLUMNS = [
+    "user_id", "exercise_id", "period", "bucket_start",
+    "sessions", "total_reps", "total_volume", "best_1rm",
+    "max_weight", "weight_sum", "weighted_sessions", "updated_at",
+]
+
+_PR_COLUMNS = [
+    "user_id", "exercise_id",
+    "best_1rm", "best_1rm_on", "max_weight", "max_weight_on", "best_volume", "best_volume_on",
+    "sessions", "total_reps", "total_volume", "first_on", "last_on", "updated_at",
+]
+
+def _bucket_expr(period):
+    R = WorkoutDailyRollup
+    if period == "day":
+        return R.local_date
+    return cast(func.date_trunc(period, R.local_date), Date)
+
+def _bucket_select(period, *filters):
+    R = WorkoutDailyRollup
+    start = _bucket_expr(period)
+    return (
+        select(
+            R.user_id, R.exercise_id, literal(period), start,
+            func.sum(R.sessions), func.sum(R.total_reps), func.sum(R.total_volume),
+            func.max(R.best_1rm), func.max(R.max_weight),
+            func.sum(R.weight_sum), func.sum(R.weighted_sessions),
+            literal(datetime.utcnow()),
+        )
+        .where(R.exercise_id.isnot(None), *filters)
+        .group_by(R.user_id, R.exercise_id, start)
+    )
+
+def _pr_select(*filters):
+    R = WorkoutDailyRollup
+
+    def peak_day(value):
+        ordered = func.array_agg(aggregate_order_by(R.local_date, value.desc(), R.local_date), type_=ARRAY(Date))
+        return case((func.max(value) > 0, ordered[1]))
+
+    return (
+        select(
+            R.user_id, R.exercise_id,
+            func.max(R.best_1rm), peak_day(R.best_1rm),
+            func.max(R.max_weight), peak_day(R.max_weight),
+            func.max(R.total_volume), peak_day(R.total_volume),
+            func.sum(R.sessions), func.sum(R.total_reps), func.sum(R.total_volume),
+            func.min(R.local_date), func.max(R.local_date),
+            literal(datetime.utcnow()),
+        )
+        .where(R.exercise_id.isnot(None), *filters)
+        .group_by(R.user_id, R.exercise_id)
+    )
+
+def refresh(user_id, days, exercise_ids, connection=None):
+    """Recompute the buckets containing `days` and the PRs of `exercise_ids` for one user."""
+    ids = sorted({i for i in exercise_ids if i is not None})
+    days = sorted(set(days))
+    if not user_id or not ids or not days:
+        return
+    conn = connection or db.session.connection()
+    R, B, P = WorkoutDailyRollup, WorkoutExerciseBucket, WorkoutPersonalRecord
+
+    for period in PERIODS:
+        starts = sorted({bucket_start(d, period) for d in days})
+        conn.execute(
+            delete(B)
+            .where(B.user_id == user_id, B.period == period)
+            .where(B.exercise_id.in_(ids), B.bucket_start.in_(starts))
+        )
+        conn.execute(
+            insert(B).from_select(
+                _BUCKET_COLUMNS,
+                _bucket_select(
+                    period,
+                    R.user_id == user_id,
+                    R.exercise_id.in_(ids),
+                    R.local_date >= starts[0],
+                    R.local_date <= bucket_end(starts[-1], period),
+                    _bucket_expr(period).in_(starts),
+                ),
+            )
+        )
+
+    conn.execute(delete(P).where(P.user_id == user_id, P.exercise_id.in_(ids)))
+    conn.execute(
+        insert(P).from_select(
+            _PR_COLUMNS,
+            _pr_select(R.user_id == user_id, R.exercise_id.in_(ids)),
+        )
+    )
+
+def rebuild_user(user_id, connection=None):
+    """Drop and rebuild every bucket and PR row for one user from its daily rollups."""
+    conn = connection or db.session.connection()
+    R, B, P = WorkoutDailyRollup, WorkoutExerciseBucket, WorkoutPersonalRecord
+    conn.execute(delete(B).where(B.user_id == user_id))
+    conn.execute(delete(P).where(P.user_id == user_id))
+    for period in PERIODS:
+        conn.execute(insert(B).from_select(_BUCKET_COLUMNS, _bucket_select(period, R.user_id == user_id)))
+    conn.execute(insert(P).from_select(_PR_COLUMNS, _pr_select(R.user_id == user_id)))
+
+
+# ---------- reads ----------
+
+def personal_records(user_id):
+    P = WorkoutPersonalRecord
+    return P.query.filter(P.user_id == user_id).all()
+
+def trend_buckets(user_id, exercise_id, period, first_day, last_day):
+    """
+    Stats per `period` bucket for first_day..last_day (inclusive).
+    Buckets cut by the range edges are assembled from day buckets so they
+    only count days inside the range.
+    """
+    B = WorkoutExerciseBucket
+
+    def query(p, lo, hi):
+        return (B.query
+                .filter(B.user_id == user_id, B.exercise_id == exercise_id, B.period == p)
+                .filter(B.bucket_start >= lo, B.bucket_start <= hi)
+                .order_by(B.bucket_start)
+                .all())
+
+    if period == "day":
+        return [(b.bucket_start, b) for b in query("day", first_day, last_day)]
+
+    # Whole buckets inside the range come precomputed; partial edge buckets from day rows
+    inner_first = bucket_start(first_day, period)
+    if inner_first < first_day:
+        inner_first = bucket_end(inner_first, period) + timedelta(days=1)
+    inner_last = bucket_start(last_day, period)
+    if bucket_end(inner_last, period) > last_day:
+        inner_last = bucket_start(inner_last - timedelta(days=1), period)
+
+    out, edges = [], [(first_day, last_day)]
+    if inner_first <= inner_last:
+        out = [(b.bucket_start, b) for b in query(period, inner_first, inner_last)]
+        edges = [(first_day, inner_first - timedelta(days=1)),
+                 (bucket_end(inner_last, period) + timedelta(days=1), last_day)]
+
+    for lo, hi in edges:
+        if lo <= hi:
+            out.extend((bucket_start(b.bucket_start, period), b) for b in query("day", lo, hi))
+    return sorted(out, key=lambda item: item[0])
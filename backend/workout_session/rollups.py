@@ -0,0 +1,173 @@
+# workout_session/rollups.py
+"""
+Per-user daily rollups (workout_daily_rollups).
+
+Any flush that inserts, updates or deletes a WorkoutSession records the
+(user, local day) pairs it touched; after the flush those days are rebuilt
+from workout_sessions in the same transaction. Charts then read O(days)
+rollup rows instead of O(sessions). Per-exercise buckets and PRs
+(records.py) are refreshed from the rebuilt days in the same step.
+
+Days are the sessions' stored local_date, i.e. the owner's users.timezone
+(see charting.py). Requests for another timezone fall back to the live SQL
+aggregates in aggregates.py.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect, func, cast, case, select, insert, delete, literal, Float
+from extensions import db
+from .models import WorkoutSession, WorkoutDailyRollup
+from .aggregates import exercise_label
+from .charting import user_timezone
+from . import records
+
+_TOUCHED_KEY = "workout_rollup_days"
+
+
+def covers(user, tz: str) -> bool:
+    """True when the user's rollups are bucketed in `tz` and can answer the request."""
+    return tz == user_timezone(user)
+
+
+# ---------- rebuild ----------
+
+_ROLLUP_COLUMNS = [
+    "user_id", "local_date", "exercise_name", "exercise_id",
+    "minutes", "sessions", "total_reps", "total_volume",
+    "best_1rm", "max_weight", "weight_sum", "weighted_sessions",
+    "first_logged_at", "updated_at",
+]
+
+def _rollup_select(*filters):
+    """INSERT ... SELECT source: sessions grouped by (user, local day, exercise label)."""
+    ws = WorkoutSession
+    reps = func.coalesce(ws.reps, 0)
+    sets = func.greatest(func.coalesce(ws.sets, 0), 1)   # missing sets count as one
+    weight = cast(func.coalesce(ws.weight_lbs, 0), Float)
+    weighted = case((weight > 0, weight))
+    epley = case(((weight > 0) & (reps > 0), weight * (1 + reps / 30.0)))
+    day = ws.local_date
+    label = exercise_label()
+
+    return (
+        select(
+            ws.user_id,
+            day,
+            label,
+            func.min(ws.exercise_id),   # one catalog id per label (same normalized name)
+            func.coalesce(func.sum(ws.duration_minutes), 0),
+            func.count(ws.id),
+            func.coalesce(func.sum(reps * sets), 0),
+            func.coalesce(func.sum(reps * sets * weight), 0),
+            func.coalesce(func.max(epley), 0),
+            func.coalesce(func.max(weighted), 0),
+            func.coalesce(func.sum(weighted), 0),
+            func.count(weighted),
+            func.min(ws.workout_date),
+            literal(datetime.utcnow()),
+        )
+        .where(ws.local_date.isnot(None), *filters)
+        .group_by(ws.user_id, day, label)
+    )
+
+def refresh_days(user_id, days, connection=None):
+    """Recompute the rollup rows of `user_id` for the given local days."""
+    days = sorted({d for d in days if d})
+    if not user_id or not days:
+        return
+    conn = connection or db.session.connection()
+    # (user_id, week_start) index narrows the scan to the touched weeks
+    mondays = sorted({d - timedelta(days=d.weekday()) for d in days})
+
+    removed = conn.execute(
+        delete(WorkoutDailyRollup)
+        .where(WorkoutDailyRollup.user_id == user_id)
+        .where(WorkoutDailyRollup.local_date.in_(days))
+        .returning(WorkoutDailyRollup.exercise_id)
+    ).scalars().all()
+    added = conn.execute(
+        insert(WorkoutDailyRollup).from_select(
+            _ROLLUP_COLUMNS,
+            _rollup_select(
+                WorkoutSession.user_id == user_id,
+                WorkoutSession.week_start.in_(mondays),
+                WorkoutSession.local_date.in_(days),
+            ),
+        )
+        .returning(WorkoutDailyRollup.exercise_id)
+    ).scalars().all()
+
+    # Exercise buckets / PRs of every exercise that was or now is on those days
+    records.refresh(user_id, days, set(removed) | set(added), conn)
+
+def rebuild_user(user_id, connection=None):
+    """Drop and rebuild every rollup row for one user (backfill / repair)."""
+    conn = connection or db.session.connection()
+    conn.execute(delete(WorkoutDailyRollup).where(WorkoutDailyRollup.user_id == user_id))
+    conn.execute(
+        insert(WorkoutDailyRollup).from_select(
+            _ROLLUP_COLUMNS,
+            _rollup_select(WorkoutSession.user_id == user_id),
+        )
+    )
+    records.rebuild_user(user_id, conn)
+
+
+# ---------- incremental sync (ORM flush hooks) ----------
+
+def _previous(state, attr, current):
+    hist = state.attrs[attr].history
+    return hist.deleted[0] if hist.deleted else current
+
+@event.listens_for(db.session, "before_flush")
+def _collect_touched_days(session, flush_context, instances):
+    touched = session.info.setdefault(_TOUCHED_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, WorkoutSession):
+            continue
+        user_id = obj.user_id or (obj.user.id if obj.user is not None else None)
+        touched.add((user_id, obj.local_date))
+        if obj in session.dirty:
+            state = inspect(obj)
+            touched.add((
+                _previous(state, "user_id", user_id),
+                _previous(state, "local_date", obj.local_date),
+            ))
+
+@event.listens_for(db.session, "after_flush")
+def _refresh_touched_days(session, flush_context):
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    if not touched:
+        return
+    by_user = defaultdict(set)
+    for user_id, day in touched:
+        if user_id and day:
+            by_user[user_id].add(day)
+    conn = session.connection()
+    for user_id, days in by_user.items():
+        refresh_days(user_id, days, conn)
+
+
+# ---------- reads ----------
+
+def daily_totals(user_id, first_day, last_day):
+    """(local_date, exercise, sessions, minutes) for first_day..last_day, same order as aggregates."""
+    R = WorkoutDailyRollup
+    return (db.session.query(R.local_date, R.exercise_name, R.sessions, R.minutes)
+            .filter(R.user_id == user_id)
+            .filter(R.local_date >= first_day)
+            .filter(R.local_date <= last_day)
+            .order_by(R.local_date, R.first_logged_at, R.exercise_name)
+            .all())
+
+def monthly_totals(user_id, first_day):
+    """(month 'YYYY-MM', sessions, minutes) from first_day onward."""
+    R = WorkoutDailyRollup
+    month = func.to_char(R.local_date, "YYYY-MM").label("month")
+    return (db.session.query(month, func.sum(R.sessions), func.sum(R.minutes))
+            .filter(R.user_id == user_id)
+            .filter(R.local_date >= first_day)
+            .group_by(month)
+            .order_by(month)
+            .all())
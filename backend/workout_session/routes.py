@@ -1,17 +1,23 @@
 # routes for workout sessions
 # workout_session/routes.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from extensions import db
-from utils.decorators import token_required
+from utils.auth import token_required
 from .models import WorkoutSession
+from . import rollups, records, catalog, bulk, export
+from .charting import user_timezone
+from .aggregates import (
+    naive_utc, daily_exercise_totals, monthly_totals,
+    empty_week_points, add_to_week_points, weeks_from_daily_rows,
+)
 workout_sessions_bp = Blueprint('workout_session', __name__)
 
 # ---------- helpers ----------
 
-def _parse_iso_dt_to_utc(iso_str: str, assume_tz: str = "America/Chicago") -> datetime:
+def _parse_iso_dt_to_utc(iso_str: str, assume_tz: str) -> datetime:
     """
     Parse an ISO-8601 datetime string into UTC.
     If no tzinfo, assume `assume_tz`.
@@ -97,7 +103,8 @@ def generate_dummy_data(current_user):
         ],
     }
 
-    now = datetime.now(ZoneInfo("America/Chicago"))
+    tz = user_timezone(current_user)
+    now = datetime.now(ZoneInfo(tz))
     created = 0
 
     for day_offset in range(days):
@@ -129,6 +136,7 @@ def generate_dummy_data(current_user):
             source = "planned" if random.random() < pct_planned else "extra"
 
             session = WorkoutSession(
+                tz=tz,
                 user_id=current_user.id,
                 workout_type=workout_type,
                 exercise_name=ex["name"],
@@ -150,7 +158,7 @@ def generate_dummy_data(current_user):
 @workout_sessions_bp.route('/weekly', methods=['GET'])
 @token_required
 def weekly_points(current_user):
-    tz = request.args.get('tz') or "America/Chicago"
+    tz = request.args.get('tz') or user_timezone(current_user)
     week_start_str = request.args.get('week_start')  # YYYY-MM-DD
     weeks_back = request.args.get('weeks_back', type=int)  # optional
 
@@ -170,58 +178,15 @@ def weekly_points(current_user):
     start_utc = local_start.astimezone(ZoneInfo("UTC"))
     end_utc = (local_start + timedelta(days=7)).astimezone(ZoneInfo("UTC"))
 
-    sessions = (WorkoutSession.query
-                .filter(WorkoutSession.user_id == current_user.id)
-                .filter(WorkoutSession.workout_date >= start_utc)
-                .filter(WorkoutSession.workout_date < end_utc)
-                .all())
-
-    labels = ['Mon','Tue','Wed','Thu','Fri','Sat','Sun']
-    minutes = [0]*7
-    sess_ct = [0]*7
+    if rollups.covers(current_user, tz):
+        first_day = local_start.date()
+        rows = rollups.daily_totals(current_user.id, first_day, first_day + timedelta(days=6))
+    else:
+        rows = daily_exercise_totals(current_user.id, start_utc, end_utc, tz)
 
-    # NEW: per-day exercise tracking
-    from collections import defaultdict
-    day_ex_detail = [defaultdict(lambda: {"sessions": 0, "minutes": 0}) for _ in range(7)]
-    day_ex_seen_order = [[] for _ in range(7)]  # keep insertion order per day
-
-    def _uniq_preserve(seq):
-        seen = set()
-        out = []
-        for x in seq:
-            if x not in seen:
-                out.append(x); seen.add(x)
-        return out
-
-    for s in sessions:
-        local_dt = s.workout_date.astimezone(ZoneInfo(tz))
-        i = local_dt.weekday()
-        dur = int(s.duration_minutes or 0)
-        minutes[i] += dur
-        sess_ct[i] += 1
-
-        ex_name = (s.exercise_name or s.workout_type or "Unknown").strip() or "Unknown"
-        day_ex_detail[i][ex_name]["sessions"] += 1
-        day_ex_detail[i][ex_name]["minutes"] += dur
-        day_ex_seen_order[i].append(ex_name)
-
-    points = []
-    for i in range(7):
-        # unique list of exercises in order of first appearance that day
-        workouts_list = _uniq_preserve(day_ex_seen_order[i])
-        exercises_detail = [
-            {"name": name,
-             "sessions": day_ex_detail[i][name]["sessions"],
-             "minutes": day_ex_detail[i][name]["minutes"]}
-            for name in workouts_list
-        ]
-        points.append({
-            "label": labels[i],
-            "minutes": minutes[i],
-            "sessions": sess_ct[i],
-            "workouts": workouts_list,        
-            "exercises": exercises_detail 
-        })
+    points = empty_week_points()
+    for local_date, exercise, sessions, minutes in rows:
+        add_to_week_points(points, local_date, exercise, sessions, minutes)
 
     return jsonify({
         "user_id": str(current_user.id),
@@ -234,7 +199,7 @@ def weekly_points(current_user):
 @workout_sessions_bp.route('/history/weeks', methods=['GET'])
 @token_required
 def weeks_history(current_user):
-    tz = request.args.get('tz') or "America/Chicago"
+    tz = request.args.get('tz') or user_timezone(current_user)
     n = request.args.get('n', default=8, type=int)  
 
     now_local = datetime.now(ZoneInfo(tz))
@@ -246,88 +211,20 @@ def weeks_history(current_user):
     start_utc = first_local.astimezone(ZoneInfo("UTC"))
     end_utc = last_local.astimezone(ZoneInfo("UTC"))
 
-    sessions = (WorkoutSession.query
-                .filter(WorkoutSession.user_id == current_user.id)
-                .filter(WorkoutSession.workout_date >= start_utc)
-                .filter(WorkoutSession.workout_date < end_utc)
-                .all())
-
-    labels = ['Mon','Tue','Wed','Thu','Fri','Sat','Sun']
-
-    # Week buckets -> day buckets -> exercise aggregates
-    from collections import defaultdict
-    weeks = {}  # key = monday iso -> structure
-
-    def _ensure_week(key):
-        if key not in weeks:
-            weeks[key] = {
-                "week_start": key,
-                "points": [{
-                    "label": labels[i],
-                    "minutes": 0,
-                    "sessions": 0,
-                    "workouts": [],
-                    "exercises": []  # will fill later
-                } for i in range(7)],
-                "_per_day_ex": [defaultdict(lambda: {"sessions": 0, "minutes": 0}) for _ in range(7)],
-                "_per_day_seen": [[] for _ in range(7)]
-            }
-
-    for s in sessions:
-        local_dt = s.workout_date.astimezone(ZoneInfo(tz))
-        monday = local_dt.date() - timedelta(days=local_dt.weekday())
-        key = monday.isoformat()
-        _ensure_week(key)
-
-        i = local_dt.weekday()
-        dur = int(s.duration_minutes or 0)
-        weeks[key]["points"][i]["minutes"] += dur
-        weeks[key]["points"][i]["sessions"] += 1
-
-        ex_name = (s.exercise_name or s.workout_type or "Unknown").strip() or "Unknown"
-        weeks[key]["_per_day_ex"][i][ex_name]["sessions"] += 1
-        weeks[key]["_per_day_ex"][i][ex_name]["minutes"] += dur
-        weeks[key]["_per_day_seen"][i].append(ex_name)
-
-    # finalize workouts/exercises lists and fill empty weeks
-    def _uniq_preserve(seq):
-        seen = set()
-        out = []
-        for x in seq:
-            if x not in seen:
-                out.append(x); seen.add(x)
-        return out
+    if rollups.covers(current_user, tz):
+        rows = rollups.daily_totals(current_user.id, first_monday, start_monday + timedelta(days=6))
+    else:
+        rows = daily_exercise_totals(current_user.id, start_utc, end_utc, tz)
+    weeks = weeks_from_daily_rows(rows)
 
+    # oldest -> newest, filling weeks with no sessions
     ordered = []
     for k in range(n):
         monday = (start_monday - timedelta(days=7*(n-1-k))).isoformat()
-        if monday not in weeks:
-            # empty week
-            ordered.append({
-                "week_start": monday,
-                "points": [{
-                    "label": labels[i],
-                    "minutes": 0,
-                    "sessions": 0,
-                    "workouts": [],
-                    "exercises": []
-                } for i in range(7)]
-            })
-        else:
-            wk = weeks[monday]
-            for i in range(7):
-                workouts_list = _uniq_preserve(wk["_per_day_seen"][i])
-                wk["points"][i]["workouts"] = workouts_list
-                wk["points"][i]["exercises"] = [
-                    {"name": name,
-                     "sessions": wk["_per_day_ex"][i][name]["sessions"],
-                     "minutes": wk["_per_day_ex"][i][name]["minutes"]}
-                    for name in workouts_list
-                ]
-            # strip internal helpers
-            wk.pop("_per_day_ex", None)
-            wk.pop("_per_day_seen", None)
-            ordered.append(wk)
+        ordered.append({
+            "week_start": monday,
+            "points": weeks.get(monday) or empty_week_points()
+        })
 
     return jsonify({"weeks": ordered}), 200
     
@@ -339,7 +236,7 @@ def weeks_history(current_user):
 def monthly_summary(current_user):
     # last 6 months by default
     months = request.args.get('months', default=6, type=int)
-    tz = request.args.get('tz') or "America/Chicago"
+    tz = request.args.get('tz') or user_timezone(current_user)
 
     now_local = datetime.now(ZoneInfo(tz))
     # earliest date = first day of (now - months + 1)
@@ -349,21 +246,15 @@ def monthly_summary(current_user):
     first_local = first.replace(day=1, hour=0, minute=0, second=0, tzinfo=ZoneInfo(tz))
 
     start_utc = first_local.astimezone(ZoneInfo("UTC"))
-    sessions = (WorkoutSession.query
-                .filter(WorkoutSession.user_id == current_user.id)
-                .filter(WorkoutSession.workout_date >= start_utc)
-                .all())
-
-    buckets = {}
-    for s in sessions:
-        local_dt = s.workout_date.astimezone(ZoneInfo(tz))
-        key = local_dt.strftime("%Y-%m")
-        b = buckets.setdefault(key, {"month": key, "minutes": 0, "sessions": 0})
-        b["minutes"] += int(s.duration_minutes or 0)
-        b["sessions"] += 1
-
-    # order by month key
-    ordered = [buckets[k] for k in sorted(buckets.keys())]
+    if rollups.covers(current_user, tz):
+        rows = rollups.monthly_totals(current_user.id, first_local.date())
+    else:
+        rows = monthly_totals(current_user.id, start_utc, tz)
+
+    ordered = [
+        {"month": month, "minutes": int(minutes or 0), "sessions": int(sessions or 0)}
+        for month, sessions, minutes in rows
+    ]
     return jsonify({"months": ordered}), 200
 
 
@@ -372,7 +263,7 @@ def monthly_summary(current_user):
 @token_required
 def generate_week(current_user):
     import random
-    tz = request.args.get('tz') or "America/Chicago"
+    tz = request.args.get('tz') or user_timezone(current_user)
     week_start_str = request.args.get('week_start')  # YYYY-MM-DD, Monday
     if not week_start_str:
         return jsonify({"error": "week_start (YYYY-MM-DD) required"}), 400
@@ -387,6 +278,7 @@ def generate_week(current_user):
         # optional: random chance to skip a day
         if random.random() < 0.85:
             session = WorkoutSession(
+                tz=user_timezone(current_user),
                 user_id=current_user.id,
                 workout_type=random.choice(["Strength","Cardio","Yoga","HIIT"]),
                 duration_minutes=random.randint(min_minutes, max_minutes),
@@ -397,26 +289,100 @@ def generate_week(current_user):
     db.session.commit()
     return jsonify({"message": f"Generated data for week starting {week_start_str}"}), 201
 
+# Bulk upload (wearables / kiosks): NDJSON or a JSON array of sessions
+@workout_sessions_bp.route('/bulk', methods=['POST'])
+@token_required
+def bulk_create(current_user):
+    """
+    Body: NDJSON (Content-Type: application/x-ndjson) or a JSON array of
+      { workout_date (ISO-8601, required; naive = user's timezone), workout_type, exercise_name,
+        sets, reps, weight_lbs, duration_minutes, calories_burned, source, idempotency_key }
+    Optional header Idempotency-Key: rows without their own key get "<header>:<row number>".
+    Invalid rows are reported in `errors` and skipped; valid rows are still saved.
+    Response: { "received", "inserted", "duplicates", "errors": [{ "row", "error" }] }
+    """
+    key_prefix = (request.headers.get('Idempotency-Key') or '').strip() or None
+    try:
+        result = bulk.ingest(
+            request.stream, request.mimetype, current_user.id,
+            user_timezone(current_user), key_prefix,
+        )
+    except bulk.TooManyRows as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 413
+    except bulk.BulkBodyError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    db.session.commit()
+    return jsonify(result), 201 if result["inserted"] else 200
+
+# Export full history (support / data portability)
+@workout_sessions_bp.route('/export', methods=['GET'])
+@token_required
+def export_sessions(current_user):
+    """
+    Query params:
+      - format: csv | ndjson (default: csv)
+      - from, to: ISO-8601 range on workout_date, to exclusive (naive = user's timezone)
+      - exercise: exercise name or alias (catalog match)
+      - gzip: 1/0 to force compression on/off (default: on when Accept-Encoding allows gzip)
+    Streams the rows; nothing is buffered beyond one chunk.
+    """
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in export.FORMATS:
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+
+    tz = user_timezone(current_user)
+    try:
+        start_utc = bulk.parse_client_datetime(request.args['from'], tz) if request.args.get('from') else None
+        end_utc = bulk.parse_client_datetime(request.args['to'], tz) if request.args.get('to') else None
+    except ValueError as e:   # "must be ISO-8601" / "is out of range"
+        return jsonify({"error": f"from/to {e}"}), 400
+
+    gzip_arg = request.args.get('gzip')
+    use_gzip = gzip_arg == '1' if gzip_arg in ('0', '1') else bool(request.accept_encodings['gzip'])
+
+    stmt = export.export_query(current_user.id, start_utc, end_utc, request.args.get('exercise'))
+    resp = Response(
+        stream_with_context(export.generate(fmt, stmt, gzip=use_gzip)),
+        mimetype=export.FORMATS[fmt],
+    )
+    resp.headers['Content-Disposition'] = f'attachment; filename="workouts.{fmt}"'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if use_gzip:
+        resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
 # # Distinct exercise names for the logged-in user
 @workout_sessions_bp.route('/exercise/names', methods=['GET'])
 @token_required
 def list_exercise_names(current_user):
     """
-    Returns distinct exercise names for the logged-in user.
+    Returns the catalog names of the exercises the logged-in user has logged.
     Response: { "exercises": ["Bench Press", "Deadlift", ...] }
     """
-    rows = (
-        db.session.query(WorkoutSession.exercise_name)
-        .filter(WorkoutSession.user_id == current_user.id)
-        .filter(WorkoutSession.exercise_name.isnot(None))
-        .distinct()
-        .order_by(WorkoutSession.exercise_name.asc())
-        .all()
-    )
-    names = [r[0] for r in rows if (r and r[0])]
+    # One PR row per logged exercise; names come from the in-process catalog
+    ids = [r.exercise_id for r in records.personal_records(current_user.id)]
+    names = sorted((n for n in map(catalog.name_of, ids) if n), key=str.lower)
     return jsonify({"exercises": names}), 200
 
 
+# Personal records for every exercise the user has logged
+@workout_sessions_bp.route('/exercise/prs', methods=['GET'])
+@token_required
+def exercise_prs(current_user):
+    """
+    Response: { "records": [ { "exercise_id", "exercise", "best_1rm", "best_1rm_date", "max_weight", "max_weight_date",
+                               "best_volume", "best_volume_date", "sessions", "total_reps",
+                               "total_volume", "first_date", "last_date" }, ... ] }
+    Dates are local days in the user's timezone.
+    """
+    rows = [r.to_dict(catalog.name_of(r.exercise_id)) for r in records.personal_records(current_user.id)]
+    rows.sort(key=lambda r: (r["exercise"] or "").lower())
+    return jsonify({"records": rows}), 200
+
+
 # Exercise trend time series
 @workout_sessions_bp.route('/exercise/trend', methods=['GET'])
 @token_required
@@ -426,7 +392,7 @@ def exercise_trend(current_user):
       - exercise: string (required)  e.g. "Flat Bench Press"
       - metric: one of [1rm, max_weight, avg_weight, total_volume, total_reps] (default: 1rm)
       - group_by: one of [day, week, month] (default: day)
-      - tz: IANA timezone (default: America/Chicago)
+      - tz: IANA timezone (default: the user's timezone)
       - from: ISO date/datetime (optional, default: now-90d)  e.g. 2025-05-01 or 2025-05-01T00:00:00-05:00
       - to:   ISO date/datetime (optional, default: now)
 
@@ -455,64 +421,26 @@ def exercise_trend(current_user):
     if group_by not in {"day", "week", "month"}:
         return jsonify({"error": "Invalid group_by"}), 400
 
-    tz = request.args.get("tz") or "America/Chicago"
+    tz = request.args.get("tz") or user_timezone(current_user)
 
     # Parse range (defaults to last 90 days)
     to_q = request.args.get("to")
     from_q = request.args.get("from")
 
-    to_utc = _parse_iso_dt_to_utc(to_q) if to_q else datetime.utcnow().replace(tzinfo=ZoneInfo("UTC"))
-    from_utc = _parse_iso_dt_to_utc(from_q) if from_q else (to_utc - timedelta(days=90))
-
-    # Pull sessions for this exercise & user in range
-    # NOTE: ilike (case-insensitive exact match) is fine here; you can switch to == for strict case-sensitive match.
-    q = (
-        WorkoutSession.query
-        .filter(WorkoutSession.user_id == current_user.id)
-        .filter(WorkoutSession.workout_date >= from_utc)
-        .filter(WorkoutSession.workout_date <= to_utc)
-        .filter(WorkoutSession.exercise_name.isnot(None))
-        .filter(WorkoutSession.exercise_name.ilike(exercise))
-    )
-
-    sessions = q.all()
-    if not sessions:
-        return jsonify({
-            "exercise": exercise,
-            "metric": metric,
-            "group_by": group_by,
-            "points": []
-        }), 200
+    to_utc = _parse_iso_dt_to_utc(to_q, tz) if to_q else datetime.utcnow().replace(tzinfo=ZoneInfo("UTC"))
+    from_utc = _parse_iso_dt_to_utc(from_q, tz) if from_q else (to_utc - timedelta(days=90))
 
     tzinfo = ZoneInfo(tz)
 
-    # Bucket helper
-    def bucket_key(dt_utc):
-        local = dt_utc.astimezone(tzinfo)
+    # Bucket helper (local calendar day -> bucket key)
+    def bucket_key(day):
         if group_by == "day":
-            return local.strftime("%Y-%m-%d")
+            return day.strftime("%Y-%m-%d")
         elif group_by == "week":
-            monday = (local.date() - timedelta(days=local.weekday()))
+            monday = day - timedelta(days=day.weekday())
             return monday.strftime("%Y-%m-%d")
         else:  # month
-            return local.replace(day=1).strftime("%Y-%m-01")
-
-    # Aggregate per bucket
-    buckets = defaultdict(list)
-
-    for s in sessions:
-        # Session-level fields; strength sessions have sets/reps/weight_lbs
-        reps = int(s.reps or 0)
-        sets = int(s.sets or 0)
-        weight = float(s.weight_lbs or 0.0)
-        # Treat missing sets as 1 when reps/weight are present
-        eff_sets = sets if sets > 0 else (1 if (reps > 0 or weight > 0) else 0)
-
-        buckets[bucket_key(s.workout_date)].append({
-            "reps": reps,
-            "sets": eff_sets,
-            "weight": weight
-        })
+            return day.replace(day=1).strftime("%Y-%m-01")
 
     def epley_1rm(weight_lbs: float, reps: int) -> float:
         # Epley formula (lbs)
@@ -520,21 +448,74 @@ def exercise_trend(current_user):
             return 0.0
         return weight_lbs * (1.0 + reps / 30.0)
 
+    # Catalog name or alias -> exercise id; an unknown name has no history
+    exercise_id = catalog.lookup(exercise)
+    if exercise_id is None:
+        return jsonify({"exercise": exercise, "metric": metric, "group_by": group_by, "points": []}), 200
+
+    # Aggregate per bucket; each entry is a partial aggregate (one session or one stats bucket)
+    buckets = defaultdict(list)
+
+    if rollups.covers(current_user, tz):
+        # Precomputed per-bucket stats (records.py); edge buckets only count days in range
+        to_local = to_utc.astimezone(tzinfo)
+        last_day = to_local.date()
+        if to_local.time() == datetime.min.time():   # date-only `to` stops before that day
+            last_day -= timedelta(days=1)
+        rows = records.trend_buckets(
+            current_user.id, exercise_id, group_by,
+            from_utc.astimezone(tzinfo).date(), last_day
+        )
+        for start, b in rows:
+            buckets[bucket_key(start)].append({
+                "total_reps": int(b.total_reps or 0),
+                "total_volume": float(b.total_volume or 0.0),
+                "best_1rm": float(b.best_1rm or 0.0),
+                "max_weight": float(b.max_weight or 0.0),
+                "weight_sum": float(b.weight_sum or 0.0),
+                "weighted": int(b.weighted_sessions or 0),
+            })
+    else:
+        # Pull sessions for this exercise & user in range (ix_workout_sessions_user_exercise_date)
+        q = (
+            WorkoutSession.query
+            .filter(WorkoutSession.user_id == current_user.id)
+            .filter(WorkoutSession.exercise_id == exercise_id)
+            .filter(WorkoutSession.workout_date >= naive_utc(from_utc))
+            .filter(WorkoutSession.workout_date <= naive_utc(to_utc))
+        )
+
+        for s in q.all():
+            # Session-level fields; strength sessions have sets/reps/weight_lbs
+            reps = int(s.reps or 0)
+            sets = int(s.sets or 0)
+            weight = float(s.weight_lbs or 0.0)
+            # Treat missing sets as 1 when reps/weight are present
+            eff_sets = max(sets, 1)
+
+            local_day = s.workout_date.replace(tzinfo=ZoneInfo("UTC")).astimezone(tzinfo).date()
+            buckets[bucket_key(local_day)].append({
+                "total_reps": reps * eff_sets,
+                "total_volume": reps * eff_sets * weight,
+                "best_1rm": epley_1rm(weight, reps),
+                "max_weight": weight if weight > 0 else 0.0,
+                "weight_sum": weight if weight > 0 else 0.0,
+                "weighted": 1 if weight > 0 else 0,
+            })
+
     points = []
     for bkey in sorted(buckets.keys()):
-        sets_list = buckets[bkey]
+        parts = buckets[bkey]
 
-        total_reps = sum(item["reps"] * max(item["sets"], 1) for item in sets_list)
-        total_volume = sum(item["reps"] * max(item["sets"], 1) * item["weight"] for item in sets_list)
+        total_reps = sum(p["total_reps"] for p in parts)
+        total_volume = sum(p["total_volume"] for p in parts)
 
-        weights = [item["weight"] for item in sets_list if item["weight"] > 0]
-        max_weight = max(weights) if weights else 0.0
-        avg_weight = (sum(weights) / len(weights)) if weights else 0.0
+        weighted = sum(p["weighted"] for p in parts)
+        max_weight = max(p["max_weight"] for p in parts)
+        avg_weight = (sum(p["weight_sum"] for p in parts) / weighted) if weighted else 0.0
 
         # Best single-set 1RM estimate across the bucket
-        best_1rm = 0.0
-        for item in sets_list:
-            best_1rm = max(best_1rm, epley_1rm(item["weight"], item["reps"]))
+        best_1rm = max(p["best_1rm"] for p in parts)
 
         if metric == "1rm":
             value = round(best_1rm, 2)
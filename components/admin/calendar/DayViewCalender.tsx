@@ -12,9 +12,18 @@ import moment from 'moment';
 import 'react-big-calendar/lib/css/react-big-calendar.css';
 import { toast, ToastContainer } from 'react-toastify';
 import 'react-toastify/dist/ReactToastify.css';
+import {
+  cancelEvent,
+  fetchAdminEvents,
+  rescheduleEvent,
+  respondToEvent,
+  visibleRange,
+} from '@/lib/adminCalendar';
 
 type EventType = {
   id: string;
+  seriesId?: string; // set on occurrences of a recurring series
+  occurrence?: string;
   title: string;
   start: Date;
   end: Date;
@@ -25,6 +34,8 @@ type EventType = {
 
 type ApiEvent = {
   id: string;
+  series_id?: string;
+  occurrence?: string;
   title: string;
   description?: string;
   start_time: string;
@@ -56,62 +67,57 @@ export default function DayViewCalendar() {
     typeof window !== 'undefined' ? localStorage.getItem('adminToken') : null;
 
   // ---------------------
-  // Fetch events (admin)
+  // Fetch events for the visible day
   // ---------------------
+  const fetchEvents = async (start: Date, end: Date) => {
+    if (!token) return;
+    try {
+      const data = await fetchAdminEvents<ApiEvent>(token, start, end);
+      const mapped: EventType[] = data.map((e) => ({
+        id: e.id,
+        seriesId: e.series_id,
+        occurrence: e.occurrence,
+        title: e.title,
+        description: e.description,
+        start: new Date(e.start_time),
+        end: new Date(e.end_time),
+        status: e.status ?? 'pending',
+        userName: e.user_name,
+      }));
+
+      setEvents(mapped);
+    } catch (err) {
+      toast.error('❌ Failed to load events.');
+      console.error(err);
+    }
+  };
+
+  // Initial load → today
   useEffect(() => {
     if (!token) return;
-    (async () => {
-      try {
-        const res = await fetch(
-          'http://localhost:5000/api/appointments/admin/all-events',
-          { headers: { Authorization: `Bearer ${token}` } }
-        );
-        if (!res.ok) throw new Error(`Failed with status ${res.status}`);
-
-        const data: ApiEvent[] = await res.json();
-        const mapped: EventType[] = data.map((e) => ({
-          id: e.id,
-          title: e.title,
-          description: e.description,
-          start: new Date(e.start_time),
-          end: new Date(e.end_time),
-          status: e.status ?? 'pending',
-          userName: e.user_name,
-        }));
-
-        setEvents(mapped);
-      } catch (err) {
-        toast.error('❌ Failed to load events.');
-        console.error(err);
-      }
-    })();
+    fetchEvents(moment().startOf('day').toDate(), moment().startOf('day').add(1, 'day').toDate());
   }, [token]);
 
   // ---------------------
   // Approve / Decline
   // ---------------------
   const handleRespond = async (eventId: string, action: 'approve' | 'decline') => {
-    if (!token) return;
+    const target = events.find((e) => e.id === eventId);
+    if (!token || !target) return;
     setLoadingRespond(true);
 
     try {
-      const res = await fetch(
-        `http://localhost:5000/api/appointments/admin/respond/${eventId}`,
-        {
-          method: 'POST',
-          headers: {
-            'Content-Type': 'application/json',
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({ action }),
-        }
-      );
+      const res = await respondToEvent(token, target, action);
 
       if (!res.ok) throw new Error(`Respond failed: ${res.status}`);
-      const { event }: { event: ApiEvent } = await res.json();
+      const { event, series }: { event?: ApiEvent; series?: { status: string } } = await res.json();
+      const status = (event ?? series)?.status;
 
+      // a series is approved or declined as a whole: update all of its occurrences
       setEvents((prev) =>
-        prev.map((e) => (e.id === event.id ? { ...e, status: event.status } : e))
+        prev.map((e) =>
+          (target.seriesId ? e.seriesId === target.seriesId : e.id === target.id) ? { ...e, status } : e
+        )
       );
 
       toast.success(`✅ Appointment ${action}d. User notified by email.`);
@@ -128,17 +134,12 @@ export default function DayViewCalendar() {
   // Cancel
   // ---------------------
   const handleCancelEvent = async (eventId: string) => {
-    if (!token) return;
+    const target = events.find((e) => e.id === eventId);
+    if (!token || !target) return;
     setLoadingCancel(true);
 
     try {
-      const res = await fetch(
-        `http://localhost:5000/api/appointments/admin/delete/${eventId}`,
-        {
-          method: 'DELETE',
-          headers: { Authorization: `Bearer ${token}` },
-        }
-      );
+      const res = await cancelEvent(token, target);
 
       if (!res.ok) throw new Error(`Cancel failed: ${res.status}`);
 
@@ -166,32 +167,20 @@ export default function DayViewCalendar() {
     const end = new Date(start.getTime() + 60 * 60 * 1000);
 
     try {
-      const res = await fetch(
-        `http://localhost:5000/api/appointments/admin/update/${selectedEvent.id}`,
-        {
-          method: 'PUT',
-          headers: {
-            'Content-Type': 'application/json',
-            Authorization: `Bearer ${token}`,
-          },
-          body: JSON.stringify({
-            start_time: start.toISOString(),
-            end_time: end.toISOString(),
-          }),
-        }
-      );
+      const res = await rescheduleEvent(token, selectedEvent, start, end);
 
       if (!res.ok) throw new Error(`Reschedule failed: ${res.status}`);
-      const { event }: { event: ApiEvent } = await res.json();
+      const { event, exception }: { event?: ApiEvent; exception?: ApiEvent } = await res.json();
+      const moved = (event ?? exception) as ApiEvent;
 
       setEvents((prev) =>
         prev.map((e) =>
-          e.id === event.id
+          e.id === selectedEvent.id
             ? {
                 ...e,
-                start: new Date(event.start_time),
-                end: new Date(event.end_time),
-                status: event.status ?? 'pending',
+                start: new Date(moved.start_time),
+                end: new Date(moved.end_time),
+                status: moved.status ?? e.status,
               }
             : e
         )
@@ -270,6 +259,7 @@ export default function DayViewCalendar() {
         events={events}
         defaultView={Views.DAY}
         views={['day']}
+        onRangeChange={(range: Date[] | { start: Date; end: Date }) => fetchEvents(...visibleRange(range))}
         startAccessor="start"
         endAccessor="end"
         selectable
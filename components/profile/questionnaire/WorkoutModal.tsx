@@ -27,6 +27,36 @@ type Step = {
   options?: string[];
 };
 
+// ---- Plan generation job ----------------------------------------
+// generate-workout answers 202 with a job; the plan is ready once
+// GET /api/ai/jobs/<id> reports "succeeded" (or "failed").
+const API_BASE = 'http://localhost:5000';
+const JOB_TIMEOUT_MS = 5 * 60 * 1000;
+
+type JobStatus = {
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  error?: string | null;
+  workout_plan?: string;
+};
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function waitForPlan(statusUrl: string, token: string): Promise<string> {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    const res = await axios.get<JobStatus>(`${API_BASE}${statusUrl}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (res.data.status === 'succeeded') return res.data.workout_plan ?? '';
+    if (res.data.status === 'failed') {
+      throw new Error(res.data.error || 'Workout plan generation failed');
+    }
+    const retryAfter = Number(res.headers['retry-after']) || 2;
+    await sleep(retryAfter * 1000);
+  }
+  throw new Error('Timed out waiting for the workout plan');
+}
+
 // ---- Steps ------------------------------------------------------
 const steps: Step[] = [
   {
@@ -134,12 +164,12 @@ export default function WorkoutModal({ onClose }: { onClose: () => void }) {
 
     try {
       const res = await axios.post(
-        'http://localhost:5000/api/ai/generate-workout',
+        `${API_BASE}/api/ai/generate-workout`,
         payload,
         { headers: { Authorization: `Bearer ${token}` } }
       );
 
-      setPlan(res.data.workout_plan);
+      setPlan(await waitForPlan(res.data.status_url, token));
 
       confetti({
         particleCount: 100,
@@ -148,7 +178,8 @@ export default function WorkoutModal({ onClose }: { onClose: () => void }) {
       });
     } catch (err) {
       console.error('❌ Submit error:', err);
-      alert('Failed to generate workout plan.');
+      const message = axios.isAxiosError(err) ? err.response?.data?.error : null;
+      alert(message || 'Failed to generate workout plan.');
     } finally {
       setLoading(false);
     }
@@ -0,0 +1,92 @@
+// /lib/adminCalendar.ts
+const BASE = process.env.NEXT_PUBLIC_API_BASE_URL || 'http://localhost:5000';
+
+/**
+ * Every admin calendar event in [start, end).
+ * /api/appointments/admin/all-events is paged (X-Next-Cursor header) and
+ * bounded to the requested range, so this follows the cursor until the
+ * last page. Throws on any non-2xx page.
+ */
+export async function fetchAdminEvents<T>(token: string, start: Date, end: Date): Promise<T[]> {
+  const events: T[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const params = new URLSearchParams({
+      start: start.toISOString(),
+      end: end.toISOString(),
+      limit: '1000',
+    });
+    if (cursor) params.set('cursor', cursor);
+
+    const res = await fetch(`${BASE}/api/appointments/admin/all-events?${params}`, {
+      headers: { Authorization: `Bearer ${token}` },
+    });
+    if (!res.ok) throw new Error(`Failed with status ${res.status}`);
+
+    events.push(...((await res.json()) as T[]));
+    cursor = res.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return events;
+}
+
+/** [start, end) covered by a react-big-calendar range (a list of days, or { start, end }). */
+export function visibleRange(range: Date[] | { start: Date; end: Date }): [Date, Date] {
+  if (Array.isArray(range)) {
+    const end = new Date(range[range.length - 1]);
+    end.setDate(end.getDate() + 1); // the last day is included
+    return [range[0], end];
+  }
+  return [range.start, range.end];
+}
+
+/**
+ * A feed item as the admin calendars hold it. Occurrences of a recurring
+ * series carry seriesId / occurrence (their original start) and are
+ * changed through /admin/series/..., not the single-event routes.
+ */
+export type AdminEventRef = { id: string; seriesId?: string; occurrence?: string };
+
+const ADMIN_APPOINTMENTS = `${BASE}/api/appointments/admin`;
+
+const jsonHeaders = (token: string) => ({
+  'Content-Type': 'application/json',
+  Authorization: `Bearer ${token}`,
+});
+
+const occurrenceUrl = (event: AdminEventRef) =>
+  `${ADMIN_APPOINTMENTS}/series/${event.seriesId}/occurrences/${encodeURIComponent(event.occurrence ?? '')}`;
+
+/** Approve / decline an event, or the whole series an occurrence belongs to. Body: { event } or { series }. */
+export function respondToEvent(token: string, event: AdminEventRef, action: 'approve' | 'decline') {
+  const url = event.seriesId
+    ? `${ADMIN_APPOINTMENTS}/series/${event.seriesId}/respond`
+    : `${ADMIN_APPOINTMENTS}/respond/${event.id}`;
+  return fetch(url, { method: 'POST', headers: jsonHeaders(token), body: JSON.stringify({ action }) });
+}
+
+/** Delete an event, or cancel just this occurrence of a series. */
+export function cancelEvent(token: string, event: AdminEventRef) {
+  if (event.seriesId) {
+    return fetch(occurrenceUrl(event), {
+      method: 'PUT',
+      headers: jsonHeaders(token),
+      body: JSON.stringify({ cancel: true }),
+    });
+  }
+  return fetch(`${ADMIN_APPOINTMENTS}/delete/${event.id}`, {
+    method: 'DELETE',
+    headers: { Authorization: `Bearer ${token}` },
+  });
+}
+
+/** Move an event, or just this occurrence of a series. Body: { event } or { exception }. */
+export function rescheduleEvent(token: string, event: AdminEventRef, start: Date, end: Date) {
+  const url = event.seriesId ? occurrenceUrl(event) : `${ADMIN_APPOINTMENTS}/update/${event.id}`;
+  return fetch(url, {
+    method: 'PUT',
+    headers: jsonHeaders(token),
+    body: JSON.stringify({ start_time: start.toISOString(), end_time: end.toISOString() }),
+  });
+}